@@ -0,0 +1,34 @@
+"""flag used images
+
+Revision ID: 0c7e4d2a9f61
+Revises: 5e2b7f0c8d14
+Create Date: 2026-10-17 23:05:31.418209
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0c7e4d2a9f61"
+down_revision = "5e2b7f0c8d14"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Images added to a post by editing it weren't flagged as used
+    op.execute(
+        """
+        UPDATE image_upload SET used = true
+        FROM (
+            SELECT image_id AS id FROM post WHERE image_id IS NOT NULL
+            UNION SELECT CAST(media ->> 'id' AS uuid) FROM post, jsonb_array_elements(post.media) media
+            UNION SELECT profile_picture_id FROM "user" WHERE profile_picture_id IS NOT NULL
+        ) referenced
+        WHERE image_upload.id = referenced.id AND NOT image_upload.used
+        """
+    )
+
+
+def downgrade():
+    pass
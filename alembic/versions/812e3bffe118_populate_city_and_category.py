@@ -7,8 +7,18 @@ Create Date: 2023-01-28 18:20:38.608021
 """
 from alembic import op
 
-from app.tasks.place_metadata import UPDATE_FOR_ALL_PLACES_QUERY
-
+UPDATE_FOR_ALL_PLACES_QUERY = """
+update place
+set city = (
+    select mode() within group (order by jsonb_object_field_text(place_data.additional_data, 'locality'))
+    from place_data
+    where place_data.place_id = place.id
+), category = substr((
+    select mode() within group (order by jsonb_object_field_text(place_data.additional_data, 'poi_category'))
+    from place_data
+    where place_data.place_id = place.id
+), 14);
+"""
 
 # revision identifiers, used by Alembic.
 revision = "812e3bffe118"
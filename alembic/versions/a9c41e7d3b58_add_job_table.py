@@ -0,0 +1,56 @@
+"""add job table
+
+Revision ID: a9c41e7d3b58
+Revises: f3a8c6d1e920
+Create Date: 2026-10-17 20:05:31.416209
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "a9c41e7d3b58"
+down_revision = "f3a8c6d1e920"
+branch_labels = None
+depends_on = None
+
+job_status = postgresql.ENUM("queued", "running", "done", "dead", name="jobstatus")
+
+
+def upgrade():
+    op.create_table(
+        "job",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("type", sa.Text(), nullable=False),
+        sa.Column("payload", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column("status", job_status, server_default="queued", nullable=False),
+        sa.Column("attempts", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("max_attempts", sa.Integer(), nullable=False),
+        sa.Column("run_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "idx_job_queued_run_at", "job", ["run_at"], unique=False, postgresql_where=sa.text("status = 'queued'")
+    )
+    op.create_index(
+        "idx_job_running_started_at",
+        "job",
+        ["started_at"],
+        unique=False,
+        postgresql_where=sa.text("status = 'running'"),
+    )
+    op.create_index("idx_job_finished_at", "job", ["finished_at"], unique=False)
+
+
+def downgrade():
+    op.drop_index("idx_job_finished_at", table_name="job")
+    op.drop_index("idx_job_running_started_at", table_name="job")
+    op.drop_index("idx_job_queued_run_at", table_name="job")
+    op.drop_table("job")
+    job_status.drop(op.get_bind())
@@ -0,0 +1,172 @@
+"""add counter columns
+
+Revision ID: b3f9c1d2e4a7
+Revises: 7a1730bf8d2e
+Create Date: 2026-10-17 09:12:44.310582
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "b3f9c1d2e4a7"
+down_revision = "7a1730bf8d2e"
+branch_labels = None
+depends_on = None
+
+
+# Frozen copy of the counters in app/core/database/counters.py, so later changes there don't change this migration
+
+
+def _trigger(table: str, events: str, body: str) -> list[str]:
+    """Return the statements creating a row trigger on `table` that runs the given PL/pgSQL body."""
+    function_name = f"{table}_update_counts"
+    return [
+        f"CREATE OR REPLACE FUNCTION {function_name}() RETURNS trigger AS $$\nBEGIN\n{body}\n"
+        "    RETURN NULL;\nEND;\n$$ LANGUAGE plpgsql",
+        f"DROP TRIGGER IF EXISTS {function_name} ON {table}",
+        f"CREATE TRIGGER {function_name} AFTER {events} ON {table} FOR EACH ROW EXECUTE FUNCTION {function_name}()",
+    ]
+
+
+# Both users are updated in one statement so concurrent follows between the same two users lock their rows in the same
+# (index) order instead of deadlocking.
+_FOLLOW_TRIGGER = _trigger(
+    "follow",
+    "INSERT OR DELETE OR UPDATE OF relation, from_user_id, to_user_id",
+    """
+    IF TG_OP <> 'INSERT' THEN
+        IF OLD.relation = 'following' THEN
+            UPDATE "user" SET
+                follower_count = follower_count - (id = OLD.to_user_id)::int,
+                following_count = following_count - (id = OLD.from_user_id)::int
+            WHERE id IN (OLD.from_user_id, OLD.to_user_id);
+        END IF;
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        IF NEW.relation = 'following' THEN
+            UPDATE "user" SET
+                follower_count = follower_count + (id = NEW.to_user_id)::int,
+                following_count = following_count + (id = NEW.from_user_id)::int
+            WHERE id IN (NEW.from_user_id, NEW.to_user_id);
+        END IF;
+    END IF;""",
+)
+
+_POST_TRIGGER = _trigger(
+    "post",
+    "INSERT OR DELETE OR UPDATE OF deleted, user_id",
+    """
+    IF TG_OP <> 'INSERT' THEN
+        IF NOT OLD.deleted THEN
+            UPDATE "user" SET post_count = post_count - 1 WHERE id = OLD.user_id;
+        END IF;
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        IF NOT NEW.deleted THEN
+            UPDATE "user" SET post_count = post_count + 1 WHERE id = NEW.user_id;
+        END IF;
+    END IF;""",
+)
+
+_POST_LIKE_TRIGGER = _trigger(
+    "post_like",
+    "INSERT OR DELETE",
+    """
+    IF TG_OP = 'INSERT' THEN
+        UPDATE post SET like_count = like_count + 1 WHERE id = NEW.post_id;
+    ELSE
+        UPDATE post SET like_count = like_count - 1 WHERE id = OLD.post_id;
+    END IF;""",
+)
+
+_COMMENT_TRIGGER = _trigger(
+    "comment",
+    "INSERT OR DELETE OR UPDATE OF deleted, post_id",
+    """
+    IF TG_OP <> 'INSERT' THEN
+        IF NOT OLD.deleted THEN
+            UPDATE post SET comment_count = comment_count - 1 WHERE id = OLD.post_id;
+        END IF;
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        IF NOT NEW.deleted THEN
+            UPDATE post SET comment_count = comment_count + 1 WHERE id = NEW.post_id;
+        END IF;
+    END IF;""",
+)
+
+_COMMENT_LIKE_TRIGGER = _trigger(
+    "comment_like",
+    "INSERT OR DELETE",
+    """
+    IF TG_OP = 'INSERT' THEN
+        UPDATE comment SET like_count = like_count + 1 WHERE id = NEW.comment_id;
+    ELSE
+        UPDATE comment SET like_count = like_count - 1 WHERE id = OLD.comment_id;
+    END IF;""",
+)
+
+CREATE_COUNTER_TRIGGERS = [
+    *_FOLLOW_TRIGGER,
+    *_POST_TRIGGER,
+    *_POST_LIKE_TRIGGER,
+    *_COMMENT_TRIGGER,
+    *_COMMENT_LIKE_TRIGGER,
+]
+
+DROP_COUNTER_TRIGGERS = [
+    f"DROP FUNCTION IF EXISTS {table}_update_counts() CASCADE"
+    for table in ("follow", "post", "post_like", "comment", "comment_like")
+]
+
+# (table, column, query returning (id, count) for the rows with a non-zero count)
+BACKFILLS = [
+    ("user", "post_count", "SELECT user_id AS id, count(*) AS count FROM post WHERE NOT deleted GROUP BY user_id"),
+    (
+        "user",
+        "follower_count",
+        "SELECT to_user_id AS id, count(*) AS count FROM follow WHERE relation = 'following' GROUP BY to_user_id",
+    ),
+    (
+        "user",
+        "following_count",
+        "SELECT from_user_id AS id, count(*) AS count FROM follow WHERE relation = 'following' GROUP BY from_user_id",
+    ),
+    ("post", "like_count", "SELECT post_id AS id, count(*) AS count FROM post_like GROUP BY post_id"),
+    (
+        "post",
+        "comment_count",
+        "SELECT post_id AS id, count(*) AS count FROM comment WHERE NOT deleted GROUP BY post_id",
+    ),
+    ("comment", "like_count", "SELECT comment_id AS id, count(*) AS count FROM comment_like GROUP BY comment_id"),
+]
+
+
+def upgrade():
+    op.add_column("user", sa.Column("post_count", sa.Integer(), server_default="0", nullable=False))
+    op.add_column("user", sa.Column("follower_count", sa.Integer(), server_default="0", nullable=False))
+    op.add_column("user", sa.Column("following_count", sa.Integer(), server_default="0", nullable=False))
+    op.add_column("post", sa.Column("like_count", sa.Integer(), server_default="0", nullable=False))
+    op.add_column("post", sa.Column("comment_count", sa.Integer(), server_default="0", nullable=False))
+    op.add_column("comment", sa.Column("like_count", sa.Integer(), server_default="0", nullable=False))
+    # Lock the counted tables so no rows change between backfilling and installing the triggers
+    op.execute("LOCK TABLE follow, post, post_like, comment, comment_like IN SHARE ROW EXCLUSIVE MODE")
+    for statement in CREATE_COUNTER_TRIGGERS:
+        op.execute(statement)
+    for table, column, counts_query in BACKFILLS:
+        op.execute(
+            f'UPDATE "{table}" t SET {column} = counts.count FROM ({counts_query}) counts WHERE t.id = counts.id'
+        )
+
+
+def downgrade():
+    for statement in DROP_COUNTER_TRIGGERS:
+        op.execute(statement)
+    op.drop_column("comment", "like_count")
+    op.drop_column("post", "comment_count")
+    op.drop_column("post", "like_count")
+    op.drop_column("user", "following_count")
+    op.drop_column("user", "follower_count")
+    op.drop_column("user", "post_count")
@@ -0,0 +1,104 @@
+"""add post list indexes
+
+Revision ID: c4e2a9f1b7d3
+Revises: b3f9c1d2e4a7
+Create Date: 2026-10-17 14:02:31.908144
+
+"""
+
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "c4e2a9f1b7d3"
+down_revision = "b3f9c1d2e4a7"
+branch_labels = None
+depends_on = None
+
+log = logging.getLogger("alembic.runtime.migration")
+
+SAMPLE_ID = "00000000-0000-0000-0000-000000000000"
+# Representative queries for the new indexes, their plans are logged before and after creating them
+QUERIES = {
+    "user posts": f"SELECT id FROM post WHERE user_id = '{SAMPLE_ID}' AND NOT deleted ORDER BY id DESC LIMIT 50",
+    "feed": (
+        f"SELECT id FROM post WHERE (user_id = '{SAMPLE_ID}' OR user_id IN (SELECT to_user_id FROM follow "
+        f"WHERE from_user_id = '{SAMPLE_ID}' AND relation = 'following')) AND NOT deleted ORDER BY id DESC LIMIT 10"
+    ),
+    "discover": (
+        "SELECT id FROM post WHERE (image_id IS NOT NULL OR content != '') AND NOT deleted ORDER BY id DESC LIMIT 100"
+    ),
+    "place posts": f"SELECT id FROM post WHERE place_id = '{SAMPLE_ID}' AND NOT deleted ORDER BY id DESC",
+    "saved places": f"SELECT id FROM place_save WHERE user_id = '{SAMPLE_ID}' ORDER BY id DESC LIMIT 15",
+    "comments": f"SELECT id FROM comment WHERE post_id = '{SAMPLE_ID}' ORDER BY id LIMIT 10",
+}
+
+
+def log_plans(label: str):
+    connection = op.get_bind()
+    for name, query in QUERIES.items():
+        plan = connection.execute(sa.text(f"EXPLAIN {query}")).scalars().all()
+        log.info("Plan for %s (%s):\n  %s", name, label, "\n  ".join(plan))
+
+
+def upgrade():
+    log_plans("before")
+    # Build the indexes without blocking writes, which can't be done in a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "idx_post_user_id_id",
+            "post",
+            ["user_id", sa.text("id DESC")],
+            postgresql_where=sa.text("NOT deleted"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "idx_post_place_id_id",
+            "post",
+            ["place_id", sa.text("id DESC")],
+            postgresql_where=sa.text("NOT deleted"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "idx_post_id_with_content",
+            "post",
+            [sa.text("id DESC")],
+            postgresql_where=sa.text("NOT deleted AND (image_id IS NOT NULL OR content != '')"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "idx_place_save_user_id_id",
+            "place_save",
+            ["user_id", sa.text("id DESC")],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "idx_comment_post_id_id",
+            "comment",
+            ["post_id", "id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        # Covered by idx_comment_post_id_id
+        op.drop_index("comment_post_id_idx", table_name="comment", postgresql_concurrently=True, if_exists=True)
+    for table in ("post", "place_save", "comment"):
+        op.execute(f"ANALYZE {table}")
+    log_plans("after")
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.create_index("comment_post_id_idx", "comment", ["post_id"], postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index("idx_comment_post_id_id", table_name="comment", postgresql_concurrently=True, if_exists=True)
+        op.drop_index(
+            "idx_place_save_user_id_id", table_name="place_save", postgresql_concurrently=True, if_exists=True
+        )
+        op.drop_index("idx_post_id_with_content", table_name="post", postgresql_concurrently=True, if_exists=True)
+        op.drop_index("idx_post_place_id_id", table_name="post", postgresql_concurrently=True, if_exists=True)
+        op.drop_index("idx_post_user_id_id", table_name="post", postgresql_concurrently=True, if_exists=True)
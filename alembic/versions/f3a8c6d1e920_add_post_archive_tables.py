@@ -0,0 +1,108 @@
+"""add post archive tables
+
+Revision ID: f3a8c6d1e920
+Revises: e7d2b5a9c413
+Create Date: 2026-10-17 18:20:47.136204
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "f3a8c6d1e920"
+down_revision = "e7d2b5a9c413"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Parents before children
+    op.create_table(
+        "post_archive",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("user_id", sa.UUID(), nullable=False),
+        sa.Column("place_id", sa.UUID(), nullable=False),
+        sa.Column("category", sa.Text(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("image_id", sa.UUID(), nullable=True),
+        sa.Column("media", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column("stars", sa.Integer(), nullable=True),
+        sa.Column("deleted", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("like_count", sa.Integer(), nullable=False),
+        sa.Column("comment_count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "post_like_archive",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("user_id", sa.UUID(), nullable=False),
+        sa.Column("post_id", sa.UUID(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["post_id"], ["post_archive.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id", "post_id"),
+    )
+    op.create_index("idx_post_like_archive_post_id", "post_like_archive", ["post_id"], unique=False)
+    op.create_table(
+        "post_save_archive",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("user_id", sa.UUID(), nullable=False),
+        sa.Column("post_id", sa.UUID(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["post_id"], ["post_archive.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("idx_post_save_archive_post_id", "post_save_archive", ["post_id"], unique=False)
+    op.create_table(
+        "post_report_archive",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("post_id", sa.UUID(), nullable=False),
+        sa.Column("reported_by_user_id", sa.UUID(), nullable=False),
+        sa.Column("details", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["post_id"], ["post_archive.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["reported_by_user_id"], ["user.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("idx_post_report_archive_post_id", "post_report_archive", ["post_id"], unique=False)
+    op.create_table(
+        "comment_archive",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("user_id", sa.UUID(), nullable=False),
+        sa.Column("post_id", sa.UUID(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("deleted", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("like_count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["post_id"], ["post_archive.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("idx_comment_archive_post_id", "comment_archive", ["post_id"], unique=False)
+    op.create_table(
+        "comment_like_archive",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("user_id", sa.UUID(), nullable=False),
+        sa.Column("comment_id", sa.UUID(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["comment_id"], ["comment_archive.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id", "comment_id"),
+    )
+    op.create_index("idx_comment_like_archive_comment_id", "comment_like_archive", ["comment_id"], unique=False)
+
+
+def downgrade():
+    op.drop_table("comment_like_archive")
+    op.drop_table("comment_archive")
+    op.drop_table("post_report_archive")
+    op.drop_table("post_save_archive")
+    op.drop_table("post_like_archive")
+    op.drop_table("post_archive")
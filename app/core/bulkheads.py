@@ -0,0 +1,122 @@
+"""
+Per route group limits on concurrent requests, and shedding load while requests wait too long for a connection.
+
+Each group gets its own budget of in-flight requests, so a burst on one group (e.g. map loads) can't hold every
+database connection and stall the others. Requests that can't be served soon get a 503 right away instead of waiting
+for the pool timeout.
+"""
+
+from typing import Callable, Optional
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core import config
+from app.core.types import Base
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+FEED_PREFIXES = ("/me/feed", "/me/discover", "/notifications", "/posts", "/comments", "/places", "/search")
+
+
+class BulkheadStats(Base):
+    name: str
+    limit: int
+    in_flight: int
+    # Requests rejected because the group was at its limit
+    rejected: int
+    # Requests rejected because another request was waiting too long for a database connection
+    shed: int
+
+
+def get_route_group(method: str, path: str) -> str:
+    """Return the bulkhead group of the request: admin, map, writes, feed or auth (auth, profiles and the rest)."""
+    if path.startswith("/admin"):
+        return "admin"
+    if path.startswith("/map"):
+        return "map"
+    if method not in SAFE_METHODS:
+        return "writes"
+    if path.startswith(FEED_PREFIXES) or (path.startswith("/users/") and path.endswith("/posts")):
+        return "feed"
+    return "auth"
+
+
+class Bulkhead:
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = limit
+        self.in_flight = 0
+        self.rejected = 0
+        self.shed = 0
+
+    def stats(self) -> BulkheadStats:
+        return BulkheadStats(
+            name=self.name, limit=self.limit, in_flight=self.in_flight, rejected=self.rejected, shed=self.shed
+        )
+
+
+class Bulkheads:
+    def __init__(self, limits: dict[str, int]):
+        self._bulkheads = {name: Bulkhead(name, limit) for name, limit in limits.items()}
+
+    def get(self, name: str) -> Optional[Bulkhead]:
+        return self._bulkheads.get(name)
+
+    def stats(self) -> list[BulkheadStats]:
+        return [bulkhead.stats() for bulkhead in self._bulkheads.values()]
+
+
+bulkheads = Bulkheads(config.BULKHEAD_LIMITS)
+
+
+class BulkheadMiddleware:
+    """
+    Reject requests with a 503 (and Retry-After) when their route group is at its limit, or when a request has been
+    waiting longer than `max_pool_wait_seconds` for a database connection. Admin requests are never shed for pool
+    waits, so the metrics stay reachable.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        bulkheads: Bulkheads,
+        get_pool_wait_seconds: Callable[[], float],
+        max_pool_wait_seconds: float,
+        retry_after_seconds: int,
+    ):
+        self.app = app
+        self.bulkheads = bulkheads
+        self.get_pool_wait_seconds = get_pool_wait_seconds
+        self.max_pool_wait_seconds = max_pool_wait_seconds
+        self.retry_after_seconds = retry_after_seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        group = get_route_group(scope["method"], scope["path"])
+        bulkhead = self.bulkheads.get(group)
+        if bulkhead is None:
+            await self.app(scope, receive, send)
+            return
+        if bulkhead.in_flight >= bulkhead.limit:
+            bulkhead.rejected += 1
+            await self._reject(scope, receive, send)
+            return
+        if group != "admin" and self.get_pool_wait_seconds() > self.max_pool_wait_seconds:
+            bulkhead.shed += 1
+            await self._reject(scope, receive, send)
+            return
+        bulkhead.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            bulkhead.in_flight -= 1
+
+    async def _reject(self, scope: Scope, receive: Receive, send: Send) -> None:
+        response = JSONResponse(
+            {"error": "Server is busy, try again later"},
+            status_code=503,
+            headers={"Retry-After": str(self.retry_after_seconds)},
+        )
+        await response(scope, receive, send)
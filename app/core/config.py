@@ -17,3 +17,118 @@ ENABLE_DOCS: bool = os.environ.get("ENABLE_DOCS") == "1"
 
 # Firebase storage bucket for user images
 STORAGE_BUCKET: str = os.environ.get("STORAGE_BUCKET", "goodplaces-app.appspot.com")
+
+# Max number of verified Firebase id tokens to keep in memory (per worker)
+ID_TOKEN_CACHE_SIZE: int = int(os.environ.get("ID_TOKEN_CACHE_SIZE", "4096"))
+
+# Threads for blocking Firebase Admin calls (per worker). Keep these at or under 10, the default HTTP connection pool
+# size of the Firebase/Google clients, so every thread can reuse a pooled connection.
+FIREBASE_AUTH_THREADS: int = int(os.environ.get("FIREBASE_AUTH_THREADS", "4"))
+FIREBASE_STORAGE_THREADS: int = int(os.environ.get("FIREBASE_STORAGE_THREADS", "8"))
+FIREBASE_MESSAGING_THREADS: int = int(os.environ.get("FIREBASE_MESSAGING_THREADS", "8"))
+
+# Max number of users to keep in the in-memory user cache (per worker), and how long to keep them.
+# Writes invalidate cached users, so the TTL only bounds staleness for writes made by other workers.
+USER_CACHE_SIZE: int = int(os.environ.get("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL_SECONDS: float = float(os.environ.get("USER_CACHE_TTL_SECONDS", "30"))
+
+# Optional read replica connection URL (async). If not set, reads go to the primary database.
+# Example: "postgresql+asyncpg://user@replica/jimo_db"
+READ_REPLICA_DATABASE_URL: Optional[str] = os.environ.get("READ_REPLICA_DATABASE_URL")
+
+# After a client writes, send its reads to the primary for this many seconds so it can read its own writes
+READ_AFTER_WRITE_SECONDS: float = float(os.environ.get("READ_AFTER_WRITE_SECONDS", "5"))
+
+# Max number of compiled SQL strings SQLAlchemy keeps (per engine), and max number of prepared statements asyncpg keeps
+# (per connection). Every distinct SQL string the app runs takes an entry in both.
+DB_QUERY_CACHE_SIZE: int = int(os.environ.get("DB_QUERY_CACHE_SIZE", "500"))
+DB_PREPARED_STATEMENT_CACHE_SIZE: int = int(os.environ.get("DB_PREPARED_STATEMENT_CACHE_SIZE", "250"))
+
+# Connections (per worker) for background tasks, kept apart from the request pool so task bursts can't starve requests.
+# Tasks wait up to the timeout for a connection since nobody is waiting on them.
+BACKGROUND_DB_POOL_SIZE: int = int(os.environ.get("BACKGROUND_DB_POOL_SIZE", "4"))
+BACKGROUND_DB_POOL_TIMEOUT_SECONDS: float = float(os.environ.get("BACKGROUND_DB_POOL_TIMEOUT_SECONDS", "60"))
+
+# Statement timeout for the routes with potentially slow queries (map, discover, suggested users and search)
+SLOW_ROUTE_STATEMENT_TIMEOUT_SECONDS: float = float(os.environ.get("SLOW_ROUTE_STATEMENT_TIMEOUT_SECONDS", "5"))
+
+# Max number of extra connections a request can use to run independent reads concurrently (see gather_reads)
+DB_MAX_PARALLEL_READS_PER_REQUEST: int = int(os.environ.get("DB_MAX_PARALLEL_READS_PER_REQUEST", "3"))
+
+# Max concurrent requests (per worker) for each route group, see app/core/bulkheads.py. Requests over the limit, and
+# all requests while a request has been waiting longer than LOAD_SHED_POOL_WAIT_SECONDS for a database connection, get
+# a 503 asking the client to retry after BULKHEAD_RETRY_AFTER_SECONDS.
+BULKHEAD_LIMITS: dict[str, int] = {
+    name: int(limit)
+    for name, limit in (
+        group.split("=")
+        for group in os.environ.get("BULKHEAD_LIMITS", "auth=64,feed=32,map=12,writes=32,admin=4").split(",")
+    )
+}
+LOAD_SHED_POOL_WAIT_SECONDS: float = float(os.environ.get("LOAD_SHED_POOL_WAIT_SECONDS", "2"))
+BULKHEAD_RETRY_AFTER_SECONDS: int = int(os.environ.get("BULKHEAD_RETRY_AFTER_SECONDS", "5"))
+
+# If true, prefix each SQL statement with a comment naming the route or job that ran it (see /admin/slow-queries). Off
+# by default: the same statement run by different routes takes a prepared statement per route, and the warm-up doesn't
+# prepare the tagged statements.
+DB_TAG_QUERIES: bool = os.environ.get("DB_TAG_QUERIES", "0") == "1"
+
+# Number of connections (per worker and engine) to open and prepare the hot statements on before the worker starts
+# serving requests, and how long to wait for the warm-up before serving anyway. 0 disables the warm-up.
+WARM_UP_DB_CONNECTIONS: int = int(os.environ.get("WARM_UP_DB_CONNECTIONS", "8"))
+WARM_UP_TIMEOUT_SECONDS: float = float(os.environ.get("WARM_UP_TIMEOUT_SECONDS", "20"))
+
+# Deleted posts are moved to the archive tables once they've been deleted this long, this many posts per transaction
+ARCHIVE_POSTS_DELETED_DAYS: float = float(os.environ.get("ARCHIVE_POSTS_DELETED_DAYS", "30"))
+ARCHIVE_BATCH_SIZE: int = int(os.environ.get("ARCHIVE_BATCH_SIZE", "500"))
+
+# If true, each worker listens for cache invalidations from the other workers (and publishes its own) over
+# LISTEN/NOTIFY, see app/core/invalidation.py
+CACHE_INVALIDATION_ENABLED: bool = os.environ.get("CACHE_INVALIDATION_ENABLED", "1") == "1"
+
+# Background job queue, see app/tasks/queue.py. Each worker process (python -m app.tasks.worker) runs up to
+# JOB_WORKER_CONCURRENCY jobs at a time, each holding a background pool connection while it uses the database, so size
+# BACKGROUND_DB_POOL_SIZE to match in the worker. Idle workers check for jobs every JOB_POLL_SECONDS.
+JOB_WORKER_CONCURRENCY: int = int(os.environ.get("JOB_WORKER_CONCURRENCY", "4"))
+# If true, each server worker also runs a job worker. For development only, deployments run the job worker as its own
+# process (see start.sh) so jobs don't use the request workers' CPU and connections.
+JOB_WORKER_IN_APP: bool = os.environ.get("JOB_WORKER_IN_APP", "0") == "1"
+JOB_POLL_SECONDS: float = float(os.environ.get("JOB_POLL_SECONDS", "1"))
+# Failed jobs are retried after JOB_BACKOFF_SECONDS, doubling after each attempt up to JOB_MAX_BACKOFF_SECONDS, and
+# dead-lettered after JOB_MAX_ATTEMPTS attempts. Jobs running longer than JOB_TIMEOUT_SECONDS count as failed.
+JOB_MAX_ATTEMPTS: int = int(os.environ.get("JOB_MAX_ATTEMPTS", "5"))
+JOB_BACKOFF_SECONDS: float = float(os.environ.get("JOB_BACKOFF_SECONDS", "10"))
+JOB_MAX_BACKOFF_SECONDS: float = float(os.environ.get("JOB_MAX_BACKOFF_SECONDS", "3600"))
+JOB_TIMEOUT_SECONDS: float = float(os.environ.get("JOB_TIMEOUT_SECONDS", "120"))
+# Finished jobs are kept this long for the job metrics (see /admin/jobs)
+JOB_RETENTION_HOURS: float = float(os.environ.get("JOB_RETENTION_HOURS", "24"))
+
+# Periodic maintenance jobs (see app/features/maintenance.py), run by whichever worker holds the scheduler's advisory
+# lock. Each job runs every <interval> seconds and stops starting new batches after <budget> seconds. Jobs with an
+# interval of 0 (or none) don't run. The leader checks for due jobs, and the other workers try to take over, every
+# MAINTENANCE_CHECK_SECONDS.
+MAINTENANCE_ENABLED: bool = os.environ.get("MAINTENANCE_ENABLED", "1") == "1"
+MAINTENANCE_INTERVALS: dict[str, float] = {
+    name: float(seconds)
+    for name, seconds in (
+        job.split("=")
+        for job in os.environ.get(
+            "MAINTENANCE_INTERVALS",
+            "purge_deleted_users=3600,archive_posts=86400,place_metadata=86400,orphan_images=86400,counters=86400",
+        ).split(",")
+    )
+}
+MAINTENANCE_BUDGETS: dict[str, float] = {
+    name: float(seconds)
+    for name, seconds in (
+        job.split("=")
+        for job in os.environ.get(
+            "MAINTENANCE_BUDGETS",
+            "purge_deleted_users=120,archive_posts=300,place_metadata=300,orphan_images=120,counters=300",
+        ).split(",")
+    )
+}
+MAINTENANCE_CHECK_SECONDS: float = float(os.environ.get("MAINTENANCE_CHECK_SECONDS", "60"))
+
+# Uploaded images that haven't been used by a post or profile after this long are deleted
+ORPHAN_IMAGE_HOURS: float = float(os.environ.get("ORPHAN_IMAGE_HOURS", "24"))
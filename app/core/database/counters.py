@@ -0,0 +1,263 @@
+"""
+Denormalized counters (post, follower, following, like and comment counts).
+
+The counts are stored on the user, post and comment rows and kept up to date by triggers on the tables being counted,
+so they change in the same transaction as the rows they count, including rows removed by cascading deletes.
+
+Run `python -m app.core.database.counters` to check the stored counts for drift, or with `--repair` to fix them.
+"""
+
+import argparse
+import asyncio
+from dataclasses import dataclass
+from typing import Sequence
+
+from sqlalchemy import DDL, event, text
+from sqlalchemy.engine import Connection
+
+from app.utils import get_logger
+
+log = get_logger(__name__)
+
+# Rows to lock and repair per transaction
+REPAIR_BATCH_SIZE = 1000
+
+
+@dataclass(frozen=True)
+class Counter:
+    table: str
+    column: str
+    # Query returning (id, count) for every row of `table`
+    actual_counts_query: str
+
+
+COUNTERS = [
+    Counter(
+        table="user",
+        column="post_count",
+        actual_counts_query="""
+            SELECT u.id, count(p.id) AS count FROM "user" u
+            LEFT JOIN post p ON p.user_id = u.id AND NOT p.deleted
+            GROUP BY u.id
+        """,
+    ),
+    Counter(
+        table="user",
+        column="follower_count",
+        actual_counts_query="""
+            SELECT u.id, count(f.id) AS count FROM "user" u
+            LEFT JOIN follow f ON f.to_user_id = u.id AND f.relation = 'following'
+            GROUP BY u.id
+        """,
+    ),
+    Counter(
+        table="user",
+        column="following_count",
+        actual_counts_query="""
+            SELECT u.id, count(f.id) AS count FROM "user" u
+            LEFT JOIN follow f ON f.from_user_id = u.id AND f.relation = 'following'
+            GROUP BY u.id
+        """,
+    ),
+    Counter(
+        table="post",
+        column="like_count",
+        actual_counts_query="""
+            SELECT p.id, count(l.id) AS count FROM post p
+            LEFT JOIN post_like l ON l.post_id = p.id
+            GROUP BY p.id
+        """,
+    ),
+    Counter(
+        table="post",
+        column="comment_count",
+        actual_counts_query="""
+            SELECT p.id, count(c.id) AS count FROM post p
+            LEFT JOIN comment c ON c.post_id = p.id AND NOT c.deleted
+            GROUP BY p.id
+        """,
+    ),
+    Counter(
+        table="comment",
+        column="like_count",
+        actual_counts_query="""
+            SELECT c.id, count(l.id) AS count FROM comment c
+            LEFT JOIN comment_like l ON l.comment_id = c.id
+            GROUP BY c.id
+        """,
+    ),
+]
+
+
+def _trigger(table: str, events: str, body: str) -> list[str]:
+    """Return the statements creating a row trigger on `table` that runs the given PL/pgSQL body."""
+    function_name = f"{table}_update_counts"
+    return [
+        f"CREATE OR REPLACE FUNCTION {function_name}() RETURNS trigger AS $$\nBEGIN\n{body}\n"
+        "    RETURN NULL;\nEND;\n$$ LANGUAGE plpgsql",
+        f"DROP TRIGGER IF EXISTS {function_name} ON {table}",
+        f"CREATE TRIGGER {function_name} AFTER {events} ON {table} FOR EACH ROW EXECUTE FUNCTION {function_name}()",
+    ]
+
+
+# Each trigger is a separate list of statements since asyncpg can't run several statements at once.
+# Both users are updated in one statement so concurrent follows between the same two users lock their rows in the same
+# (index) order instead of deadlocking.
+_FOLLOW_TRIGGER = _trigger(
+    "follow",
+    "INSERT OR DELETE OR UPDATE OF relation, from_user_id, to_user_id",
+    """
+    IF TG_OP <> 'INSERT' THEN
+        IF OLD.relation = 'following' THEN
+            UPDATE "user" SET
+                follower_count = follower_count - (id = OLD.to_user_id)::int,
+                following_count = following_count - (id = OLD.from_user_id)::int
+            WHERE id IN (OLD.from_user_id, OLD.to_user_id);
+        END IF;
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        IF NEW.relation = 'following' THEN
+            UPDATE "user" SET
+                follower_count = follower_count + (id = NEW.to_user_id)::int,
+                following_count = following_count + (id = NEW.from_user_id)::int
+            WHERE id IN (NEW.from_user_id, NEW.to_user_id);
+        END IF;
+    END IF;""",
+)
+
+_POST_TRIGGER = _trigger(
+    "post",
+    "INSERT OR DELETE OR UPDATE OF deleted, user_id",
+    """
+    IF TG_OP <> 'INSERT' THEN
+        IF NOT OLD.deleted THEN
+            UPDATE "user" SET post_count = post_count - 1 WHERE id = OLD.user_id;
+        END IF;
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        IF NOT NEW.deleted THEN
+            UPDATE "user" SET post_count = post_count + 1 WHERE id = NEW.user_id;
+        END IF;
+    END IF;""",
+)
+
+_POST_LIKE_TRIGGER = _trigger(
+    "post_like",
+    "INSERT OR DELETE",
+    """
+    IF TG_OP = 'INSERT' THEN
+        UPDATE post SET like_count = like_count + 1 WHERE id = NEW.post_id;
+    ELSE
+        UPDATE post SET like_count = like_count - 1 WHERE id = OLD.post_id;
+    END IF;""",
+)
+
+_COMMENT_TRIGGER = _trigger(
+    "comment",
+    "INSERT OR DELETE OR UPDATE OF deleted, post_id",
+    """
+    IF TG_OP <> 'INSERT' THEN
+        IF NOT OLD.deleted THEN
+            UPDATE post SET comment_count = comment_count - 1 WHERE id = OLD.post_id;
+        END IF;
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        IF NOT NEW.deleted THEN
+            UPDATE post SET comment_count = comment_count + 1 WHERE id = NEW.post_id;
+        END IF;
+    END IF;""",
+)
+
+_COMMENT_LIKE_TRIGGER = _trigger(
+    "comment_like",
+    "INSERT OR DELETE",
+    """
+    IF TG_OP = 'INSERT' THEN
+        UPDATE comment SET like_count = like_count + 1 WHERE id = NEW.comment_id;
+    ELSE
+        UPDATE comment SET like_count = like_count - 1 WHERE id = OLD.comment_id;
+    END IF;""",
+)
+
+CREATE_COUNTER_TRIGGERS = [
+    *_FOLLOW_TRIGGER,
+    *_POST_TRIGGER,
+    *_POST_LIKE_TRIGGER,
+    *_COMMENT_TRIGGER,
+    *_COMMENT_LIKE_TRIGGER,
+]
+
+DROP_COUNTER_TRIGGERS = [
+    f"DROP FUNCTION IF EXISTS {table}_update_counts() CASCADE"
+    for table in ("follow", "post", "post_like", "comment", "comment_like")
+]
+
+
+def install_counter_triggers(metadata) -> None:
+    """Create the counter triggers whenever the schema is created from the models (new databases and tests)."""
+    for statement in CREATE_COUNTER_TRIGGERS:
+        event.listen(metadata, "after_create", DDL(statement))
+
+
+def reconcile_counters(
+    connection: Connection,
+    repair: bool = False,
+    counters: Sequence[Counter] = COUNTERS,
+    batch_size: int = REPAIR_BATCH_SIZE,
+) -> dict[str, int]:
+    """
+    Compare every stored count to the actual count, returning the number of rows that are off for each counter.
+
+    If repair is true, the stored counts are also corrected, `batch_size` rows at a time. Each batch locks its rows
+    before recounting them, so writes made since the check aren't overwritten with stale counts, and is committed, so
+    run it on a connection of its own.
+    """
+    drift = {}
+    for counter in counters:
+        name = f"{counter.table}.{counter.column}"
+        mismatched = f"""
+            SELECT actual.id FROM ({counter.actual_counts_query}) actual
+            JOIN "{counter.table}" t ON t.id = actual.id
+            WHERE t.{counter.column} <> actual.count
+        """
+        if not repair:
+            drift[name] = connection.execute(text(f"SELECT count(*) FROM ({mismatched}) m")).scalar_one()
+            continue
+        ids = connection.execute(text(f"{mismatched} ORDER BY actual.id")).scalars().all()
+        connection.commit()
+        drift[name] = 0
+        for start in range(0, len(ids), batch_size):
+            end = start + batch_size
+            batch = {"ids": ids[start:end]}
+            connection.execute(
+                text(f'SELECT id FROM "{counter.table}" WHERE id = ANY(:ids) ORDER BY id FOR UPDATE'), batch
+            )
+            # A new statement, so it counts the rows committed while waiting for the locks
+            recount = f"""
+                UPDATE "{counter.table}" t SET {counter.column} = actual.count
+                FROM ({counter.actual_counts_query}) actual
+                WHERE t.id = actual.id AND actual.id = ANY(:ids) AND t.{counter.column} <> actual.count
+            """
+            drift[name] += connection.execute(text(recount), batch).rowcount
+            connection.commit()
+    return drift
+
+
+async def main(repair: bool) -> None:
+    from app.core.database.engine import engine
+
+    async with engine.connect() as connection:
+        drift = await connection.run_sync(reconcile_counters, repair)
+    for name, rows in drift.items():
+        if rows:
+            log.warning("%s: %d rows %s", name, rows, "repaired" if repair else "out of sync")
+        else:
+            log.info("%s: ok", name)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the denormalized counters for drift.")
+    parser.add_argument("--repair", action="store_true", help="Fix any counts that are out of sync")
+    args = parser.parse_args()
+    asyncio.run(main(repair=args.repair))
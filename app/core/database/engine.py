@@ -1,20 +1,94 @@
+import math
+import time
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import AsyncGenerator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine, AsyncSession
-from app.core.config import SQLALCHEMY_DATABASE_URL
+from sqlalchemy.orm import ORMExecuteState, Session
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import cookie_parser
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import (
+    SQLALCHEMY_DATABASE_URL,
+    READ_REPLICA_DATABASE_URL,
+    DB_QUERY_CACHE_SIZE,
+    DB_PREPARED_STATEMENT_CACHE_SIZE,
+    BACKGROUND_DB_POOL_SIZE,
+    BACKGROUND_DB_POOL_TIMEOUT_SECONDS,
+    DB_TAG_QUERIES,
+)
+from app.core.database.pool_stats import PoolStats, WaitTrackingQueuePool, get_pool_stats
+from app.core.database.query_stats import instrument_engine
+from app.core.database.query_tags import tag_queries
+from app.core.database.statement_cache import StatementCacheMonitor
 
 # Some information about pool sizing: https://github.com/brettwooldridge/HikariCP/wiki/About-Pool-Sizing
 engine = create_async_engine(
     SQLALCHEMY_DATABASE_URL,
+    poolclass=WaitTrackingQueuePool,
     pool_size=16,
     max_overflow=0,
     pool_timeout=15,  # seconds
     pool_recycle=1800,
     pool_pre_ping=True,
     echo=False,
+    query_cache_size=DB_QUERY_CACHE_SIZE,
+    connect_args={"prepared_statement_cache_size": DB_PREPARED_STATEMENT_CACHE_SIZE},
 )
+instrument_engine(engine.sync_engine)
+statement_cache_monitors = [StatementCacheMonitor("primary", engine.sync_engine)]
 SessionLocal = async_sessionmaker(engine, autocommit=False, autoflush=False, class_=AsyncSession)  # type: ignore
 
+# Read replica, if configured. Otherwise reads go to the primary.
+read_engine = (
+    create_async_engine(
+        READ_REPLICA_DATABASE_URL,
+        poolclass=WaitTrackingQueuePool,
+        pool_size=16,
+        max_overflow=0,
+        pool_timeout=15,  # seconds
+        pool_recycle=1800,
+        pool_pre_ping=True,
+        echo=False,
+        query_cache_size=DB_QUERY_CACHE_SIZE,
+        connect_args={"prepared_statement_cache_size": DB_PREPARED_STATEMENT_CACHE_SIZE},
+    )
+    if READ_REPLICA_DATABASE_URL
+    else None
+)
+if read_engine is not None:
+    instrument_engine(read_engine.sync_engine)
+    statement_cache_monitors.append(StatementCacheMonitor("replica", read_engine.sync_engine))
+
+# Separate pool for background tasks (notifications, place metadata, etc.), so they don't compete with requests
+background_engine = create_async_engine(
+    SQLALCHEMY_DATABASE_URL,
+    poolclass=WaitTrackingQueuePool,
+    pool_size=BACKGROUND_DB_POOL_SIZE,
+    max_overflow=0,
+    pool_timeout=BACKGROUND_DB_POOL_TIMEOUT_SECONDS,
+    pool_recycle=1800,
+    pool_pre_ping=True,
+    echo=False,
+    query_cache_size=DB_QUERY_CACHE_SIZE,
+    connect_args={"prepared_statement_cache_size": DB_PREPARED_STATEMENT_CACHE_SIZE},
+)
+instrument_engine(background_engine.sync_engine)
+statement_cache_monitors.append(StatementCacheMonitor("background", background_engine.sync_engine))
+BackgroundSessionLocal = async_sessionmaker(
+    background_engine, autocommit=False, autoflush=False, class_=AsyncSession
+)  # type: ignore
+
+if DB_TAG_QUERIES:
+    for tagged_engine in (engine, read_engine, background_engine):
+        if tagged_engine is not None:
+            tag_queries(tagged_engine.sync_engine)
+
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with get_db_context() as db:
@@ -28,3 +102,147 @@ async def get_db_context():
         yield db
     finally:
         await db.close()
+
+
+@asynccontextmanager
+async def get_background_db_context():
+    """Session for background tasks, from the background pool."""
+    db: AsyncSession = BackgroundSessionLocal()
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+def get_asyncpg_dsn() -> str:
+    """Return the database URL for connecting with asyncpg directly, outside the pools."""
+    return make_url(SQLALCHEMY_DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+def get_all_pool_stats() -> list[PoolStats]:
+    stats = [get_pool_stats("primary", engine), get_pool_stats("background", background_engine)]
+    if read_engine is not None:
+        stats.append(get_pool_stats("replica", read_engine))
+    return stats
+
+
+def get_request_pool_wait_seconds() -> float:
+    """Return how long the longest waiting request has been waiting for a connection."""
+    engines = [engine] if read_engine is None else [engine, read_engine]
+    return max(e.pool.longest_wait_seconds() for e in engines)  # type: ignore
+
+
+# region Read replica routing
+
+
+@dataclass
+class _RequestState:
+    wrote_recently: bool = False
+    wrote: bool = False
+
+    @property
+    def use_primary(self) -> bool:
+        return self.wrote_recently or self.wrote
+
+
+_request_state: ContextVar[Optional[_RequestState]] = ContextVar("_request_state", default=None)
+
+
+class ReadSession(Session):
+    """
+    Session that reads from the replica, unless the current request (or a recent request from the same client) wrote
+    to the primary, in which case it reads from the primary so the client sees its own writes.
+    """
+
+    def get_bind(self, *args, **kwargs):
+        state = _request_state.get()
+        if read_engine is None or (state is not None and state.use_primary):
+            return engine.sync_engine
+        return read_engine.sync_engine
+
+
+ReadSessionLocal = async_sessionmaker(
+    autocommit=False, autoflush=False, class_=AsyncSession, sync_session_class=ReadSession
+)  # type: ignore
+
+
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """Session for read-only stores and routes. Never write with it."""
+    db: AsyncSession = ReadSessionLocal() if read_engine is not None else SessionLocal()
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+def _mark_write() -> None:
+    state = _request_state.get()
+    if state is not None:
+        state.wrote = True
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(_session: Session, _flush_context) -> None:
+    _mark_write()
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _on_execute(orm_execute_state: ORMExecuteState) -> None:
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _mark_write()
+
+
+class StickToPrimaryMiddleware:
+    """
+    Send a client's reads to the primary for a while after it writes, until the replica catches up.
+
+    The time of the client's last write is carried by a short-lived cookie rather than kept in the worker, so whichever
+    worker handles the client's next request sends its reads to the primary.
+    """
+
+    COOKIE_NAME = "last_write"
+    # How far ahead of this worker's clock another worker's clock may be
+    CLOCK_SKEW_SECONDS = 1.0
+
+    def __init__(self, app: ASGIApp, window_seconds: float):
+        self.app = app
+        self.window_seconds = window_seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or read_engine is None:
+            await self.app(scope, receive, send)
+            return
+        state = _RequestState(wrote_recently=self._wrote_recently(scope))
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and state.wrote:
+                headers = MutableHeaders(scope=message)
+                headers.append("set-cookie", self._cookie())
+            await send(message)
+
+        token = _request_state.set(state)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_state.reset(token)
+
+    def _cookie(self) -> str:
+        # Rounded down, so the next request never sees the write as being in the future
+        last_write = math.floor(time.time() * 1000) / 1000
+        return (
+            f"{self.COOKIE_NAME}={last_write}; Max-Age={math.ceil(self.window_seconds)}; Path=/; HttpOnly; SameSite=Lax"
+        )
+
+    def _wrote_recently(self, scope: Scope) -> bool:
+        cookie = Headers(scope=scope).get("cookie")
+        if cookie is None:
+            return False
+        try:
+            last_write = float(cookie_parser(cookie)[self.COOKIE_NAME])
+        except (KeyError, ValueError):
+            return False
+        # The cookie comes from the client, so a time in the future doesn't keep it on the primary for longer
+        return -self.CLOCK_SKEW_SECONDS <= time.time() - last_write < self.window_seconds
+
+
+# endregion
@@ -1,7 +1,8 @@
 from psycopg2.errorcodes import UNIQUE_VIOLATION  # type: ignore
-from sqlalchemy import and_, exists
+from sqlalchemy import and_, any_, bindparam, exists, literal_column
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import joinedload, undefer
+from sqlalchemy.orm import joinedload
 
 from app.core.types import UserId
 from app.core.database.models import CommentRow, CommentLikeRow, PostRow, UserRow
@@ -16,18 +17,33 @@ def is_comment_liked_query(user_id: UserId):
     )
 
 
+def post_has_image_or_content():
+    """
+    Return a clause for posts with an image or some text.
+
+    The empty string is rendered inline rather than bound so postgres can match this to the predicate of the
+    idx_post_id_with_content partial index, whatever the parameters of the prepared statement.
+    """
+    return PostRow.image_id.is_not(None) | (PostRow.content != literal_column("''"))
+
+
+def in_array(column, name: str):
+    """
+    Return a `column = ANY(:name)` clause, where `name` is bound to a list of values when executing the query.
+
+    Unlike `column.in_(values)`, the SQL doesn't depend on the number of values, so a single compiled statement and
+    prepared statement serve lists of any length.
+    """
+    return column == any_(bindparam(name, type_=ARRAY(column.type)))
+
+
 def eager_load_post_options():
     """Return the options to eagerly load a post's attributes."""
     return (
         joinedload(PostRow.user, innerjoin=True),
         joinedload(PostRow.user, innerjoin=True).joinedload(UserRow.profile_picture),
-        joinedload(PostRow.user, innerjoin=True).undefer(UserRow.post_count),
-        joinedload(PostRow.user, innerjoin=True).undefer(UserRow.following_count),
-        joinedload(PostRow.user, innerjoin=True).undefer(UserRow.follower_count),
         joinedload(PostRow.place, innerjoin=True),
         joinedload(PostRow.image),
-        undefer(PostRow.like_count),
-        undefer(PostRow.comment_count),
     )
 
 
@@ -36,21 +52,12 @@ def eager_load_comment_options():
     return (
         joinedload(CommentRow.user, innerjoin=True),
         joinedload(CommentRow.user, innerjoin=True).joinedload(UserRow.profile_picture),
-        joinedload(CommentRow.user, innerjoin=True).undefer(UserRow.post_count),
-        joinedload(CommentRow.user, innerjoin=True).undefer(UserRow.following_count),
-        joinedload(CommentRow.user, innerjoin=True).undefer(UserRow.follower_count),
-        undefer(CommentRow.like_count),
     )
 
 
 def eager_load_user_options():
     """Return the options to eagerly load a user's public attributes."""
-    return (
-        joinedload(UserRow.profile_picture),
-        undefer(UserRow.post_count),
-        undefer(UserRow.following_count),
-        undefer(UserRow.follower_count),
-    )
+    return (joinedload(UserRow.profile_picture),)
 
 
 def is_unique_constraint_error(e: IntegrityError, constraint_name: str) -> bool:
@@ -3,13 +3,14 @@ from typing import Any
 
 from geoalchemy2 import Geography  # type: ignore
 from sqlalchemy import (
+    Column,
+    Table,
     Enum,
     DateTime,
     Boolean,
     ForeignKey,
     Integer,
     Text,
-    select,
     func,
     Float,
     Computed,
@@ -17,19 +18,20 @@ from sqlalchemy import (
     Index,
     false,
     true,
+    literal_column,
 )
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy.orm import (
     relationship,
-    column_property,
-    aliased,
     declarative_base,
     Mapped,
     mapped_column,
 )
 from sqlalchemy.sql import expression
+from app.core.database.counters import install_counter_triggers
 from app.core.database.defaults import gen_ulid
+from app.core.database.partitioning import PARTITIONED_TABLES, install_partitions
 
 
 Base: Any = declarative_base()
@@ -45,7 +47,10 @@ class UserRelationRow(Base):
     __tablename__ = "follow"
 
     id = mapped_column(UUID(as_uuid=True), primary_key=True, default=gen_ulid)
-    from_user_id = mapped_column(UUID(as_uuid=True), ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
+    # Partition key, see app/core/database/partitioning.py
+    from_user_id = mapped_column(
+        UUID(as_uuid=True), ForeignKey("user.id", ondelete="CASCADE"), primary_key=True, nullable=False
+    )
     to_user_id = mapped_column(UUID(as_uuid=True), ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
     relation = mapped_column(Enum(UserRelationType), nullable=False)
     created_at = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
@@ -54,6 +59,7 @@ class UserRelationRow(Base):
         UniqueConstraint("from_user_id", "to_user_id", name="_from_user_to_user_uc"),
         Index("user_relation_to_user_id_relation_idx", to_user_id, relation),
         Index("user_relation_from_user_id_relation_idx", from_user_id, relation),
+        {"postgresql_partition_by": "HASH (from_user_id)"},
     )
 
 
@@ -88,10 +94,10 @@ class UserRow(Base):
     profile_picture_url = association_proxy("profile_picture", "url")
     profile_picture_blob_name = association_proxy("profile_picture", "blob_name")
 
-    # Computed column properties (set at end of file)
-    # post_count: Mapped[int]
-    # follower_count: Mapped[int]
-    # following_count: Mapped[int]
+    # Counts maintained by triggers, see app/core/database/counters.py
+    post_count = mapped_column(Integer, nullable=False, server_default="0")
+    follower_count = mapped_column(Integer, nullable=False, server_default="0")
+    following_count = mapped_column(Integer, nullable=False, server_default="0")
 
 
 class FCMTokenRow(Base):
@@ -188,6 +194,7 @@ class PlaceSaveRow(Base):
     __table_args__ = (
         UniqueConstraint(user_id, place_id, name="_place_save_user_place_uc"),
         Index("idx_place_save_place_id", place_id),
+        Index("idx_place_save_user_id_id", user_id, id.desc()),
     )
 
 
@@ -265,9 +272,9 @@ class PostRow(Base):
     image_url = association_proxy("image", "url")
     image_blob_name = association_proxy("image", "blob_name")
 
-    # Computed column properties (set at end of file)
-    # like_count: Mapped[int]
-    # comment_count: Mapped[int]
+    # Counts maintained by triggers, see app/core/database/counters.py
+    like_count = mapped_column(Integer, nullable=False, server_default="0")
+    comment_count = mapped_column(Integer, nullable=False, server_default="0")
 
     # Only want one row per (user, place) pair for all non-deleted posts
     user_place_uc = "_posts_user_place_uc"
@@ -278,6 +285,14 @@ class PostRow(Base):
             name=user_place_uc,
         ),
         Index("idx_post_place_id", "place_id"),
+        # Partial indexes for the (non-deleted) post lists, which are all ordered by id desc
+        Index("idx_post_user_id_id", user_id, id.desc(), postgresql_where=~deleted),
+        Index("idx_post_place_id_id", place_id, id.desc(), postgresql_where=~deleted),
+        Index(
+            "idx_post_id_with_content",
+            id.desc(),
+            postgresql_where=~deleted & (image_id.is_not(None) | (content != literal_column("''"))),
+        ),
     )
 
 
@@ -286,7 +301,10 @@ class PostLikeRow(Base):
 
     id = mapped_column(UUID(as_uuid=True), primary_key=True, default=gen_ulid)
     user_id = mapped_column(UUID(as_uuid=True), ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
-    post_id = mapped_column(UUID(as_uuid=True), ForeignKey("post.id", ondelete="CASCADE"), nullable=False)
+    # Partition key, see app/core/database/partitioning.py
+    post_id = mapped_column(
+        UUID(as_uuid=True), ForeignKey("post.id", ondelete="CASCADE"), primary_key=True, nullable=False
+    )
     created_at = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
 
     liked_by: Mapped[UserRow] = relationship("UserRow")
@@ -295,6 +313,7 @@ class PostLikeRow(Base):
     __table_args__ = (
         UniqueConstraint("user_id", "post_id", name="_post_like_user_post_uc"),
         Index("post_like_post_id_idx", post_id),
+        {"postgresql_partition_by": "HASH (post_id)"},
     )
 
 
@@ -341,11 +360,17 @@ class CommentLikeRow(Base):
 
     id = mapped_column(UUID(as_uuid=True), primary_key=True, default=gen_ulid)
     user_id = mapped_column(UUID(as_uuid=True), ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
-    comment_id = mapped_column(UUID(as_uuid=True), ForeignKey("comment.id", ondelete="CASCADE"), nullable=False)
+    # Partition key, see app/core/database/partitioning.py
+    comment_id = mapped_column(
+        UUID(as_uuid=True), ForeignKey("comment.id", ondelete="CASCADE"), primary_key=True, nullable=False
+    )
     created_at = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
 
     # Only want one row per (user, comment) pair
-    __table_args__ = (UniqueConstraint("user_id", "comment_id", name="_comment_like_user_post_uc"),)
+    __table_args__ = (
+        UniqueConstraint("user_id", "comment_id", name="_comment_like_user_post_uc"),
+        {"postgresql_partition_by": "HASH (comment_id)"},
+    )
 
 
 class CommentRow(Base):
@@ -367,10 +392,10 @@ class CommentRow(Base):
 
     user: Mapped[UserRow] = relationship("UserRow")
 
-    # Computed column properties (set at end of file)
-    # like_count: Mapped[int]
+    # Counts maintained by triggers, see app/core/database/counters.py
+    like_count = mapped_column(Integer, nullable=False, server_default="0")
 
-    __table_args__ = (Index("comment_post_id_idx", post_id),)
+    __table_args__ = (Index("idx_comment_post_id_id", post_id, id),)
 
 
 # endregion Comments
@@ -400,60 +425,97 @@ class FeedbackRow(Base):
     user: Mapped[UserRow] = relationship("UserRow")
 
 
-# Column properties
-
-# Need aliases so multiple properties on the same model don't interfere and mess up the joins
-PostRowAlias = aliased(PostRow)
-RelationRowAlias = aliased(UserRelationRow)
-PostLikeAlias = aliased(PostLikeRow)
+# region Archive
+def _archive_table(table: Table, *indexed_columns: str) -> Table:
+    """
+    Return the archive of the given table: the same columns and primary key, without the unique constraints (which
+    only apply to the hot tables). Foreign keys to users and to archived tables become cascading foreign keys to users
+    and to the archives, so hard-deleting a user also deletes their archived rows and the rows that belong to them.
+    """
+    columns = []
+    for column in table.columns:
+        foreign_keys = []
+        for fk in column.foreign_keys:
+            referenced = fk.column.table.name
+            if referenced == "user":
+                foreign_keys.append(ForeignKey("user.id", ondelete="CASCADE"))
+            elif f"{referenced}_archive" in Base.metadata.tables:
+                foreign_keys.append(ForeignKey(f"{referenced}_archive.id", ondelete="CASCADE"))
+        columns.append(
+            Column(column.name, column.type, *foreign_keys, primary_key=column.primary_key, nullable=column.nullable)
+        )
+    archive = Table(f"{table.name}_archive", Base.metadata, *columns)
+    for column_name in indexed_columns:
+        Index(f"idx_{archive.name}_{column_name}", archive.c[column_name])
+    return archive
+
+
+# Deleted posts, and the rows that belong to them, are moved here, see app/features/posts/archive.py
+post_archive = _archive_table(PostRow.__table__)
+post_like_archive = _archive_table(PostLikeRow.__table__, "post_id")
+post_save_archive = _archive_table(PostSaveRow.__table__, "post_id")
+post_report_archive = _archive_table(PostReportRow.__table__, "post_id")
+comment_archive = _archive_table(CommentRow.__table__, "post_id")
+comment_like_archive = _archive_table(CommentLikeRow.__table__, "comment_id")
+# endregion Archive
+
+
+# region Jobs
+class JobStatus(enum.Enum):
+    queued = "queued"
+    running = "running"
+    done = "done"
+    # Failed too many times (or can't run at all), kept until an admin retries or deletes it
+    dead = "dead"
+
+
+class JobRow(Base):
+    """Background job, see app/tasks/queue.py."""
+
+    __tablename__ = "job"
 
-# Users
-UserRow.post_count = column_property(
-    select(func.count()).where(PostRowAlias.user_id == UserRow.id, ~PostRowAlias.deleted).scalar_subquery(),
-    deferred=True,
-)
+    id = mapped_column(UUID(as_uuid=True), primary_key=True, default=gen_ulid)
+    # Name of the task function
+    type = mapped_column(Text, nullable=False)
+    # Arguments of the task function
+    payload = mapped_column(JSONB, nullable=False)
+    status = mapped_column(Enum(JobStatus), nullable=False, server_default=JobStatus.queued.name)
+    attempts = mapped_column(Integer, nullable=False, server_default="0")
+    max_attempts = mapped_column(Integer, nullable=False)
+    # Not claimed before this time, pushed back after each failed attempt
+    run_at = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    # Start of the latest attempt
+    started_at = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at = mapped_column(DateTime(timezone=True), nullable=True)
+    last_error = mapped_column(Text, nullable=True)
+    created_at = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
 
-UserRow.follower_count = column_property(
-    select(func.count())
-    .select_from(RelationRowAlias)
-    .where(
-        RelationRowAlias.to_user_id == UserRow.id,
-        RelationRowAlias.relation == UserRelationType.following,
+    __table_args__ = (
+        Index("idx_job_queued_run_at", run_at, postgresql_where=status == JobStatus.queued.name),
+        Index("idx_job_running_started_at", started_at, postgresql_where=status == JobStatus.running.name),
+        Index("idx_job_finished_at", finished_at),
     )
-    .scalar_subquery(),
-    deferred=True,
-)
 
-UserRow.following_count = column_property(
-    select(func.count())
-    .select_from(RelationRowAlias)
-    .where(
-        RelationRowAlias.from_user_id == UserRow.id,
-        RelationRowAlias.relation == UserRelationType.following,
-    )
-    .scalar_subquery(),
-    deferred=True,
-)
 
-# Posts
-PostRow.like_count = column_property(
-    select(func.count()).select_from(PostLikeAlias).where(PostRow.id == PostLikeAlias.post_id).scalar_subquery(),
-    deferred=True,
-)
+class MaintenanceRunRow(Base):
+    """Latest run of each periodic maintenance job, see app/core/scheduler.py."""
 
-PostRow.comment_count = column_property(
-    select(func.count())
-    .select_from(CommentRow)
-    .where(PostRow.id == CommentRow.post_id, ~CommentRow.deleted)
-    .scalar_subquery(),
-    deferred=True,
-)
+    __tablename__ = "maintenance_run"
 
-# Comments
-CommentRow.like_count = column_property(
-    select(func.count())
-    .select_from(CommentLikeRow)
-    .where(CommentRow.id == CommentLikeRow.comment_id)
-    .scalar_subquery(),
-    deferred=True,
-)
+    name = mapped_column(Text, primary_key=True)
+    runs = mapped_column(Integer, nullable=False, server_default="0")
+    last_started_at = mapped_column(DateTime(timezone=True), nullable=True)
+    last_finished_at = mapped_column(DateTime(timezone=True), nullable=True)
+    last_duration_ms = mapped_column(Float, nullable=True)
+    last_rows = mapped_column(Integer, nullable=True)
+    last_error = mapped_column(Text, nullable=True)
+    # Where the job stopped when it ran out of time, it picks up from here on the next run
+    cursor = mapped_column(Text, nullable=True)
+
+
+# endregion Jobs
+
+
+install_counter_triggers(Base.metadata)
+for partitioned_table in PARTITIONED_TABLES:
+    install_partitions(Base.metadata.tables[partitioned_table.name])
@@ -0,0 +1,68 @@
+"""
+Run independent read queries concurrently, each on its own session (and connection).
+
+A session (and its connection) can only run one query at a time, so gathering several store calls on one session is
+not supported. gather_reads gives each branch a short-lived session bound like the request's session instead.
+"""
+
+import asyncio
+import copy
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import DB_MAX_PARALLEL_READS_PER_REQUEST
+from app.core.database.pool_stats import checkout_without_waiting
+
+T = TypeVar("T")
+Read = Callable[[AsyncSession], Awaitable[Any]]
+
+# Limits the branches of all the gather_reads calls of a request (the task that first called it, and its subtasks)
+_limiter: ContextVar[Optional[asyncio.Semaphore]] = ContextVar("_parallel_reads_limiter", default=None)
+_in_branch: ContextVar[bool] = ContextVar("_parallel_reads_in_branch", default=False)
+
+
+def on_session(store: T, db: AsyncSession) -> T:
+    """Return a copy of the store that runs its queries on the given session."""
+    store = copy.copy(store)
+    store.db = db  # type: ignore
+    return store
+
+
+async def gather_reads(db: AsyncSession, *reads: Read) -> list[Any]:
+    """
+    Run the reads concurrently and return their results in order. Each read is called with the session to use.
+
+    Branches only see committed data, so don't read what the request wrote but hasn't committed. At most
+    DB_MAX_PARALLEL_READS_PER_REQUEST branches per request hold their own connection at a time. If the pool has no
+    spare connection when a branch checks one out (only WaitTrackingQueuePool pools can tell), the branch runs on the
+    request's session instead of waiting for one, so requests holding a connection never wait on each other for a second
+    one. gather_reads called from a branch runs its reads one after the other.
+    """
+    if len(reads) <= 1 or _in_branch.get():
+        return [await read(db) for read in reads]
+    limiter = _limiter.get()
+    if limiter is None:
+        limiter = asyncio.Semaphore(DB_MAX_PARALLEL_READS_PER_REQUEST)
+        _limiter.set(limiter)
+    lock: asyncio.Lock = db.info.setdefault("parallel_reads_lock", asyncio.Lock())
+
+    async def run(read: Read) -> Any:
+        # Each branch runs in its own task, so this doesn't leak into the caller
+        _in_branch.set(True)
+        async with limiter:
+            branch_db = AsyncSession(bind=db.bind, sync_session_class=type(db.sync_session))
+            try:
+                with checkout_without_waiting():
+                    await branch_db.connection()
+            except exc.TimeoutError:
+                await branch_db.close()
+            else:
+                async with branch_db:
+                    return await read(branch_db)
+        async with lock:
+            return await read(db)
+
+    return list(await asyncio.gather(*(run(read) for read in reads)))
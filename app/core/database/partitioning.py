@@ -0,0 +1,205 @@
+"""
+Hash partitioning of the fastest growing tables (post and comment likes, and follows).
+
+Each table is split into PARTITIONS partitions by the column most of its lookups filter on, so those lookups only touch
+one partition (with indexes a fraction of the size). Postgres requires the primary key and the unique constraints of a
+partitioned table to include the partition key, so the primary keys are (id, partition key).
+
+Existing tables are converted online (see the add_hash_partitions migration):
+  1. Create the partitioned table next to the existing one, under a temporary name.
+  2. Mirror the writes made to the existing table into the new one with a trigger.
+  3. Copy the existing rows in batches, each in its own transaction, locking the rows being copied so they can't
+     change while they're copied.
+  4. Check the copy has every row, then swap the tables (and their partition and constraint names) in a short
+     transaction per table, and drop the old table.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import DDL, Table, event, text
+from sqlalchemy.engine import Connection
+
+from app.utils import get_logger
+
+log = get_logger(__name__)
+
+PARTITIONS = 16
+COPY_BATCH_SIZE = 10000
+# Smaller than every (ULID) id, where copying starts
+FIRST_ID = "00000000-0000-0000-0000-000000000000"
+# Suffix of the partitioned tables (and their index-backed constraints) while they're being filled
+_NEW = "_partitioned"
+
+
+@dataclass(frozen=True)
+class PartitionedTable:
+    name: str
+    partition_key: str
+    columns: tuple[str, ...]
+    # (name, columns) of the unique constraints, which must include the partition key
+    unique_constraints: tuple[tuple[str, str], ...]
+    # (name, columns) of the other indexes
+    indexes: tuple[tuple[str, str], ...]
+    # (column, referenced table) of the foreign keys, all on delete cascade
+    foreign_keys: tuple[tuple[str, str], ...]
+
+    @property
+    def primary_key(self) -> str:
+        return f"{self.name}_pkey"
+
+
+PARTITIONED_TABLES = [
+    PartitionedTable(
+        name="post_like",
+        partition_key="post_id",
+        columns=("id", "user_id", "post_id", "created_at"),
+        unique_constraints=(("_post_like_user_post_uc", "user_id, post_id"),),
+        indexes=(("post_like_post_id_idx", "post_id"),),
+        foreign_keys=(("user_id", "user"), ("post_id", "post")),
+    ),
+    PartitionedTable(
+        name="comment_like",
+        partition_key="comment_id",
+        columns=("id", "user_id", "comment_id", "created_at"),
+        unique_constraints=(("_comment_like_user_post_uc", "user_id, comment_id"),),
+        indexes=(),
+        foreign_keys=(("user_id", "user"), ("comment_id", "comment")),
+    ),
+    PartitionedTable(
+        name="follow",
+        partition_key="from_user_id",
+        columns=("id", "from_user_id", "to_user_id", "relation", "created_at"),
+        unique_constraints=(("_from_user_to_user_uc", "from_user_id, to_user_id"),),
+        indexes=(
+            ("user_relation_to_user_id_relation_idx", "to_user_id, relation"),
+            ("user_relation_from_user_id_relation_idx", "from_user_id, relation"),
+        ),
+        foreign_keys=(("from_user_id", "user"), ("to_user_id", "user")),
+    ),
+]
+
+
+def create_partitions_statements(table: str, partitions: int = PARTITIONS) -> list[str]:
+    return [
+        f"CREATE TABLE {table}_p{i} PARTITION OF {table} FOR VALUES WITH (MODULUS {partitions}, REMAINDER {i})"
+        for i in range(partitions)
+    ]
+
+
+def install_partitions(table: Table) -> None:
+    """Create the partitions of the given (partitioned) table whenever it's created from the models."""
+    for statement in create_partitions_statements(table.name):
+        event.listen(table, "after_create", DDL(statement))
+
+
+# region Online conversion
+
+
+def create_partitioned_copy(connection: Connection, table: PartitionedTable) -> None:
+    """Create an empty partitioned copy of the table and start mirroring the table's writes into it."""
+    new_table = table.name + _NEW
+    statements = [
+        f"CREATE TABLE {new_table} (LIKE {table.name} INCLUDING DEFAULTS) PARTITION BY HASH ({table.partition_key})",
+        *create_partitions_statements(new_table),
+        f"ALTER TABLE {new_table} ADD CONSTRAINT {table.primary_key}{_NEW} PRIMARY KEY (id, {table.partition_key})",
+        *(
+            f"ALTER TABLE {new_table} ADD CONSTRAINT {name}{_NEW} UNIQUE ({columns})"
+            for name, columns in table.unique_constraints
+        ),
+        *(f"CREATE INDEX {name}{_NEW} ON {new_table} ({columns})" for name, columns in table.indexes),
+        *(
+            f"ALTER TABLE {new_table} ADD CONSTRAINT {table.name}_{column}_fkey FOREIGN KEY ({column}) "
+            f'REFERENCES "{referenced}" (id) ON DELETE CASCADE'
+            for column, referenced in table.foreign_keys
+        ),
+        *_mirror_trigger_statements(table),
+    ]
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+def _mirror_trigger_statements(table: PartitionedTable) -> list[str]:
+    new_table = table.name + _NEW
+    columns = ", ".join(table.columns)
+    new_values = ", ".join(f"NEW.{column}" for column in table.columns)
+    delete_old = f"DELETE FROM {new_table} WHERE id = OLD.id AND {table.partition_key} = OLD.{table.partition_key};"
+    insert_new = f"INSERT INTO {new_table} ({columns}) VALUES ({new_values}) ON CONFLICT DO NOTHING;"
+    function_name = f"{table.name}_mirror_writes"
+    return [
+        f"CREATE OR REPLACE FUNCTION {function_name}() RETURNS trigger AS $$\nBEGIN\n"
+        f"    IF TG_OP <> 'INSERT' THEN\n        {delete_old}\n    END IF;\n"
+        f"    IF TG_OP <> 'DELETE' THEN\n        {insert_new}\n    END IF;\n"
+        "    RETURN NULL;\nEND;\n$$ LANGUAGE plpgsql",
+        f"CREATE TRIGGER {function_name} AFTER INSERT OR UPDATE OR DELETE ON {table.name} "
+        f"FOR EACH ROW EXECUTE FUNCTION {function_name}()",
+    ]
+
+
+def copy_batch(
+    connection: Connection, table: PartitionedTable, after_id: str = FIRST_ID, batch_size: int = COPY_BATCH_SIZE
+) -> Optional[str]:
+    """
+    Copy the next batch of rows (by id) into the partitioned copy, returning the last id copied or None when done.
+
+    The rows are locked while they're copied, so a concurrent update or delete either finishes first (and its changed
+    row is copied) or waits for the batch and is then mirrored by the trigger. Run each batch in its own transaction.
+    """
+    columns = ", ".join(table.columns)
+    result = connection.execute(
+        text(
+            f"""
+            WITH batch AS (
+                SELECT {columns} FROM {table.name}
+                WHERE id > CAST(:after_id AS uuid)
+                ORDER BY id LIMIT :batch_size
+                FOR SHARE
+            ), copied AS (
+                INSERT INTO {table.name}{_NEW} ({columns}) SELECT {columns} FROM batch ON CONFLICT DO NOTHING
+            )
+            SELECT max(id::text) FROM batch
+            """
+        ),
+        {"after_id": after_id, "batch_size": batch_size},
+    )
+    return result.scalar()
+
+
+def check_partitioned_copy(connection: Connection, table: PartitionedTable) -> int:
+    """
+    Check the partitioned copy has as many rows as the table, and return that number. Run before swapping them, it
+    counts both tables without locking them (in one snapshot, in which the trigger keeps them in sync).
+    """
+    new_table = table.name + _NEW
+    counts = connection.execute(text(f"SELECT (SELECT count(*) FROM {table.name}), (SELECT count(*) FROM {new_table})"))
+    old_count, new_count = counts.one()
+    if old_count != new_count:
+        raise RuntimeError(f"{new_table} has {new_count} rows but {table.name} has {old_count}, not swapping")
+    return new_count
+
+
+def swap_partitioned_copy(connection: Connection, table: PartitionedTable) -> None:
+    """
+    Replace the table with its (filled and checked) partitioned copy. Run in a transaction of its own, it locks the
+    table until it commits. The table's triggers are dropped with it, recreate them in the same transaction.
+    """
+    new_table = table.name + _NEW
+    statements = [
+        f"LOCK TABLE {table.name} IN ACCESS EXCLUSIVE MODE",
+        f"DROP TABLE {table.name}",
+        f"DROP FUNCTION {table.name}_mirror_writes()",
+        f"ALTER TABLE {new_table} RENAME TO {table.name}",
+        *(f"ALTER TABLE {new_table}_p{i} RENAME TO {table.name}_p{i}" for i in range(PARTITIONS)),
+        f"ALTER TABLE {table.name} RENAME CONSTRAINT {table.primary_key}{_NEW} TO {table.primary_key}",
+        *(
+            f"ALTER TABLE {table.name} RENAME CONSTRAINT {name}{_NEW} TO {name}"
+            for name, _columns in table.unique_constraints
+        ),
+        *(f"ALTER INDEX {name}{_NEW} RENAME TO {name}" for name, _columns in table.indexes),
+    ]
+    for statement in statements:
+        connection.execute(text(statement))
+    log.info("Partitioned %s", table.name)
+
+
+# endregion
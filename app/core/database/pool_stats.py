@@ -0,0 +1,86 @@
+"""Connection pool usage, to tell whether requests or background tasks are waiting on connections."""
+
+import itertools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.util import queue as sqla_queue
+
+from app.core.types import Base
+
+_checkout_without_waiting: ContextVar[bool] = ContextVar("_checkout_without_waiting", default=False)
+
+
+class PoolStats(Base):
+    name: str
+    size: int
+    checked_out: int
+    checked_in: int
+    overflow: int
+    waiting: int
+    longest_wait_ms: float
+
+
+@contextmanager
+def checkout_without_waiting():
+    """Make WaitTrackingQueuePool checkouts in this context raise TimeoutError instead of waiting for a connection."""
+    token = _checkout_without_waiting.set(True)
+    try:
+        yield
+    finally:
+        _checkout_without_waiting.reset(token)
+
+
+class WaitTrackingQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that tracks the checkouts waiting for a connection, and since when. Checkouts in checkout_without_waiting
+    fail right away when the pool is exhausted.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._checkout_ids = itertools.count()
+        self._waiting_since: dict[int, float] = {}
+
+    def _do_get(self):
+        if _checkout_without_waiting.get():
+            try:
+                return self._pool.get(block=False)
+            except sqla_queue.Empty:
+                pass
+            if 0 <= self._max_overflow <= self._overflow:
+                raise exc.TimeoutError(f"QueuePool limit of size {self.size()} overflow {self.overflow()} reached")
+            # Opens an overflow connection
+        checkout_id = next(self._checkout_ids)
+        self._waiting_since[checkout_id] = time.monotonic()
+        try:
+            return super()._do_get()
+        finally:
+            del self._waiting_since[checkout_id]
+
+    def waiting(self) -> int:
+        return len(self._waiting_since)
+
+    def longest_wait_seconds(self) -> float:
+        """Return how long the longest waiting checkout has been waiting, or 0 if no checkout is waiting."""
+        waiting_since = list(self._waiting_since.values())
+        return time.monotonic() - min(waiting_since) if waiting_since else 0.0
+
+
+def get_pool_stats(name: str, engine: AsyncEngine) -> PoolStats:
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return PoolStats(name=name, size=0, checked_out=0, checked_in=0, overflow=0, waiting=0, longest_wait_ms=0)
+    return PoolStats(
+        name=name,
+        size=pool.size(),
+        checked_out=pool.checkedout(),
+        checked_in=pool.checkedin(),
+        overflow=max(pool.overflow(), 0),
+        waiting=pool.waiting() if isinstance(pool, WaitTrackingQueuePool) else 0,
+        longest_wait_ms=pool.longest_wait_seconds() * 1000 if isinstance(pool, WaitTrackingQueuePool) else 0,
+    )
@@ -0,0 +1,112 @@
+"""Per-request SQL statistics (number of queries, time spent in the database and the slowest statement)."""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    total_seconds: float = 0.0
+    slowest_seconds: float = 0.0
+    slowest_statement: Optional[str] = None
+    # Number of statements currently running
+    in_flight: int = 0
+    # Stats of the enclosing block, which also include these queries
+    parent: Optional["QueryStats"] = None
+
+    def started(self) -> None:
+        self.in_flight += 1
+        if self.parent is not None:
+            self.parent.started()
+
+    def failed(self) -> None:
+        self.in_flight -= 1
+        if self.parent is not None:
+            self.parent.failed()
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.in_flight -= 1
+        self.count += 1
+        self.total_seconds += seconds
+        if seconds >= self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = statement
+        if self.parent is not None:
+            self.parent.record(statement, seconds)
+
+    def to_log(self) -> dict:
+        return dict(
+            queries=self.count,
+            db_ms=round(self.total_seconds * 1000, 2),
+            slowest_ms=round(self.slowest_seconds * 1000, 2),
+            slowest=" ".join(self.slowest_statement.split())[:200] if self.slowest_statement else None,
+        )
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("_current_stats", default=None)
+
+
+def get_query_stats() -> Optional[QueryStats]:
+    """Return the stats being collected in the current context, if any."""
+    return _current_stats.get()
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Collect stats for the queries run within this block (including in tasks it starts)."""
+    stats = QueryStats(parent=_current_stats.get())
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Record the queries run on the given (sync) engine in the current context's stats."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, _cursor, _statement, _parameters, _context, _executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.started()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, _cursor, statement, _parameters, _context, _executemany):
+        start_time = conn.info["query_start_time"].pop()
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.record(statement, time.perf_counter() - start_time)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        # after_cursor_execute isn't called for failed statements
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_start_time"):
+            connection.info["query_start_time"].pop()
+            stats = _current_stats.get()
+            if stats is not None:
+                stats.failed()
+
+
+class QueryStatsMiddleware:
+    """Collect query stats for each request. Add it outside of the middleware that logs them."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with track_queries():
+            await self.app(scope, receive, send)
@@ -0,0 +1,74 @@
+"""Hit rates of SQLAlchemy's compiled statement cache and sizes of asyncpg's prepared statement caches."""
+
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.interfaces import CacheStats
+
+from app.core.types import Base
+
+
+class StatementCacheStats(Base):
+    engine: str
+    compiled_cache_size: int
+    compiled_cache_hits: int
+    compiled_cache_misses: int
+    compiled_cache_hit_rate: float
+    connections: int
+    prepared_statements: int
+
+
+class StatementCacheMonitor:
+    """Track the statement caches of the given (sync) engine."""
+
+    def __init__(self, name: str, engine: Engine):
+        self.name = name
+        self.engine = engine
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        # Open DBAPI connections, by id, to read the size of their prepared statement caches
+        self._connections: dict[int, object] = {}
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "close", self._on_close)
+        event.listen(engine, "close_detached", self._on_close)
+
+    def stats(self) -> StatementCacheStats:
+        compiled_cache = self.engine._compiled_cache
+        with self._lock:
+            hits, misses = self._hits, self._misses
+            connections = list(self._connections.values())
+        prepared_statements = 0
+        for connection in connections:
+            prepared_statement_cache = getattr(connection, "_prepared_statement_cache", None)
+            if prepared_statement_cache is not None:
+                prepared_statements += len(prepared_statement_cache)
+        return StatementCacheStats(
+            engine=self.name,
+            compiled_cache_size=len(compiled_cache) if compiled_cache is not None else 0,
+            compiled_cache_hits=hits,
+            compiled_cache_misses=misses,
+            compiled_cache_hit_rate=round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            connections=len(connections),
+            prepared_statements=prepared_statements,
+        )
+
+    def _after_cursor_execute(self, _conn, _cursor, _statement, _parameters, context, _executemany):
+        cache_hit = getattr(context, "cache_hit", None)
+        if cache_hit not in (CacheStats.CACHE_HIT, CacheStats.CACHE_MISS):
+            return
+        with self._lock:
+            if cache_hit is CacheStats.CACHE_HIT:
+                self._hits += 1
+            else:
+                self._misses += 1
+
+    def _on_connect(self, dbapi_connection, _connection_record):
+        with self._lock:
+            self._connections[id(dbapi_connection)] = dbapi_connection
+
+    def _on_close(self, dbapi_connection, *_args):
+        with self._lock:
+            self._connections.pop(id(dbapi_connection), None)
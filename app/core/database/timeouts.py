@@ -0,0 +1,163 @@
+"""
+Per-route statement timeouts, and cancelling read requests (and their queries) when the client disconnects.
+
+Both keep slow queries from holding pooled connections after nobody is waiting for their results.
+"""
+
+import asyncio
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.database.query_stats import get_query_stats
+from app.core.types import Base
+
+# SQLSTATE for query_canceled, raised for both statement timeouts and cancel requests
+QUERY_CANCELED = "57014"
+# Only these requests are cancelled on disconnect, cancelling a write could leave it half-applied
+CANCELLABLE_METHODS = {"GET", "HEAD"}
+
+
+class QueryCancellationStats(Base):
+    timed_out_queries: int
+    cancelled_requests: int
+    cancelled_queries: int
+
+
+@dataclass
+class _Counters:
+    timed_out_queries: int = 0
+    cancelled_requests: int = 0
+    cancelled_queries: int = 0
+
+
+_counters = _Counters()
+
+
+def get_cancellation_stats() -> QueryCancellationStats:
+    return QueryCancellationStats(
+        timed_out_queries=_counters.timed_out_queries,
+        cancelled_requests=_counters.cancelled_requests,
+        cancelled_queries=_counters.cancelled_queries,
+    )
+
+
+@dataclass
+class _RequestDeadline:
+    statement_timeout_ms: Optional[int] = None
+    cancel_on_disconnect: bool = False
+
+
+_request_deadline: ContextVar[Optional[_RequestDeadline]] = ContextVar("_request_deadline", default=None)
+
+
+def statement_timeout(seconds: float):
+    """
+    Return a route dependency that limits each SQL statement run while handling the request to `seconds`, and lets
+    QueryCancellationMiddleware cancel the request if the client disconnects. Only use it on read-only routes.
+
+    Requires QueryCancellationMiddleware. Statements that run over raise a DBAPIError, see is_statement_timeout.
+    """
+
+    async def set_statement_timeout() -> None:
+        deadline = _request_deadline.get()
+        if deadline is not None:
+            deadline.statement_timeout_ms = int(seconds * 1000)
+            deadline.cancel_on_disconnect = True
+
+    return set_statement_timeout
+
+
+def is_statement_timeout(e: DBAPIError) -> bool:
+    return getattr(e.orig, "sqlstate", None) == QUERY_CANCELED and "statement timeout" in str(e.orig)
+
+
+@event.listens_for(Session, "after_begin")
+def _set_statement_timeout(_session: Session, _transaction, connection) -> None:
+    deadline = _request_deadline.get()
+    if deadline is not None and deadline.statement_timeout_ms is not None:
+        # Only applies to the current transaction, so it doesn't stick to the pooled connection
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {deadline.statement_timeout_ms}")
+
+
+@event.listens_for(Engine, "handle_error")
+def _count_timeouts(exception_context) -> None:
+    sqlalchemy_exception = exception_context.sqlalchemy_exception
+    if isinstance(sqlalchemy_exception, DBAPIError) and is_statement_timeout(sqlalchemy_exception):
+        _counters.timed_out_queries += 1
+
+
+class QueryCancellationMiddleware:
+    """
+    Cancel the request if the client disconnects before the response is sent. Cancelling the request also cancels its
+    in-flight query (asyncpg asks the server to cancel it), so the connection goes back to the pool.
+
+    Only GET and HEAD requests to routes with the statement_timeout dependency are cancelled, other requests run to
+    completion so their side effects aren't left half-applied.
+
+    Add it inside QueryStatsMiddleware, which tracks the request's in-flight queries.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        deadline = _RequestDeadline()
+        token = _request_deadline.set(deadline)
+        try:
+            await self._call_until_disconnect(scope, receive, send, deadline)
+        finally:
+            _request_deadline.reset(token)
+
+    async def _call_until_disconnect(
+        self, scope: Scope, receive: Receive, send: Send, deadline: _RequestDeadline
+    ) -> None:
+        messages: asyncio.Queue[Message] = asyncio.Queue()
+        response_complete = False
+
+        async def send_and_track(message: Message) -> None:
+            nonlocal response_complete
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_complete = True
+            await send(message)
+
+        async def wait_for_disconnect() -> None:
+            # Forward the request body to the app until the client disconnects
+            while True:
+                message = await receive()
+                await messages.put(message)
+                if message["type"] == "http.disconnect":
+                    return
+
+        app_task = asyncio.ensure_future(self.app(scope, messages.get, send_and_track))
+        disconnect_task = asyncio.ensure_future(wait_for_disconnect())
+        try:
+            await asyncio.wait({app_task, disconnect_task}, return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            app_task.cancel()
+            raise
+        finally:
+            disconnect_task.cancel()
+        cancellable = deadline.cancel_on_disconnect and scope.get("method") in CANCELLABLE_METHODS
+        # Once the response is sent, the server reports a disconnect, but the app may still be running background tasks
+        if cancellable and not app_task.done() and not response_complete:
+            _counters.cancelled_requests += 1
+            query_stats = get_query_stats()
+            if query_stats is not None:
+                _counters.cancelled_queries += query_stats.in_flight
+            app_task.cancel()
+            try:
+                await app_task
+            except asyncio.CancelledError:
+                pass
+            return
+        await app_task
@@ -0,0 +1,84 @@
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+from app.core.types import Base
+
+T = TypeVar("T")
+
+
+class ExecutorStats(Base):
+    name: str
+    max_workers: int
+    queued: int
+    running: int
+    completed: int
+    avg_wait_ms: float
+    max_wait_ms: float
+
+
+class InstrumentedExecutor:
+    """
+    Sized thread pool for one kind of blocking call.
+
+    Keeping separate pools means a burst of slow calls of one kind (e.g. image uploads) can't use up the threads
+    needed by another (e.g. auth lookups). Tracks how many calls are waiting for a thread and how long they wait.
+    """
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._total_wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+
+    async def run(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        """Run fn(*args, **kwargs) on this executor."""
+        submitted_at = time.monotonic()
+        with self._lock:
+            self._queued += 1
+        future = self._executor.submit(functools.partial(self._call, submitted_at, fn, *args, **kwargs))
+        future.add_done_callback(self._on_done)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> ExecutorStats:
+        with self._lock:
+            return ExecutorStats(
+                name=self.name,
+                max_workers=self.max_workers,
+                queued=self._queued,
+                running=self._running,
+                completed=self._completed,
+                avg_wait_ms=self._total_wait_seconds * 1000 / self._completed if self._completed else 0.0,
+                max_wait_ms=self._max_wait_seconds * 1000,
+            )
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+    def _on_done(self, future: Future) -> None:
+        if future.cancelled():
+            # Cancelled before it started running, so it never left the queue
+            with self._lock:
+                self._queued -= 1
+
+    def _call(self, submitted_at: float, fn: Callable[..., T], *args, **kwargs) -> T:
+        wait_seconds = time.monotonic() - submitted_at
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+                self._total_wait_seconds += wait_seconds
+                self._max_wait_seconds = max(self._max_wait_seconds, wait_seconds)
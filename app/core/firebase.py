@@ -1,37 +1,95 @@
+import asyncio
 import functools
+import hashlib
+import time
 import uuid
-from asyncio import get_event_loop
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Optional, IO, Tuple, Protocol
+from typing import Awaitable, Callable, Optional, IO, Tuple, Protocol
 
 import firebase_admin  # type: ignore
 from fastapi import Header, HTTPException
 from firebase_admin import auth, storage
-from firebase_admin.auth import (  # type: ignore
-    InvalidIdTokenError,
-    ExpiredIdTokenError,
-    RevokedIdTokenError,
-    CertificateFetchError,
-    UserNotFoundError,
-)
+from firebase_admin.auth import UserNotFoundError  # type: ignore
 from firebase_admin.exceptions import FirebaseError  # type: ignore
 from google.cloud.exceptions import GoogleCloudError
 from google.cloud.storage import Bucket  # type: ignore
 
 from app.core import config
+from app.core.executors import InstrumentedExecutor
+from app.core.id_tokens import DecodedToken, GooglePublicKeys, IdTokenVerifier, PublicKeySource
 from app.utils import get_logger
 
 log = get_logger(__name__)
 
+auth_executor = InstrumentedExecutor("firebase-auth", max_workers=config.FIREBASE_AUTH_THREADS)
+storage_executor = InstrumentedExecutor("firebase-storage", max_workers=config.FIREBASE_STORAGE_THREADS)
+messaging_executor = InstrumentedExecutor("firebase-messaging", max_workers=config.FIREBASE_MESSAGING_THREADS)
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU of verified Firebase id tokens.
+
+    Entries are keyed by the token's SHA-256 hash (so raw tokens aren't kept in memory) and expire at the token's `exp`
+    claim. Concurrent lookups of the same token share a single verification.
+    """
+
+    def __init__(self, max_size: int):
+        self._max_size = max_size
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._in_flight: dict[str, asyncio.Future[Optional[DecodedToken]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get_uid(self, id_token: str, verify: Callable[[str], Awaitable[Optional[DecodedToken]]]) -> Optional[str]:
+        """Return the uid for the given token, calling `verify` if the token isn't cached."""
+        key = hashlib.sha256(id_token.encode()).hexdigest()
+        uid = self._get(key)
+        if uid is not None:
+            return uid
+        in_flight = self._in_flight.get(key)
+        if in_flight is None:
+            in_flight = asyncio.ensure_future(verify(id_token))
+            self._in_flight[key] = in_flight
+            in_flight.add_done_callback(functools.partial(self._on_verified, key))
+        # Shield so a cancelled request doesn't cancel the verification other requests are waiting on
+        decoded_token = await asyncio.shield(in_flight)
+        return decoded_token.get("uid") if decoded_token else None
+
+    def _on_verified(self, key: str, future: asyncio.Future[Optional[DecodedToken]]) -> None:
+        self._in_flight.pop(key, None)
+        if future.cancelled() or future.exception() is not None:
+            return
+        decoded_token = future.result()
+        if not decoded_token or "uid" not in decoded_token or "exp" not in decoded_token:
+            return
+        expires_at = float(decoded_token["exp"])
+        if expires_at <= time.time():
+            return
+        self._entries[key] = (decoded_token["uid"], expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def _get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        uid, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return uid
+
 
 class FirebaseAdminProtocol(Protocol):
     async def get_uid_from_token(self, id_token: str) -> Optional[str]:
         ...
 
-    async def get_phone_number_from_uid(self, uid: str) -> Optional[str]:
-        ...
-
-    async def get_email_from_uid(self, uid: str) -> Optional[str]:
+    async def get_phone_number_and_email_from_uid(self, uid: str) -> Tuple[Optional[str], Optional[str]]:
         ...
 
     async def get_uid_from_auth_header(self, authorization: Optional[str]) -> Optional[str]:
@@ -54,42 +112,47 @@ class FirebaseAdminProtocol(Protocol):
 
 
 class FirebaseAdmin(FirebaseAdminProtocol):
-    def __init__(self):
+    def __init__(self, public_keys: Optional[PublicKeySource] = None):
         self._app = firebase_admin.initialize_app(options={"storageBucket": config.STORAGE_BUCKET})
+        self._token_cache = VerifiedTokenCache(max_size=config.ID_TOKEN_CACHE_SIZE)
+        self._public_keys = public_keys or GooglePublicKeys()
+        self._token_verifier: Optional[IdTokenVerifier] = None
+        self._bucket: Optional[Bucket] = None
+
+    async def warm_up(self) -> None:
+        """Load the credentials and Google's public keys and create the bucket, so the first requests don't have to."""
+        self._get_token_verifier()
+        await self._public_keys.get_certs()
+        await storage_executor.run(self._get_bucket)
 
     async def get_uid_from_token(self, id_token: str) -> Optional[str]:
         """Get the user's uid from the given Firebase id token."""
-        loop = get_event_loop()
+        return await self._token_cache.get_uid(id_token, self._verify_id_token)
+
+    async def _verify_id_token(self, id_token: str) -> Optional[DecodedToken]:
+        """Verify the token against Google's public keys, returning the decoded token or None if it's invalid."""
         try:
-            decoded_token = await loop.run_in_executor(None, auth.verify_id_token, id_token, self._app)
-            return decoded_token.get("uid")
-        except (
-            ValueError,
-            InvalidIdTokenError,
-            ExpiredIdTokenError,
-            RevokedIdTokenError,
-            CertificateFetchError,
-        ):
-            return None
+            return await self._get_token_verifier().verify(id_token)
         except Exception:  # noqa
             log.exception("Unexpected exception")
             return None
 
-    async def get_phone_number_from_uid(self, uid: str) -> Optional[str]:
-        loop = get_event_loop()
+    def _get_token_verifier(self) -> IdTokenVerifier:
+        # Created lazily because looking up the project id can require loading credentials
+        if self._token_verifier is None:
+            project_id = self._app.project_id
+            if not project_id:
+                raise ValueError("Could not determine the Firebase project id")
+            self._token_verifier = IdTokenVerifier(project_id=project_id, keys=self._public_keys)
+        return self._token_verifier
+
+    async def get_phone_number_and_email_from_uid(self, uid: str) -> Tuple[Optional[str], Optional[str]]:
+        """Get the phone number and email of the given Firebase user, using a single lookup."""
         try:
-            firebase_user = await loop.run_in_executor(None, auth.get_user, uid, self._app)
-            return firebase_user.phone_number
+            firebase_user = await auth_executor.run(auth.get_user, uid, self._app)
+            return firebase_user.phone_number, firebase_user.email
         except (ValueError, UserNotFoundError, FirebaseError):
-            return None
-
-    async def get_email_from_uid(self, uid: str) -> Optional[str]:
-        loop = get_event_loop()
-        try:
-            firebase_user = await loop.run_in_executor(None, auth.get_user, uid, self._app)
-            return firebase_user.email
-        except (ValueError, UserNotFoundError, FirebaseError):
-            return None
+            return None, None
 
     async def get_uid_from_auth_header(self, authorization: Optional[str]) -> Optional[str]:
         """Get the user's uid from the given authorization header."""
@@ -101,58 +164,48 @@ class FirebaseAdmin(FirebaseAdminProtocol):
     # Storage
     async def upload_image(self, user_uid: str, image_id: uuid.UUID, file_obj: IO) -> tuple[str, str] | None:
         """Upload the given image to Firebase, returning the blob name and public URL if uploading was successful."""
-        loop = get_event_loop()
-        bucket = storage.bucket(app=self._app)
-        blob = bucket.blob(f"images/{user_uid}/{image_id}.jpg")
+        blob = self._get_bucket().blob(f"images/{user_uid}/{image_id}.jpg")
         # Known issue in firebase, this metadata is necessary to view images via Firebase console
         blob.metadata = {"firebaseStorageDownloadTokens": uuid.uuid4()}
         try:
-            await loop.run_in_executor(
-                None,
-                functools.partial(blob.upload_from_file, file_obj, content_type="image/jpeg"),
-            )
+            await storage_executor.run(blob.upload_from_file, file_obj, content_type="image/jpeg")
         except GoogleCloudError:
             log.exception("Failed to upload image")
             return None
-        await loop.run_in_executor(None, blob.make_public)
+        await storage_executor.run(blob.make_public)
         return blob.name, blob.public_url  # type: ignore
 
     async def make_image_private(self, blob_name: str):
         """Revoke read access for anonymous users. Used when deleting posts."""
-        loop = get_event_loop()
-        bucket = storage.bucket(app=self._app)
-        blob = await loop.run_in_executor(None, bucket.get_blob, blob_name)
+        blob = await storage_executor.run(self._get_bucket().get_blob, blob_name)
         if blob:
-            await loop.run_in_executor(None, blob.make_private)
+            await storage_executor.run(blob.make_private)
 
     async def make_image_public(self, blob_name: str):
         """Make the image public. Used when restoring deleted posts."""
-        loop = get_event_loop()
-        bucket = await loop.run_in_executor(None, functools.partial(storage.bucket, app=self._app))
-        blob = await loop.run_in_executor(None, bucket.get_blob, blob_name)
+        blob = await storage_executor.run(self._get_bucket().get_blob, blob_name)
         if blob:
-            await loop.run_in_executor(None, blob.make_public)
+            await storage_executor.run(blob.make_public)
 
     async def delete_image(self, blob_name: str):
         """Delete the given image."""
-        loop = get_event_loop()
-        bucket = await loop.run_in_executor(None, functools.partial(storage.bucket, app=self._app))
-        blob = await loop.run_in_executor(None, bucket.get_blob, blob_name)
+        blob = await storage_executor.run(self._get_bucket().get_blob, blob_name)
         if blob:
-            await loop.run_in_executor(None, blob.delete)
+            await storage_executor.run(blob.delete)
 
     async def delete_user_images(self, user_uid: str):
         """Delete the given user's images."""
-        loop = get_event_loop()
-        bucket = await self._get_bucket(loop)
         image_folder = f"images/{user_uid}"
-        get_images_function_sync = functools.partial(bucket.list_blobs, prefix=image_folder)
-        blobs = await loop.run_in_executor(None, get_images_function_sync)
+        blobs = await storage_executor.run(lambda: list(self._get_bucket().list_blobs(prefix=image_folder)))
         for blob in blobs:
-            await loop.run_in_executor(None, blob.delete)
+            await storage_executor.run(blob.delete)
 
-    async def _get_bucket(self, loop) -> Bucket:
-        return await loop.run_in_executor(None, functools.partial(storage.bucket, app=self._app))
+    def _get_bucket(self) -> Bucket:
+        # The bucket (and the storage client and HTTP session behind it) is created once and shared, so calls reuse
+        # pooled connections instead of opening new ones
+        if self._bucket is None:
+            self._bucket = storage.bucket(app=self._app)
+        return self._bucket
 
 
 @dataclass
@@ -164,6 +217,15 @@ class FirebaseUser:
 _firebase = FirebaseAdmin()
 
 
+async def warm_up_firebase() -> None:
+    await _firebase.warm_up()
+
+
+def get_shared_firebase() -> FirebaseAdminProtocol:
+    """Return the Firebase admin, for work done outside of requests."""
+    return _firebase
+
+
 async def get_firebase_user(
     authorization: Optional[str] = Header(None),
 ) -> FirebaseUser:
@@ -0,0 +1,139 @@
+"""
+Firebase id token verification on the event loop.
+
+This mirrors the checks done by `firebase_admin.auth.verify_id_token` (without revocation checks, which we don't use),
+but keeps Google's signing certificates in memory so verifying a token doesn't need a thread or a network call.
+"""
+
+import asyncio
+import re
+import time
+from typing import Any, Optional, Protocol
+
+import httpx
+from google.auth import exceptions as google_auth_exceptions
+from google.auth import jwt
+
+from app.utils import get_logger
+
+log = get_logger(__name__)
+
+GOOGLE_CERTS_URL = "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+ISSUER_PREFIX = "https://securetoken.google.com/"
+
+DecodedToken = dict[str, Any]
+Certs = dict[str, str]  # kid -> PEM encoded x509 certificate
+
+
+class PublicKeySource(Protocol):
+    async def get_certs(self) -> Certs: ...
+
+
+class StaticPublicKeys(PublicKeySource):
+    """A fixed set of certificates. Used in tests in place of Google's keys."""
+
+    def __init__(self, certs: Certs):
+        self._certs = certs
+
+    async def get_certs(self) -> Certs:
+        return self._certs
+
+
+class GooglePublicKeys(PublicKeySource):
+    """
+    Google's token signing certificates, cached in memory.
+
+    The certificates are refreshed in the background once they're within `refresh_margin_seconds` of their
+    Cache-Control expiry, so requests only wait on a fetch when there are no usable certificates at all. After a failed
+    fetch, the old certificates (if any) are used for `retry_seconds` before fetching again.
+    """
+
+    def __init__(
+        self,
+        url: str = GOOGLE_CERTS_URL,
+        refresh_margin_seconds: float = 300,
+        default_max_age_seconds: float = 3600,
+        retry_seconds: float = 5,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self._url = url
+        self._refresh_margin_seconds = refresh_margin_seconds
+        self._default_max_age_seconds = default_max_age_seconds
+        self._retry_seconds = retry_seconds
+        self._transport = transport
+        self._certs: Certs = {}
+        self._expires_at = 0.0
+        self._retry_at = 0.0
+        self._lock = asyncio.Lock()
+        self._background_refresh: Optional[asyncio.Task] = None
+
+    async def get_certs(self) -> Certs:
+        now = time.time()
+        if now < self._retry_at:
+            # The last fetch failed
+            return self._certs
+        if not self._certs or now >= self._expires_at:
+            await self._refresh()
+        elif now >= self._expires_at - self._refresh_margin_seconds:
+            if self._background_refresh is None or self._background_refresh.done():
+                self._background_refresh = asyncio.create_task(self._refresh())
+        return self._certs
+
+    async def _refresh(self) -> None:
+        async with self._lock:
+            if self._certs and time.time() < self._expires_at - self._refresh_margin_seconds:
+                # Another request refreshed the certs while we were waiting
+                return
+            if time.time() < self._retry_at:
+                # Another request failed to fetch the certs while we were waiting
+                return
+            try:
+                async with httpx.AsyncClient(transport=self._transport, timeout=10) as client:
+                    response = await client.get(self._url)
+                response.raise_for_status()
+                certs = response.json()
+            except (httpx.HTTPError, ValueError):
+                # Keep using the old certs (if any), they're usually still valid
+                log.exception("Failed to fetch Google public keys")
+                self._retry_at = time.time() + self._retry_seconds
+                return
+            self._certs = certs
+            self._expires_at = time.time() + self._get_max_age(response.headers.get("cache-control"))
+
+    def _get_max_age(self, cache_control: Optional[str]) -> float:
+        match = re.search(r"max-age=(\d+)", cache_control or "")
+        return float(match.group(1)) if match else self._default_max_age_seconds
+
+
+class IdTokenVerifier:
+    def __init__(self, project_id: str, keys: PublicKeySource, clock_skew_seconds: int = 0):
+        self._project_id = project_id
+        self._keys = keys
+        self._clock_skew_seconds = clock_skew_seconds
+
+    async def verify(self, id_token: str) -> Optional[DecodedToken]:
+        """Return the decoded token, or None if the token is invalid or expired."""
+        if not id_token:
+            return None
+        certs = await self._keys.get_certs()
+        if not certs:
+            return None
+        try:
+            header = jwt.decode_header(id_token)
+            if header.get("alg") != "RS256" or header.get("kid") not in certs:
+                return None
+            payload = jwt.decode(
+                id_token,
+                certs=certs,
+                audience=self._project_id,
+                clock_skew_in_seconds=self._clock_skew_seconds,
+            )
+        except (ValueError, google_auth_exceptions.GoogleAuthError):
+            return None
+        subject = payload.get("sub")
+        if payload.get("iss") != ISSUER_PREFIX + self._project_id:
+            return None
+        if not isinstance(subject, str) or not subject or len(subject) > 128:
+            return None
+        payload["uid"] = subject
+        return payload
@@ -0,0 +1,183 @@
+"""
+Cross-worker cache invalidation over Postgres LISTEN/NOTIFY.
+
+Each worker keeps in-process caches (e.g. the user cache), which go stale as soon as another worker handles a write.
+Stores publish an invalidation event (kind and key, e.g. `user:<id>`) when they change something that may be cached,
+and every other worker's listener evicts the matching entries. Kinds without a local subscriber aren't published,
+since every worker runs the same caches.
+
+Each worker keeps one asyncpg connection that both listens and sends its events. If the connection drops, events
+published by other workers in the meantime are missed, so every cache is flushed once the worker is listening again.
+"""
+
+import asyncio
+from collections import defaultdict, deque
+from typing import Callable, Literal, Optional
+
+import asyncpg  # type: ignore
+
+from app.core.database.engine import get_asyncpg_dsn
+from app.core.types import Base
+from app.utils import get_logger
+
+log = get_logger(__name__)
+
+CHANNEL = "cache_invalidation"
+# user:<user id>, post:<post id>, place:<place id> and map:<region>
+InvalidationKind = Literal["user", "post", "place", "map"]
+# Notifications are sent in batches of this many events
+_BATCH_SIZE = 100
+
+
+class InvalidationBusStats(Base):
+    connected: bool
+    published: int
+    received: int
+    # Events dropped because too many were waiting to be sent
+    dropped: int
+    reconnects: int
+    flushes: int
+
+
+class InvalidationBus:
+    def __init__(
+        self,
+        dsn: str,
+        channel: str = CHANNEL,
+        health_check_seconds: float = 30,
+        max_reconnect_delay_seconds: float = 30,
+        max_pending: int = 10000,
+    ):
+        self.dsn = dsn
+        self.channel = channel
+        self.health_check_seconds = health_check_seconds
+        self.max_reconnect_delay_seconds = max_reconnect_delay_seconds
+        self.max_pending = max_pending
+        self._evict_handlers: defaultdict[str, list[Callable[[str], None]]] = defaultdict(list)
+        self._flush_handlers: list[Callable[[], None]] = []
+        self._pending: deque[str] = deque()
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._connection: Optional[asyncpg.Connection] = None
+        self._server_pid: Optional[int] = None
+        self.published = self.received = self.dropped = self.reconnects = self.flushes = 0
+
+    def subscribe(self, kind: InvalidationKind, evict: Callable[[str], None], flush: Callable[[], None]) -> None:
+        """Call `evict` with the key of each event of the given kind from other workers, and `flush` after a gap."""
+        self._evict_handlers[kind].append(evict)
+        self._flush_handlers.append(flush)
+
+    def publish(self, kind: InvalidationKind, *keys: str) -> None:
+        """Queue events for the other workers. Does nothing until the bus is started."""
+        if self._task is None or kind not in self._evict_handlers:
+            return
+        for key in keys:
+            if len(self._pending) >= self.max_pending:
+                self._pending.popleft()
+                self.dropped += 1
+            self._pending.append(f"{kind}:{key}")
+            self.published += 1
+        if self._wake is not None:
+            self._wake.set()
+
+    def flush(self) -> None:
+        self.flushes += 1
+        for flush in self._flush_handlers:
+            flush()
+
+    def stats(self) -> InvalidationBusStats:
+        return InvalidationBusStats(
+            connected=self._connection is not None,
+            published=self.published,
+            received=self.received,
+            dropped=self.dropped,
+            reconnects=self.reconnects,
+            flushes=self.flushes,
+        )
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        # Only the first connection can skip the flush, nothing was cached before it
+        missed_events = False
+        delay = 1.0
+        while True:
+            try:
+                connection = await asyncpg.connect(self.dsn)
+            except (OSError, asyncio.TimeoutError, asyncpg.PostgresError) as e:
+                log.warning("Could not connect the invalidation bus, retrying in %.0fs: %s", delay, e)
+                missed_events = True
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay_seconds)
+                continue
+            try:
+                lost = asyncio.Event()
+                connection.add_termination_listener(lambda _connection: lost.set())
+                await connection.add_listener(self.channel, self._on_notification)
+                self._connection = connection
+                self._server_pid = connection.get_server_pid()
+                if missed_events:
+                    log.info("Invalidation bus reconnected, flushing caches")
+                    self.flush()
+                delay = 1.0
+                await self._serve(connection, lost)
+            except (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                log.warning("Invalidation bus connection lost: %s", e)
+            finally:
+                self._connection = None
+                connection.terminate()
+            missed_events = True
+            self.reconnects += 1
+            await asyncio.sleep(delay)
+
+    async def _serve(self, connection: asyncpg.Connection, lost: asyncio.Event) -> None:
+        assert self._wake is not None
+        while not lost.is_set():
+            self._wake.clear()
+            await self._send_pending(connection)
+            wake, closed = asyncio.ensure_future(self._wake.wait()), asyncio.ensure_future(lost.wait())
+            try:
+                done, _ = await asyncio.wait({wake, closed}, timeout=self.health_check_seconds)
+            finally:
+                wake.cancel()
+                closed.cancel()
+            if not done:
+                # Notifications don't flow on a half-open connection, make sure it's still there
+                await connection.fetchval("SELECT 1", timeout=10)
+        raise ConnectionError("Connection closed")
+
+    async def _send_pending(self, connection: asyncpg.Connection) -> None:
+        while self._pending:
+            batch = [self._pending.popleft() for _ in range(min(_BATCH_SIZE, len(self._pending)))]
+            try:
+                await connection.execute(
+                    "SELECT pg_notify($1, payload) FROM unnest($2::text[]) payload", self.channel, batch
+                )
+            except BaseException:
+                # Send them once reconnected
+                self._pending.extendleft(reversed(batch))
+                raise
+
+    def _on_notification(self, _connection, pid: int, _channel: str, payload: str) -> None:
+        if pid == self._server_pid:
+            # Our own event, already applied locally
+            return
+        self.received += 1
+        kind, _, key = payload.partition(":")
+        for evict in self._evict_handlers.get(kind, []):
+            evict(key)
+
+
+invalidation_bus = InvalidationBus(get_asyncpg_dsn())
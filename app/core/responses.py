@@ -0,0 +1,23 @@
+"""JSON responses for already validated models, which skip FastAPI's response_model validation and serialization."""
+
+from typing import Any
+
+from pydantic import BaseModel
+from starlette.responses import Response
+
+
+class ModelResponse(Response):
+    """
+    Response with the JSON of a pydantic model, serialized once (in Rust by pydantic-core) with its aliases.
+
+    FastAPI returns Response objects as is, so return these from routes that build their response model themselves.
+    Keep response_model on the route for the API docs, and make sure the model is an instance of exactly that class,
+    since fields of subclasses are serialized too.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if not isinstance(content, BaseModel):
+            raise TypeError(f"Expected a pydantic model, got {type(content).__name__}")
+        return content.__pydantic_serializer__.to_json(content, by_alias=True)
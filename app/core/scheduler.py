@@ -0,0 +1,202 @@
+"""
+Periodic maintenance jobs, run by one worker across the fleet.
+
+Every worker runs a scheduler, and the one that gets the scheduler's advisory lock (pg_try_advisory_lock, held by its
+own connection) is the leader and runs the jobs. The lock is released when that connection closes, e.g. when the
+leader stops or dies, and another worker takes over within the check interval.
+
+The last run of each job (when it started, how long it took, how many rows it processed and any error) is stored in
+the maintenance_run table, which is also how the leader knows which jobs are due, so a new leader doesn't rerun the jobs
+the previous one just ran. Jobs work in batches and stop starting new ones once their time budget is spent, returning
+a cursor to pick up from on the next run.
+"""
+
+import asyncio
+import datetime
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+import asyncpg  # type: ignore
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql as pg
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database.engine import get_background_db_context
+from app.core.database.query_tags import query_tag
+from app.core.database.models import MaintenanceRunRow
+from app.core.types import Base
+from app.utils import get_logger
+
+log = get_logger(__name__)
+
+# Key of the advisory lock held by the leader
+LOCK_KEY = "maintenance_scheduler"
+
+
+class Budget:
+    """Time budget of a job run."""
+
+    def __init__(self, seconds: float):
+        self.deadline = time.monotonic() + seconds
+
+    @property
+    def exhausted(self) -> bool:
+        return time.monotonic() >= self.deadline
+
+
+@dataclass
+class JobProgress:
+    rows: int
+    # Where to pick up from on the next run, None once the job got through everything
+    cursor: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class PeriodicJob:
+    name: str
+    # Called with the budget and the cursor the previous run stopped at
+    run: Callable[[Budget, Optional[str]], Awaitable[JobProgress]]
+    # 0 disables the job
+    interval_seconds: float
+    budget_seconds: float
+
+
+class MaintenanceRun(Base):
+    name: str
+    runs: int
+    last_started_at: Optional[datetime.datetime]
+    last_finished_at: Optional[datetime.datetime]
+    last_duration_ms: Optional[float]
+    last_rows: Optional[int]
+    last_error: Optional[str]
+    cursor: Optional[str]
+
+
+class SchedulerStats(Base):
+    leader: bool
+    # Runs by this worker
+    runs: int
+    failures: int
+
+
+class Scheduler:
+    def __init__(self, jobs: list[PeriodicJob], dsn: str, check_seconds: float = 60, lock_key: str = LOCK_KEY):
+        self.jobs = jobs
+        self.dsn = dsn
+        self.check_seconds = check_seconds
+        self.lock_key = lock_key
+        self.leader = False
+        self.runs = self.failures = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def stats(self) -> SchedulerStats:
+        return SchedulerStats(leader=self.leader, runs=self.runs, failures=self.failures)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run_job(self, job: PeriodicJob) -> MaintenanceRun:
+        """Run the job now, recording the run."""
+        async with get_background_db_context() as db:
+            start_query = (
+                pg.insert(MaintenanceRunRow)
+                .values(name=job.name, last_started_at=sa.func.now())
+                .on_conflict_do_update(
+                    index_elements=[MaintenanceRunRow.name], set_=dict(last_started_at=sa.func.now())
+                )
+                .returning(MaintenanceRunRow.cursor)
+            )
+            cursor = (await db.execute(start_query)).scalar_one()
+            await db.commit()
+        start = time.perf_counter()
+        progress, error = JobProgress(rows=0, cursor=cursor), None
+        try:
+            # Jobs stop starting batches once the budget is spent, the timeout only stops one that doesn't
+            with query_tag(f"maintenance {job.name}"):
+                progress = await asyncio.wait_for(job.run(Budget(job.budget_seconds), cursor), 2 * job.budget_seconds)
+        except Exception as e:
+            error = "Timed out" if isinstance(e, asyncio.TimeoutError) else repr(e)
+            self.failures += 1
+            log.exception("Maintenance job %s failed", job.name)
+        duration_ms = (time.perf_counter() - start) * 1000
+        self.runs += 1
+        async with get_background_db_context() as db:
+            finish_query = (
+                sa.update(MaintenanceRunRow)
+                .where(MaintenanceRunRow.name == job.name)
+                .values(
+                    runs=MaintenanceRunRow.runs + 1,
+                    last_finished_at=sa.func.now(),
+                    last_duration_ms=duration_ms,
+                    last_rows=progress.rows,
+                    last_error=error,
+                    cursor=progress.cursor,
+                )
+                .returning(MaintenanceRunRow)
+            )
+            run = MaintenanceRun.model_validate((await db.execute(finish_query)).scalar_one())
+            await db.commit()
+        log.info("Maintenance job %s processed %d rows in %.0f ms", job.name, progress.rows, duration_ms)
+        return run
+
+    async def get_due_jobs(self) -> list[PeriodicJob]:
+        async with get_background_db_context() as db:
+            elapsed_seconds = sa.extract("epoch", sa.func.now() - MaintenanceRunRow.last_started_at)
+            result = await db.execute(sa.select(MaintenanceRunRow.name, elapsed_seconds))
+            elapsed = dict(result.tuples().all())
+        return [
+            job
+            for job in self.jobs
+            if job.interval_seconds > 0 and (elapsed.get(job.name) is None or elapsed[job.name] >= job.interval_seconds)
+        ]
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                connection = await asyncpg.connect(self.dsn)
+            except (OSError, asyncio.TimeoutError, asyncpg.PostgresError) as e:
+                log.warning("Could not connect the maintenance scheduler: %s", e)
+                await asyncio.sleep(self.check_seconds)
+                continue
+            try:
+                await self._lead(connection)
+            except (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError, DBAPIError) as e:
+                log.warning("Maintenance scheduler connection lost: %s", e)
+            finally:
+                if self.leader:
+                    log.info("No longer the maintenance leader")
+                self.leader = False
+                # Releases the lock
+                connection.terminate()
+            await asyncio.sleep(self.check_seconds)
+
+    async def _lead(self, connection: asyncpg.Connection) -> None:
+        """Wait to become the leader, then run the due jobs until the connection (and so the lock) is lost."""
+        while not await connection.fetchval("SELECT pg_try_advisory_lock(hashtext($1))", self.lock_key):
+            await asyncio.sleep(self.check_seconds)
+        self.leader = True
+        log.info("Became the maintenance leader")
+        while True:
+            for job in await self.get_due_jobs():
+                # Only run the job if we still hold the lock
+                await connection.fetchval("SELECT 1", timeout=10)
+                await self.run_job(job)
+            await asyncio.sleep(self.check_seconds)
+            await connection.fetchval("SELECT 1", timeout=10)
+
+
+async def get_maintenance_runs(db: AsyncSession) -> list[MaintenanceRun]:
+    result = await db.execute(sa.select(MaintenanceRunRow).order_by(MaintenanceRunRow.name))
+    return [MaintenanceRun.model_validate(row) for row in result.scalars()]
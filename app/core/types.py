@@ -74,3 +74,4 @@ PlaceDataId = UUID
 CommentId = UUID
 CursorId = UUID
 ImageId = UUID
+JobId = UUID
@@ -0,0 +1,99 @@
+"""Keyset pagination and cheap totals for the admin listings."""
+
+import threading
+import time
+import uuid
+from typing import Any, NamedTuple, Optional
+
+from fastapi import Query
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import ColumnElement, Select
+
+# How long to reuse an exact count
+COUNT_CACHE_SECONDS = 60
+
+
+class Page(NamedTuple):
+    cursor: Optional[uuid.UUID]
+    limit: int
+    include_total: bool
+
+
+def get_page(
+    cursor: Optional[uuid.UUID] = None,
+    limit: int = Query(100, gt=0, le=1000),
+    total: bool = False,
+) -> Page:
+    return Page(cursor=cursor, limit=limit, include_total=total)
+
+
+class CountCache:
+    """Exact counts, kept for a while so repeatedly browsing a listing doesn't recount the table."""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._counts: dict[str, tuple[float, int]] = {}
+
+    def get(self, key: str) -> Optional[int]:
+        with self._lock:
+            entry = self._counts.get(key)
+        if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+            return None
+        return entry[1]
+
+    def put(self, key: str, count: int) -> None:
+        with self._lock:
+            self._counts[key] = (time.monotonic(), count)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+
+count_cache = CountCache(COUNT_CACHE_SECONDS)
+
+
+async def get_page_rows(
+    db: AsyncSession, query: Select, id_column: Any, page: Page
+) -> tuple[list, Optional[uuid.UUID]]:
+    """Return the page of rows (ordered by id desc) after the page's cursor and the cursor for the next page."""
+    if page.cursor is not None:
+        query = query.where(id_column < page.cursor)
+    result = await db.execute(query.order_by(id_column.desc()).limit(page.limit))
+    rows = result.scalars().all()
+    cursor = rows[-1].id if len(rows) == page.limit else None
+    return list(rows), cursor
+
+
+async def get_total(
+    db: AsyncSession, page: Page, table: Any, where: Optional[ColumnElement[bool]] = None
+) -> Optional[int]:
+    """
+    Return the total for the listing if the page asked for it.
+
+    Unfiltered listings use the planner's row estimate for the table, which is updated by (auto)vacuum and analyze.
+    Filtered listings, and tables that were never analyzed, use an exact count cached for COUNT_CACHE_SECONDS.
+    """
+    if not page.include_total:
+        return None
+    table_name = table.__tablename__
+    if where is None:
+        result = await db.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table_name)"),
+            {"table_name": f'"{table_name}"'},
+        )
+        estimate: Optional[int] = result.scalar()
+        # -1 (or 0 before postgres 14) if the table was never analyzed, in which case counting it is cheap anyway
+        if estimate is not None and estimate > 0:
+            return estimate
+    key = f"{table_name}:{where}" if where is not None else table_name
+    count = count_cache.get(key)
+    if count is None:
+        query = select(func.count()).select_from(table)
+        if where is not None:
+            query = query.where(where)
+        count = (await db.execute(query)).scalar_one()
+        count_cache.put(key, count)
+    return count
@@ -1,15 +1,17 @@
 """Basic admin endpoints."""
+
+import datetime
 import uuid
-from collections import namedtuple
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select, func
+from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 
-from app.core.database.engine import get_db
+from app.core.bulkheads import bulkheads
+from app.core.database.engine import get_all_pool_stats, get_db, statement_cache_monitors
 from app.core.database.helpers import eager_load_user_options, eager_load_post_options
 from app.core.database.models import (
     UserRow,
@@ -17,8 +19,13 @@ from app.core.database.models import (
     PostRow,
     FeedbackRow,
 )
-from app.core.firebase import FirebaseUser, get_firebase_user
+from app.core.database.timeouts import get_cancellation_stats
+from app.core.firebase import FirebaseUser, get_firebase_user, auth_executor, storage_executor, messaging_executor
+from app.core.invalidation import invalidation_bus
+from app.core.scheduler import MaintenanceRun, get_maintenance_runs
 from app.core.types import SimpleResponse
+from app.features.admin.pagination import Page, get_page, get_page_rows, get_total
+from app.features.admin.slow_queries import get_slow_queries, is_pg_stat_statements_enabled
 from app.features.admin.types import (
     AdminResponsePage,
     AdminAPIUser,
@@ -28,18 +35,25 @@ from app.features.admin.types import (
     AdminUpdatePostRequest,
     AdminAPIReport,
     AdminAPIFeedback,
+    AdminMetrics,
+    SlowQueryOrder,
+    SlowQueryReport,
+    JobReport,
+    RetryJobsResponse,
 )
+from app.features.maintenance import DELETED_USERS_BATCH_SIZE, purge_deleted_users, scheduler
+from app.features.posts.archive import restore_post
 from app.features.stores import get_user_store
-from app.features.users.entities import InternalUser
+from app.features.users.entities import CallerUser
+from app.features.users.user_cache import user_cache
 from app.features.users.user_store import UserStore
+from app.tasks.queue import DeadJob, get_dead_jobs, get_job_stats, retry_dead_jobs
 
 router = APIRouter(tags=["admin"])
 
-Page = namedtuple("Page", ["offset", "limit"])
-
 
-async def get_user_from_uid_or_raise(user_store: UserStore, uid: str) -> InternalUser:
-    user: Optional[InternalUser] = await user_store.get_user(uid=uid)
+async def get_user_from_uid_or_raise(user_store: UserStore, uid: str) -> CallerUser:
+    user: Optional[CallerUser] = await user_store.get_caller(uid=uid)
     if user is None or user.deleted:
         raise HTTPException(403)
     return user
@@ -48,61 +62,114 @@ async def get_user_from_uid_or_raise(user_store: UserStore, uid: str) -> Interna
 async def get_admin_or_raise(
     firebase_user: FirebaseUser = Depends(get_firebase_user),
     user_store: UserStore = Depends(get_user_store),
-) -> InternalUser:
-    user: InternalUser = await get_user_from_uid_or_raise(user_store, uid=firebase_user.uid)
+) -> CallerUser:
+    user: CallerUser = await get_user_from_uid_or_raise(user_store, uid=firebase_user.uid)
     if not user.is_admin:
         raise HTTPException(403)
     return user
 
 
-def get_page(page: int = Query(1, gt=0), limit: int = Query(100, gt=0, le=1000)) -> Page:
-    return Page(offset=(page - 1) * limit, limit=limit)
-
-
 @router.delete("/deleted-users", response_model=SimpleResponse)
 async def delete_users_marked_for_deletion(
-    _admin: InternalUser = Depends(get_admin_or_raise),
+    _admin: CallerUser = Depends(get_admin_or_raise),
     db: AsyncSession = Depends(get_db),
     firebase_user: FirebaseUser = Depends(get_firebase_user),
-    user_store: UserStore = Depends(get_user_store),
 ):
-    """Delete users marked for deletion."""
+    """Delete users marked for deletion. The purge_deleted_users maintenance job also does this periodically."""
     # Set a limit of 10 for now because this is an expensive operation
-    deleted_users_query = select(UserRow.id, UserRow.uid).where(UserRow.deleted).limit(10)
-    result = await db.execute(deleted_users_query)
-    users_to_delete = result.all()
-    for user_id, user_uid in users_to_delete:
-        await user_store.hard_delete_user(user_id)
-        await firebase_user.shared_firebase.delete_user_images(user_uid=user_uid)
+    await purge_deleted_users(db, firebase_user.shared_firebase, limit=DELETED_USERS_BATCH_SIZE)
     return dict(success=True)
 
 
+@router.get("/metrics", response_model=AdminMetrics)
+async def get_metrics(_admin: CallerUser = Depends(get_admin_or_raise)):
+    """Get this worker's runtime metrics."""
+    return AdminMetrics(
+        executors=[e.stats() for e in (auth_executor, storage_executor, messaging_executor)],
+        user_cache=user_cache.stats(),
+        statement_caches=[monitor.stats() for monitor in statement_cache_monitors],
+        pools=get_all_pool_stats(),
+        query_cancellation=get_cancellation_stats(),
+        bulkheads=bulkheads.stats(),
+        invalidation_bus=invalidation_bus.stats(),
+        maintenance=scheduler.stats(),
+    )
+
+
+@router.get("/slow-queries", response_model=SlowQueryReport)
+async def get_slow_queries_report(
+    order_by: SlowQueryOrder = "total",
+    limit: int = Query(20, gt=0, le=100),
+    plans: bool = True,
+    db: AsyncSession = Depends(get_db),
+    _admin: CallerUser = Depends(get_admin_or_raise),
+):
+    """Get the top statements from pg_stat_statements, with their generic plans and the store methods that ran them."""
+    if not await is_pg_stat_statements_enabled(db):
+        return SlowQueryReport(enabled=False, queries=[])
+    queries = await get_slow_queries(db, order_by=order_by, limit=limit, include_plans=plans)
+    return SlowQueryReport(enabled=True, queries=queries)
+
+
+@router.get("/maintenance", response_model=list[MaintenanceRun])
+async def get_maintenance_report(
+    db: AsyncSession = Depends(get_db),
+    _admin: CallerUser = Depends(get_admin_or_raise),
+):
+    """Get the last run of each periodic maintenance job."""
+    return await get_maintenance_runs(db)
+
+
+@router.get("/jobs", response_model=JobReport)
+async def get_job_report(
+    minutes: int = Query(60, gt=0, le=7 * 24 * 60),
+    db: AsyncSession = Depends(get_db),
+    _admin: CallerUser = Depends(get_admin_or_raise),
+):
+    """Get the queue depth of each job type, and the throughput and latency of the jobs done in the last minutes."""
+    since = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(minutes=minutes)
+    return JobReport(since=since, types=await get_job_stats(db, since))
+
+
+@router.get("/jobs/dead", response_model=list[DeadJob])
+async def get_dead_job_list(
+    limit: int = Query(50, gt=0, le=500),
+    db: AsyncSession = Depends(get_db),
+    _admin: CallerUser = Depends(get_admin_or_raise),
+):
+    """Get the most recently dead-lettered jobs."""
+    return await get_dead_jobs(db, limit=limit)
+
+
+@router.post("/jobs/dead/retry", response_model=RetryJobsResponse)
+async def retry_dead_job_list(
+    type: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    _admin: CallerUser = Depends(get_admin_or_raise),
+):
+    """Queue the dead-lettered jobs (of the given type, if any) again."""
+    return RetryJobsResponse(retried=await retry_dead_jobs(db, job_type=type))
+
+
 # User endpoints
 @router.get("/users", response_model=AdminResponsePage[AdminAPIUser])
 async def get_users(
     page: Page = Depends(get_page),
     db: AsyncSession = Depends(get_db),
-    _admin: InternalUser = Depends(get_admin_or_raise),
+    _admin: CallerUser = Depends(get_admin_or_raise),
 ):
     """Get all users."""
-    total_query = await db.execute(select(func.count(UserRow.id)))
-    total = total_query.scalar()
-    query = (
-        select(UserRow)
-        .options(*eager_load_user_options())
-        .order_by(UserRow.id.desc())
-        .offset(page.offset)
-        .limit(page.limit)
-    )
-    data = (await db.execute(query)).scalars().all()
-    return AdminResponsePage(total=total, data=data)  # type: ignore
+    query = select(UserRow).options(*eager_load_user_options())
+    data, cursor = await get_page_rows(db, query, UserRow.id, page)
+    total = await get_total(db, page, UserRow)
+    return AdminResponsePage(total=total, cursor=cursor, data=data)  # type: ignore
 
 
 @router.post("/users", response_model=AdminAPIUser)
 async def create_user(
     request: AdminCreateUserRequest,
     user_store: UserStore = Depends(get_user_store),
-    _admin: InternalUser = Depends(get_admin_or_raise),
+    _admin: CallerUser = Depends(get_admin_or_raise),
 ):
     """Create a user."""
     created, error = await user_store.create_user(request.uid, request.username, request.first_name, request.last_name)
@@ -118,7 +185,7 @@ async def create_user(
 async def get_user(
     username: str,
     db: AsyncSession = Depends(get_db),
-    _admin: InternalUser = Depends(get_admin_or_raise),
+    _admin: CallerUser = Depends(get_admin_or_raise),
 ):
     """Get the given user."""
     query = select(UserRow).options(*eager_load_user_options()).where(UserRow.username_lower == username.lower())
@@ -133,7 +200,7 @@ async def update_user(
     username: str,
     request: AdminUpdateUserRequest,
     db: AsyncSession = Depends(get_db),
-    admin: InternalUser = Depends(get_admin_or_raise),
+    admin: CallerUser = Depends(get_admin_or_raise),
 ):
     """Update the given user."""
     query = select(UserRow).options(*eager_load_user_options()).where(UserRow.username_lower == username.lower())
@@ -156,6 +223,7 @@ async def update_user(
         await db.commit()
     except IntegrityError:
         raise HTTPException(400)
+    user_cache.invalidate(to_update.id)
     await db.refresh(to_update)
     return to_update
 
@@ -164,22 +232,13 @@ async def update_user(
 async def get_admins(
     page: Page = Depends(get_page),
     db: AsyncSession = Depends(get_db),
-    _admin: InternalUser = Depends(get_admin_or_raise),
+    _admin: CallerUser = Depends(get_admin_or_raise),
 ):
     """Get all admin users."""
-    total_query = await db.execute(select(func.count()).where(UserRow.is_admin))
-    total = total_query.scalar()
-    query = (
-        select(UserRow)
-        .options(*eager_load_user_options())
-        .where(UserRow.is_admin)
-        .order_by(UserRow.id.desc())
-        .offset(page.offset)
-        .limit(page.limit)
-    )
-    admins_query = await db.execute(query)
-    admins = admins_query.scalars().all()
-    return dict(total=total, data=admins)
+    query = select(UserRow).options(*eager_load_user_options()).where(UserRow.is_admin)
+    admins, cursor = await get_page_rows(db, query, UserRow.id, page)
+    total = await get_total(db, page, UserRow, where=UserRow.is_admin.is_(True))
+    return AdminResponsePage(total=total, cursor=cursor, data=admins)  # type: ignore
 
 
 # Featured users
@@ -187,44 +246,26 @@ async def get_admins(
 async def get_featured_users(
     page: Page = Depends(get_page),
     db: AsyncSession = Depends(get_db),
-    _admin: InternalUser = Depends(get_admin_or_raise),
+    _admin: CallerUser = Depends(get_admin_or_raise),
 ):
     """Get featured users."""
-    total_query = await db.execute(select(func.count()).where(UserRow.is_featured))
-    total = total_query.scalar()
-    query = (
-        select(UserRow)
-        .options(*eager_load_user_options())
-        .where(UserRow.is_featured)
-        .order_by(UserRow.id.desc())
-        .offset(page.offset)
-        .limit(page.limit)
-    )
-    rows = await db.execute(query)
-    featured_users = rows.scalars().all()
-    return AdminResponsePage(total=total, data=featured_users)  # type: ignore
+    query = select(UserRow).options(*eager_load_user_options()).where(UserRow.is_featured)
+    featured_users, cursor = await get_page_rows(db, query, UserRow.id, page)
+    total = await get_total(db, page, UserRow, where=UserRow.is_featured.is_(True))
+    return AdminResponsePage(total=total, cursor=cursor, data=featured_users)  # type: ignore
 
 
 @router.get("/deleted-users", response_model=AdminResponsePage[AdminAPIUser])
 async def get_deleted_users(
     page: Page = Depends(get_page),
     db: AsyncSession = Depends(get_db),
-    _admin: InternalUser = Depends(get_admin_or_raise),
+    _admin: CallerUser = Depends(get_admin_or_raise),
 ):
     """Get soft-deleted users."""
-    total_query = await db.execute(select(func.count()).where(UserRow.deleted))
-    total = total_query.scalar()
-    query = (
-        select(UserRow)
-        .options(*eager_load_user_options())
-        .where(UserRow.deleted)
-        .order_by(UserRow.id.desc())
-        .offset(page.offset)
-        .limit(page.limit)
-    )
-    rows = await db.execute(query)
-    deleted_users = rows.scalars().all()
-    return dict(total=total, data=deleted_users)
+    query = select(UserRow).options(*eager_load_user_options()).where(UserRow.deleted)
+    deleted_users, cursor = await get_page_rows(db, query, UserRow.id, page)
+    total = await get_total(db, page, UserRow, where=UserRow.deleted.is_(True))
+    return AdminResponsePage(total=total, cursor=cursor, data=deleted_users)  # type: ignore
 
 
 # Posts
@@ -232,28 +273,20 @@ async def get_deleted_users(
 async def get_all_posts(
     page: Page = Depends(get_page),
     db: AsyncSession = Depends(get_db),
-    _admin: InternalUser = Depends(get_admin_or_raise),
+    _admin: CallerUser = Depends(get_admin_or_raise),
 ):
     """Get all posts."""
-    total_query = await db.execute(select(func.count()).select_from(PostRow))
-    total = total_query.scalar()
-    query = (
-        select(PostRow)
-        .options(*eager_load_post_options())
-        .order_by(PostRow.id.desc())
-        .offset(page.offset)
-        .limit(page.limit)
-    )
-    rows = await db.execute(query)
-    posts = rows.scalars().all()
-    return dict(total=total, data=posts)
+    query = select(PostRow).options(*eager_load_post_options())
+    posts, cursor = await get_page_rows(db, query, PostRow.id, page)
+    total = await get_total(db, page, PostRow)
+    return AdminResponsePage(total=total, cursor=cursor, data=posts)  # type: ignore
 
 
 @router.get("/posts/{post_id}", response_model=AdminAPIPost)
 async def get_post(
     post_id: uuid.UUID,
     db: AsyncSession = Depends(get_db),
-    _admin: InternalUser = Depends(get_admin_or_raise),
+    _admin: CallerUser = Depends(get_admin_or_raise),
 ):
     query = select(PostRow).options(*eager_load_post_options()).where(PostRow.id == post_id)
     rows = await db.execute(query)
@@ -269,18 +302,33 @@ async def update_post(
     request: AdminUpdatePostRequest,
     firebase_user: FirebaseUser = Depends(get_firebase_user),
     db: AsyncSession = Depends(get_db),
-    _admin: InternalUser = Depends(get_admin_or_raise),
+    _admin: CallerUser = Depends(get_admin_or_raise),
 ):
     query = select(PostRow).options(*eager_load_post_options()).where(PostRow.id == post_id)
     rows = await db.execute(query)
     post: Optional[PostRow] = rows.scalars().first()
+    if post is None and request.deleted is False:
+        # Deleted posts are eventually archived, un-deleting one moves it back
+        try:
+            if await restore_post(db, post_id):
+                rows = await db.execute(query)
+                post = rows.scalars().first()
+        except IntegrityError:
+            await db.rollback()
+            raise HTTPException(409, "The user has posted about this place since")
     if post is None:
         raise HTTPException(404)
     if request.content:
         post.content = request.content
+    deleted_changed = request.deleted is not None and request.deleted != post.deleted
     if request.deleted is not None:
         post.deleted = request.deleted
+    user_id = post.user_id
     await db.commit()
+    if deleted_changed:
+        # The user's post count changed, and other workers may have cached the post
+        user_cache.invalidate(user_id)
+        invalidation_bus.publish("post", str(post_id))
     updated_post_result = await db.execute(query)
     updated_post: PostRow = updated_post_result.scalars().first()  # type: ignore
     if updated_post is not None and updated_post.image is not None:
@@ -296,40 +344,28 @@ async def update_post(
 async def get_post_reports(
     page: Page = Depends(get_page),
     db: AsyncSession = Depends(get_db),
-    _admin: InternalUser = Depends(get_admin_or_raise),
+    _admin: CallerUser = Depends(get_admin_or_raise),
 ):
     """Get all post reports."""
-    total_query = await db.execute(select(func.count()).select_from(PostReportRow))
-    total = total_query.scalar()
-    query = (
-        select(PostReportRow)
-        .options(
-            joinedload(PostReportRow.post, innerjoin=True).options(*eager_load_post_options()),
-            joinedload(PostReportRow.reported_by, innerjoin=True).options(*eager_load_user_options()),
-        )
-        .order_by(PostReportRow.id.desc())
-        .offset(page.offset)
-        .limit(page.limit)
+    query = select(PostReportRow).options(
+        joinedload(PostReportRow.post, innerjoin=True).options(*eager_load_post_options()),
+        joinedload(PostReportRow.reported_by, innerjoin=True).options(*eager_load_user_options()),
     )
-    reports = (await db.execute(query)).scalars().all()
-    return dict(total=total, data=reports)
+    reports, cursor = await get_page_rows(db, query, PostReportRow.id, page)
+    total = await get_total(db, page, PostReportRow)
+    return AdminResponsePage(total=total, cursor=cursor, data=reports)  # type: ignore
 
 
 @router.get("/feedback", response_model=AdminResponsePage[AdminAPIFeedback])
 async def get_feedback(
     page: Page = Depends(get_page),
     db: AsyncSession = Depends(get_db),
-    _admin: InternalUser = Depends(get_admin_or_raise),
+    _admin: CallerUser = Depends(get_admin_or_raise),
 ):
     """Get all submitted feedback."""
-    total_query = await db.execute(select(func.count()).select_from(FeedbackRow))
-    total = total_query.scalar()
-    query = (
-        select(FeedbackRow)
-        .options(joinedload(FeedbackRow.user, innerjoin=True).options(*eager_load_user_options()))
-        .order_by(FeedbackRow.id.desc())
-        .offset(page.offset)
-        .limit(page.limit)
+    query = select(FeedbackRow).options(
+        joinedload(FeedbackRow.user, innerjoin=True).options(*eager_load_user_options())
     )
-    feedback = (await db.execute(query)).scalars().all()
-    return dict(total=total, data=feedback)
+    feedback, cursor = await get_page_rows(db, query, FeedbackRow.id, page)
+    total = await get_total(db, page, FeedbackRow)
+    return AdminResponsePage(total=total, cursor=cursor, data=feedback)  # type: ignore
@@ -0,0 +1,113 @@
+"""Slow query report from pg_stat_statements, with generic plans and the app function that ran each statement."""
+
+import json
+import re
+from typing import Any, Optional
+
+import asyncpg  # type: ignore
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database.query_tags import get_source
+from app.features.admin.types import SlowQuery, SlowQueryOrder
+from app.utils import get_logger
+
+log = get_logger(__name__)
+
+_ORDER_COLUMNS: dict[str, str] = {
+    "total": "total_exec_time",
+    "mean": "mean_exec_time",
+    "calls": "calls",
+    "rows": "rows",
+}
+# Statements that can be prepared (and so explained with a generic plan)
+_EXPLAINABLE = re.compile(r"^\s*(/\*.*?\*/\s*)?(SELECT|WITH|INSERT|UPDATE|DELETE)\b", re.IGNORECASE | re.DOTALL)
+_PREPARED_NAME = "_slow_query_report"
+
+
+async def is_pg_stat_statements_enabled(db: AsyncSession) -> bool:
+    result = await db.execute(text("SELECT to_regclass('pg_stat_statements') IS NOT NULL"))
+    return bool(result.scalar())
+
+
+async def get_slow_queries(
+    db: AsyncSession, order_by: SlowQueryOrder, limit: int, include_plans: bool
+) -> list[SlowQuery]:
+    """Return the top statements of the current database by the given column."""
+    result = await db.execute(
+        text(
+            f"""
+            SELECT queryid, query, calls, total_exec_time, mean_exec_time, rows
+            FROM pg_stat_statements
+            WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+            ORDER BY {_ORDER_COLUMNS[order_by]} DESC
+            LIMIT :limit
+            """
+        ),
+        {"limit": limit},
+    )
+    slow_queries = [
+        SlowQuery(
+            query_id=row.queryid,
+            query=row.query,
+            source=get_source(row.query),
+            calls=row.calls,
+            total_ms=row.total_exec_time,
+            mean_ms=row.mean_exec_time,
+            rows=row.rows,
+        )
+        for row in result
+    ]
+    if include_plans:
+        for slow_query in slow_queries:
+            slow_query.plan = await get_generic_plan(db, slow_query.query)
+    return slow_queries
+
+
+async def get_generic_plan(db: AsyncSession, query: str) -> Optional[Any]:
+    """
+    Return the generic plan of a normalized statement (with $1, $2, ... placeholders), or None if it can't be explained.
+
+    The statement is prepared and explained with NULL parameters while forcing a generic plan, so it isn't executed and
+    the plan doesn't depend on the parameters. auto_explain's plans would be better but only go to the server log.
+    """
+    if not _EXPLAINABLE.match(query):
+        return None
+    connection = await db.connection()
+    driver_connection = (await connection.get_raw_connection()).driver_connection
+    assert driver_connection is not None
+    prepared = False
+    try:
+        async with db.begin_nested():
+            # SET LOCAL outlives the savepoint unless it's rolled back, so restore the settings before releasing it
+            settings = await db.execute(
+                text("SELECT current_setting('plan_cache_mode'), current_setting('statement_timeout')")
+            )
+            plan_cache_mode, statement_timeout = settings.one()
+            await db.execute(text("SET LOCAL plan_cache_mode = force_generic_plan"))
+            await db.execute(text("SET LOCAL statement_timeout = 2000"))
+            # Without arguments, asyncpg uses the simple query protocol, which leaves the placeholders to PREPARE
+            await driver_connection.execute(f"PREPARE {_PREPARED_NAME} AS {query}")
+            prepared = True
+            result = await db.execute(
+                text("SELECT cardinality(parameter_types) FROM pg_prepared_statements WHERE name = :name"),
+                {"name": _PREPARED_NAME},
+            )
+            arguments = ", ".join(["NULL"] * (result.scalar() or 0))
+            explain = f"EXPLAIN (FORMAT JSON) EXECUTE {_PREPARED_NAME}" + (f"({arguments})" if arguments else "")
+            plan = (await db.execute(text(explain))).scalar_one()
+            await db.execute(
+                text(
+                    "SELECT set_config('plan_cache_mode', :mode, true), set_config('statement_timeout', :timeout, true)"
+                ),
+                {"mode": plan_cache_mode, "timeout": statement_timeout},
+            )
+        return json.loads(plan) if isinstance(plan, str) else plan
+    except (DBAPIError, asyncpg.PostgresError) as e:
+        log.info("Could not explain query %s: %s", query[:200], e)
+        return None
+    finally:
+        # Prepared statements outlive the savepoint
+        if prepared:
+            await driver_connection.execute(f"DEALLOCATE {_PREPARED_NAME}")
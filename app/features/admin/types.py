@@ -3,17 +3,26 @@ Response types for the admin API. Do not use anywhere other than admin API.
 """
 
 from datetime import datetime
-from typing import TypeVar, Generic
+from typing import Any, Generic, Literal, Optional, TypeVar
 from uuid import UUID
 
 from pydantic import Field, field_validator
 from pydantic import BaseModel
 
+from app.core.bulkheads import BulkheadStats
+from app.core.database.pool_stats import PoolStats
+from app.core.database.statement_cache import StatementCacheStats
+from app.core.database.timeouts import QueryCancellationStats
+from app.core.executors import ExecutorStats
+from app.core.invalidation import InvalidationBusStats
+from app.core.scheduler import SchedulerStats
 from app.core.types import Base, UserId, PostId
 from app.features.places.entities import Place
 from app.features.posts.entities import PostWithoutLikeSaveStatus
+from app.features.users.user_cache import CacheStats
 from app.features.users.primitive_types import ValidatedName, ValidatedUsername
 from app.features.users.types import CreateUserRequest
+from app.tasks.queue import JobTypeStats
 
 
 class AdminAPIUser(Base):
@@ -62,10 +71,56 @@ T = TypeVar("T")
 
 
 class AdminResponsePage(BaseModel, Generic[T]):
-    total: int
+    # Only included if requested, and estimated for large tables
+    total: int | None = None
+    # Pass as the cursor query param to get the next page, None on the last page
+    cursor: UUID | None = None
     data: list[T]
 
 
+class AdminMetrics(Base):
+    executors: list[ExecutorStats]
+    user_cache: CacheStats
+    statement_caches: list[StatementCacheStats]
+    pools: list[PoolStats]
+    query_cancellation: QueryCancellationStats
+    bulkheads: list[BulkheadStats]
+    invalidation_bus: InvalidationBusStats
+    maintenance: SchedulerStats
+
+
+SlowQueryOrder = Literal["total", "mean", "calls", "rows"]
+
+
+class SlowQuery(Base):
+    query_id: int
+    query: str
+    # Route or job that (first) ran the statement, if DB_TAG_QUERIES is on, see app/core/database/query_tags.py
+    source: Optional[str]
+    calls: int
+    total_ms: float
+    mean_ms: float
+    rows: int
+    # Generic plan (EXPLAIN FORMAT JSON) of the normalized statement
+    plan: Optional[Any] = None
+
+
+class SlowQueryReport(Base):
+    # False if the pg_stat_statements extension isn't installed
+    enabled: bool
+    queries: list[SlowQuery]
+
+
+class JobReport(Base):
+    # Start of the window the throughput and latency are over
+    since: datetime
+    types: list[JobTypeStats]
+
+
+class RetryJobsResponse(Base):
+    retried: int
+
+
 # Request types
 class AdminCreateUserRequest(CreateUserRequest):
     uid: str
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Awaitable, Callable, Optional
 
 import sqlalchemy as sa
 from sqlalchemy.exc import IntegrityError
@@ -16,7 +16,7 @@ class CommentStore:
 
     async def get_like_count(self, comment_id: CommentId) -> int:
         """Get the given comment's like count."""
-        query = sa.select(sa.func.count()).where(CommentLikeRow.comment_id == comment_id)
+        query = sa.select(CommentRow.like_count).where(CommentRow.id == comment_id)
         result = await self.db.execute(query)
         like_count: int = result.scalar()  # type: ignore
         return like_count
@@ -47,9 +47,19 @@ class CommentStore:
         liked_comment_ids = result.scalars().all()
         return set(liked_comment_ids)
 
-    async def create_comment(self, user_id: UserId, post_id: PostId, content: str) -> InternalComment:
+    async def create_comment(
+        self,
+        user_id: UserId,
+        post_id: PostId,
+        content: str,
+        before_commit: Optional[Callable[[CommentId], Awaitable[None]]] = None,
+    ) -> InternalComment:
+        """Create the comment. before_commit is called with the new comment's id in the comment's transaction."""
         comment = CommentRow(user_id=user_id, post_id=post_id, content=content)
         self.db.add(comment)
+        if before_commit:
+            await self.db.flush([comment])
+            await before_commit(comment.id)
         await self.db.commit()
         await self.db.refresh(comment)
         return InternalComment.model_validate(comment)
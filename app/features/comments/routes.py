@@ -1,6 +1,6 @@
 from typing import Optional
 
-from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import tasks
@@ -13,15 +13,17 @@ from app.features.posts import post_utils
 from app.features.posts.entities import InternalPost
 from app.features.posts.post_store import PostStore
 from app.features.stores import (
+    get_job_queue,
     get_post_store,
     get_comment_store,
     get_relation_store,
     get_user_store,
 )
-from app.features.users.dependencies import get_caller_user
-from app.features.users.entities import InternalUser
+from app.features.users.dependencies import get_caller_user, get_full_caller_user
+from app.features.users.entities import CallerUser, InternalUser
 from app.features.users.relation_store import RelationStore
 from app.features.users.user_store import UserStore
+from app.tasks.queue import JobQueue
 
 router = APIRouter(tags=["comments"])
 
@@ -29,20 +31,22 @@ router = APIRouter(tags=["comments"])
 @router.post("", response_model=Comment)
 async def create_comment(
     request: CreateCommentRequest,
-    background_tasks: BackgroundTasks,
+    jobs: JobQueue = Depends(get_job_queue),
     db: AsyncSession = Depends(get_db),
     post_store: PostStore = Depends(get_post_store),
     comment_store: CommentStore = Depends(get_comment_store),
     relation_store: RelationStore = Depends(get_relation_store),
     user_store: UserStore = Depends(get_user_store),
-    user: InternalUser = Depends(get_caller_user),
+    user: InternalUser = Depends(get_full_caller_user),
 ):
     post = await post_utils.get_post_and_validate_or_raise(
         post_store, relation_store, caller_user_id=user.id, post_id=request.post_id
     )
-    comment = await comment_store.create_comment(user.id, post.id, content=request.content)
 
-    background_tasks.add_task(tasks.notify_comment, post, comment, user)
+    async def enqueue_jobs(comment_id: CommentId) -> None:
+        await jobs.enqueue(tasks.notify_comment, post, comment_id, user)
+
+    comment = await comment_store.create_comment(user.id, post.id, content=request.content, before_commit=enqueue_jobs)
     return Comment(
         id=comment.id,
         user=user.to_public(),
@@ -59,7 +63,7 @@ async def delete_comment(
     comment_id: CommentId,
     post_store: PostStore = Depends(get_post_store),
     comment_store: CommentStore = Depends(get_comment_store),
-    user: InternalUser = Depends(get_caller_user),
+    user: CallerUser = Depends(get_caller_user),
 ):
     comment: Optional[InternalComment] = await comment_store.get_comment(comment_id)
     if comment is None:
@@ -76,19 +80,20 @@ async def delete_comment(
 @router.post("/{comment_id}/likes", response_model=LikeCommentResponse)
 async def like_comment(
     comment_id: CommentId,
-    background_tasks: BackgroundTasks,
+    jobs: JobQueue = Depends(get_job_queue),
     db: AsyncSession = Depends(get_db),
     comment_store: CommentStore = Depends(get_comment_store),
     post_store: PostStore = Depends(get_post_store),
     user_store: UserStore = Depends(get_user_store),
-    user: InternalUser = Depends(get_caller_user),
+    user: CallerUser = Depends(get_caller_user),
 ):
     comment: InternalComment | None = await comment_store.get_comment(comment_id)
     if comment is None or not (await post_store.post_exists(post_id=comment.post_id)):
         raise HTTPException(404)
-    await comment_store.like_comment(comment_id, user.id)
     if user.id != comment.user_id:
-        background_tasks.add_task(tasks.notify_comment_liked, comment, user)
+        # Committed with the like, and rolled back if the comment was already liked
+        await jobs.enqueue(tasks.notify_comment_liked, comment, user)
+    await comment_store.like_comment(comment_id, user.id)
     return LikeCommentResponse(likes=await comment_store.get_like_count(comment_id))
 
 
@@ -97,7 +102,7 @@ async def unlike_comment(
     comment_id: CommentId,
     comment_store: CommentStore = Depends(get_comment_store),
     post_store: PostStore = Depends(get_post_store),
-    user: InternalUser = Depends(get_caller_user),
+    user: CallerUser = Depends(get_caller_user),
 ):
     comment: Optional[InternalComment] = await comment_store.get_comment(comment_id)
     if comment is None or not (await post_store.post_exists(post_id=comment.post_id)):
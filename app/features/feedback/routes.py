@@ -4,7 +4,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database.engine import get_db
 from app.core.database.models import FeedbackRow
-from app.features.users.entities import InternalUser
+from app.features.users.entities import CallerUser
 from app.core.types import SimpleResponse
 from app.features.feedback.types import FeedbackRequest
 from app.features.users.dependencies import get_caller_user
@@ -16,7 +16,7 @@ router = APIRouter(tags=["feedback"])
 async def submit_feedback(
     request: FeedbackRequest,
     db: AsyncSession = Depends(get_db),
-    user: InternalUser = Depends(get_caller_user),
+    user: CallerUser = Depends(get_caller_user),
 ):
     feedback = FeedbackRow(user_id=user.id, contents=request.contents, follow_up=request.follow_up)
     try:
@@ -1,20 +1,21 @@
+import datetime
 import imghdr
 from typing import Optional
 
 from fastapi import UploadFile, HTTPException
-from sqlalchemy import select
+from sqlalchemy import Text, cast, delete, exists, func, select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database.models import ImageUploadRow
+from app.core.database.models import ImageUploadRow, PostRow, UserRow
 from app.core.firebase import FirebaseAdminProtocol
-from app.features.users.entities import InternalUser
+from app.features.users.entities import CallerUser
 from app.core.types import UserId, ImageId
 
 
 async def upload_image(
     file: UploadFile,
-    user: InternalUser,
+    user: CallerUser,
     firebase_admin: FirebaseAdminProtocol,
     db: AsyncSession,
 ) -> ImageUploadRow:
@@ -79,3 +80,32 @@ async def maybe_get_image(db: AsyncSession, user_id: UserId, image_id: ImageId)
         ImageUploadRow.url.is_not(None),
     )
     return (await db.execute(query)).scalars().first()
+
+
+async def delete_unused_images(db: AsyncSession, created_before: datetime.datetime, limit: int) -> list[Optional[str]]:
+    """
+    Delete up to `limit` images uploaded before the given time that were never used by a post or profile, and commit.
+    Returns the blob names of the deleted images (None if the upload failed), to delete from storage.
+
+    Images are checked against the posts and profiles too, not just their used flag, since some images were used without
+    being flagged.
+    """
+    in_post = exists().where(
+        PostRow.user_id == ImageUploadRow.user_id,
+        (PostRow.image_id == ImageUploadRow.id)
+        | PostRow.media.contains(func.jsonb_build_array(func.jsonb_build_object("id", cast(ImageUploadRow.id, Text)))),
+    )
+    profile_picture = exists().where(UserRow.profile_picture_id == ImageUploadRow.id)
+    unused = (
+        select(ImageUploadRow.id)
+        .where(~ImageUploadRow.used, ImageUploadRow.created_at < created_before, ~in_post, ~profile_picture)
+        .order_by(ImageUploadRow.created_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(
+        delete(ImageUploadRow).where(ImageUploadRow.id.in_(unused)).returning(ImageUploadRow.blob_name)
+    )
+    blob_names: list[Optional[str]] = result.scalars().all()  # type: ignore
+    await db.commit()
+    return blob_names
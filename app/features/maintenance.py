@@ -0,0 +1,140 @@
+"""
+Periodic maintenance jobs, run in one worker by the scheduler (see app/core/scheduler.py).
+
+The intervals and time budgets are set with MAINTENANCE_INTERVALS and MAINTENANCE_BUDGETS. Jobs missing from
+MAINTENANCE_INTERVALS don't run.
+"""
+
+import datetime
+import uuid
+from typing import Optional
+
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import config
+from app.core.database.counters import COUNTERS, reconcile_counters
+from app.core.database.engine import get_asyncpg_dsn, get_background_db_context
+from app.core.database.models import UserRow
+from app.core.firebase import FirebaseAdminProtocol, get_shared_firebase
+from app.core.scheduler import Budget, JobProgress, PeriodicJob, Scheduler
+from app.features.images.image_utils import delete_unused_images
+from app.features.posts.archive import archive_deleted_posts
+from app.features.users.user_cache import user_cache
+from app.features.users.user_store import UserStore
+from app.tasks.place_metadata import update_places_metadata_batch
+from app.utils import get_logger
+
+log = get_logger(__name__)
+
+# Deleting a user (and their images) is expensive, so delete a few at a time
+DELETED_USERS_BATCH_SIZE = 10
+PLACES_BATCH_SIZE = 1000
+IMAGES_BATCH_SIZE = 100
+
+
+def _now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+async def purge_deleted_users(db: AsyncSession, firebase: FirebaseAdminProtocol, limit: int) -> int:
+    """Hard-delete up to `limit` users marked for deletion, and their images. Returns the number of users deleted."""
+    result = await db.execute(sa.select(UserRow.id, UserRow.uid).where(UserRow.deleted).limit(limit))
+    users_to_delete = result.all()
+    user_store = UserStore(db=db, cache=user_cache)
+    for user_id, user_uid in users_to_delete:
+        await user_store.hard_delete_user(user_id)
+        await firebase.delete_user_images(user_uid=user_uid)
+    return len(users_to_delete)
+
+
+async def purge_deleted_users_job(budget: Budget, _cursor: Optional[str]) -> JobProgress:
+    deleted = 0
+    async with get_background_db_context() as db:
+        while not budget.exhausted:
+            batch = await purge_deleted_users(db, get_shared_firebase(), limit=DELETED_USERS_BATCH_SIZE)
+            deleted += batch
+            if batch < DELETED_USERS_BATCH_SIZE:
+                break
+    return JobProgress(rows=deleted)
+
+
+async def archive_posts_job(budget: Budget, _cursor: Optional[str]) -> JobProgress:
+    deleted_before = _now() - datetime.timedelta(days=config.ARCHIVE_POSTS_DELETED_DAYS)
+    archived = 0
+    async with get_background_db_context() as db:
+        while not budget.exhausted:
+            batch = await archive_deleted_posts(db, deleted_before, config.ARCHIVE_BATCH_SIZE)
+            archived += batch
+            if batch < config.ARCHIVE_BATCH_SIZE:
+                break
+    return JobProgress(rows=archived)
+
+
+async def place_metadata_job(budget: Budget, cursor: Optional[str]) -> JobProgress:
+    """Recompute the city and category of every place from its place data, resuming from the last place updated."""
+    after_id = uuid.UUID(cursor) if cursor else None
+    updated = 0
+    async with get_background_db_context() as db:
+        while not budget.exhausted:
+            batch, after_id = await update_places_metadata_batch(db, after_id, PLACES_BATCH_SIZE)
+            updated += batch
+            if after_id is None:
+                break
+    return JobProgress(rows=updated, cursor=str(after_id) if after_id else None)
+
+
+async def orphan_images_job(budget: Budget, _cursor: Optional[str]) -> JobProgress:
+    """Delete the uploaded images that were never used, from the database and from storage."""
+    created_before = _now() - datetime.timedelta(hours=config.ORPHAN_IMAGE_HOURS)
+    firebase = get_shared_firebase()
+    deleted = 0
+    while not budget.exhausted:
+        async with get_background_db_context() as db:
+            blob_names = await delete_unused_images(db, created_before, limit=IMAGES_BATCH_SIZE)
+        # The rows are gone either way, a blob that fails to delete here is left in storage
+        for blob_name in blob_names:
+            if blob_name is not None:
+                await firebase.delete_image(blob_name)
+        deleted += len(blob_names)
+        if len(blob_names) < IMAGES_BATCH_SIZE:
+            break
+    return JobProgress(rows=deleted)
+
+
+async def counters_job(budget: Budget, cursor: Optional[str]) -> JobProgress:
+    """
+    Check the counts for drift from the actual counts, one counter at a time, and log it. Repairing them is left to
+    `python -m app.core.database.counters --repair`, which locks the rows it fixes.
+    """
+    drifted = 0
+    for i in range(int(cursor) if cursor else 0, len(COUNTERS)):
+        if budget.exhausted:
+            return JobProgress(rows=drifted, cursor=str(i))
+        async with get_background_db_context() as db:
+            drift = await db.run_sync(lambda session: reconcile_counters(session.connection(), False, [COUNTERS[i]]))
+        for name, rows in drift.items():
+            if rows:
+                log.warning("%s: %d rows out of sync", name, rows)
+            drifted += rows
+    return JobProgress(rows=drifted)
+
+
+def _periodic(name: str, run) -> PeriodicJob:
+    return PeriodicJob(
+        name=name,
+        run=run,
+        interval_seconds=config.MAINTENANCE_INTERVALS.get(name, 0),
+        budget_seconds=config.MAINTENANCE_BUDGETS.get(name, 60),
+    )
+
+
+MAINTENANCE_JOBS = [
+    _periodic("purge_deleted_users", purge_deleted_users_job),
+    _periodic("archive_posts", archive_posts_job),
+    _periodic("place_metadata", place_metadata_job),
+    _periodic("orphan_images", orphan_images_job),
+    _periodic("counters", counters_job),
+]
+
+scheduler = Scheduler(MAINTENANCE_JOBS, get_asyncpg_dsn(), check_seconds=config.MAINTENANCE_CHECK_SECONDS)
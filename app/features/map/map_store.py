@@ -3,6 +3,7 @@ from sqlalchemy import func
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.database.helpers import post_has_image_or_content
 from app.core.database.models import (
     PlaceRow,
     PlaceSaveRow,
@@ -53,7 +54,7 @@ class MapStore:
             )
             query = query.where((PostRow.user_id == user_id) | PostRow.user_id.in_(friends))
         else:  # user_filter == "community"
-            query = query.where((PostRow.image_id.is_not(None)) | (PostRow.content != ""))
+            query = query.where(post_has_image_or_content())
         return await self._get_map(query, categories=categories, min_stars=min_stars, limit=500)
 
     async def get_guest_community_map(
@@ -1,12 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException
+
+from app.core import config
+from app.core.database.timeouts import statement_timeout
 from app.core.firebase import FirebaseUser, get_firebase_user
+from app.core.responses import ModelResponse
 
 from app.features.map.map_store import MapStore
 from app.features.map.types import GetMapResponse, GetMapRequest
 from app.features.stores import get_map_store, get_user_store
 from app.features.users.user_store import UserStore
 
-router = APIRouter(tags=["map"])
+router = APIRouter(tags=["map"], dependencies=[Depends(statement_timeout(config.SLOW_ROUTE_STATEMENT_TIMEOUT_SECONDS))])
 
 
 @router.post("/load", response_model=GetMapResponse)
@@ -27,7 +31,7 @@ async def load_map(
             user_ids=request.user_ids,
             categories=request.categories,
         )
-        return GetMapResponse(pins=pins)
+        return ModelResponse(GetMapResponse(pins=pins))
     else:
         # Anonymous accounts
         if request.map_type == "custom":
@@ -38,10 +42,10 @@ async def load_map(
                 min_stars=request.min_stars,
                 limit=200,
             )
-            return GetMapResponse(pins=pins)
+            return ModelResponse(GetMapResponse(pins=pins))
         elif request.map_type == "community":
             pins = await map_store.get_guest_community_map(
                 region=request.region, categories=request.categories, min_stars=request.min_stars, limit=200
             )
-            return GetMapResponse(pins=pins)
+            return ModelResponse(GetMapResponse(pins=pins))
     raise HTTPException(403)
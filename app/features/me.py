@@ -2,15 +2,18 @@ import random
 import uuid
 from typing import Optional
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File, Query
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
 from sqlalchemy import union_all, select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import tasks
+from app.core import config
 from app.core.database.engine import get_db
 from app.core.database.models import UserRelationRow, UserRow, UserRelationType
+from app.core.database.timeouts import statement_timeout
 from app.core.firebase import FirebaseUser, get_firebase_user
+from app.core.responses import ModelResponse
 from app.core.types import PlaceId, SimpleResponse, UserId
 from app.features.images import image_utils
 from app.features.places import place_utils
@@ -23,14 +26,16 @@ from app.features.posts.post_store import PostStore
 from app.features.posts.post_utils import get_posts_from_post_ids
 from app.features.posts.types import PaginatedPosts
 from app.features.stores import (
+    get_job_queue,
     get_place_store,
     get_user_store,
-    get_post_store,
     get_feed_store,
+    get_read_place_store,
+    get_read_post_store,
+    get_read_user_store,
 )
-from app.features.tasks import notify_many_followed
-from app.features.users.dependencies import get_caller_user
-from app.features.users.entities import PublicUser, UserPrefs, SuggestedUserIdItem, InternalUser
+from app.features.users.dependencies import get_caller_user, get_full_caller_user
+from app.features.users.entities import PublicUser, UserPrefs, SuggestedUserIdItem, CallerUser, InternalUser
 from app.features.users.types import (
     UpdateProfileResponse,
     UpdateProfileRequest,
@@ -40,6 +45,7 @@ from app.features.users.types import (
     PhoneNumberList,
 )
 from app.features.users.user_store import UserStore
+from app.tasks.queue import JobQueue
 
 router = APIRouter(tags=["me"])
 
@@ -64,7 +70,7 @@ async def update_user(
     request: UpdateProfileRequest,
     firebase_user: FirebaseUser = Depends(get_firebase_user),
     user_store: UserStore = Depends(get_user_store),
-    old_user: InternalUser = Depends(get_caller_user),
+    old_user: InternalUser = Depends(get_full_caller_user),
 ):
     """Update the current user's profile."""
     updated_user, error = await user_store.update_user(
@@ -85,7 +91,7 @@ async def update_user(
 @router.post("/delete", response_model=SimpleResponse)
 async def delete_user(
     user_store: UserStore = Depends(get_user_store),
-    user: InternalUser = Depends(get_caller_user),
+    user: CallerUser = Depends(get_caller_user),
 ):
     """Mark the current user for deletion."""
     await user_store.soft_delete_user(user_id=user.id)
@@ -95,7 +101,7 @@ async def delete_user(
 @router.get("/preferences", response_model=UserPrefs)
 async def get_preferences(
     user_store: UserStore = Depends(get_user_store),
-    user: InternalUser = Depends(get_caller_user),
+    user: CallerUser = Depends(get_caller_user),
 ):
     """Get the current user's preferences."""
     return await user_store.get_user_preferences(user.id)
@@ -105,7 +111,7 @@ async def get_preferences(
 async def update_preferences(
     request: UserPrefs,
     user_store: UserStore = Depends(get_user_store),
-    user: InternalUser = Depends(get_caller_user),
+    user: CallerUser = Depends(get_caller_user),
 ):
     """Update the current user's preferences."""
     return await user_store.update_preferences(user.id, request)
@@ -117,7 +123,7 @@ async def upload_profile_picture(
     firebase_user: FirebaseUser = Depends(get_firebase_user),
     db: AsyncSession = Depends(get_db),
     user_store: UserStore = Depends(get_user_store),
-    user: InternalUser = Depends(get_caller_user),
+    user: InternalUser = Depends(get_full_caller_user),
 ):
     """Set the current user's profile picture."""
     image_upload = await image_utils.upload_image(file, user, firebase_user.shared_firebase, db)
@@ -134,36 +140,30 @@ async def upload_profile_picture(
 async def get_feed(
     cursor: Optional[uuid.UUID] = None,
     feed_store: FeedStore = Depends(get_feed_store),
-    post_store: PostStore = Depends(get_post_store),
-    place_store: PlaceStore = Depends(get_place_store),
-    user: InternalUser = Depends(get_caller_user),
-    user_store: UserStore = Depends(get_user_store),
+    post_store: PostStore = Depends(get_read_post_store),
+    user: CallerUser = Depends(get_caller_user),
 ):
     """Get the feed for the current user."""
     page_size = 10
     # Step 1: Get post ids
     post_ids = await feed_store.get_feed_ids(user.id, cursor=cursor, limit=page_size)
     if len(post_ids) == 0:
-        return PaginatedPosts(posts=[], cursor=None)
+        return ModelResponse(PaginatedPosts(posts=[], cursor=None))
     # Step 2: Convert to posts
-    feed = await get_posts_from_post_ids(
-        current_user=user,
-        post_ids=post_ids,
-        post_store=post_store,
-        place_store=place_store,
-        user_store=user_store,
-    )
+    feed = await get_posts_from_post_ids(current_user=user, post_ids=post_ids, post_store=post_store)
     next_cursor: Optional[uuid.UUID] = min(post.id for post in feed) if len(feed) >= page_size else None
-    return PaginatedPosts(posts=feed, cursor=next_cursor)
+    return ModelResponse(PaginatedPosts(posts=feed, cursor=next_cursor))
 
 
-@router.get("/discover", response_model=list[Post])
+@router.get(
+    "/discover",
+    response_model=list[Post],
+    dependencies=[Depends(statement_timeout(config.SLOW_ROUTE_STATEMENT_TIMEOUT_SECONDS))],
+)
 async def _deprecated_get_discover_feed(
     feed_store: FeedStore = Depends(get_feed_store),
-    post_store: PostStore = Depends(get_post_store),
-    place_store: PlaceStore = Depends(get_place_store),
-    user: InternalUser = Depends(get_caller_user),
-    user_store: UserStore = Depends(get_user_store),
+    post_store: PostStore = Depends(get_read_post_store),
+    user: CallerUser = Depends(get_caller_user),
 ):
     """DEPRECATED Get the discover feed for the current user."""
     # Step 1: Get post ids
@@ -172,45 +172,35 @@ async def _deprecated_get_discover_feed(
         return []
     post_ids = sorted(post_ids, reverse=True)
     # Step 2: Convert to posts
-    feed = await get_posts_from_post_ids(
-        current_user=user,
-        post_ids=post_ids,
-        post_store=post_store,
-        place_store=place_store,
-        user_store=user_store,
-    )
+    feed = await get_posts_from_post_ids(current_user=user, post_ids=post_ids, post_store=post_store)
     return feed
 
 
-@router.get("/discoverV2", response_model=PaginatedPosts)
+@router.get(
+    "/discoverV2",
+    response_model=PaginatedPosts,
+    dependencies=[Depends(statement_timeout(config.SLOW_ROUTE_STATEMENT_TIMEOUT_SECONDS))],
+)
 async def get_discover_feed(
     long: Optional[float] = Query(None, ge=-180, le=180),
     lat: Optional[float] = Query(None, ge=-90, le=90),
     feed_store: FeedStore = Depends(get_feed_store),
-    post_store: PostStore = Depends(get_post_store),
-    place_store: PlaceStore = Depends(get_place_store),
-    user: InternalUser = Depends(get_caller_user),
-    user_store: UserStore = Depends(get_user_store),
+    post_store: PostStore = Depends(get_read_post_store),
+    user: CallerUser = Depends(get_caller_user),
 ):
     """Get the discover feed for the current user."""
     location = None
     if long is not None and lat is not None:
         location = Location(latitude=lat, longitude=long)
     post_ids = await feed_store.get_discover_feed_ids(user.id, location=location, limit=100)
-    posts = await get_posts_from_post_ids(
-        current_user=user,
-        post_ids=post_ids,
-        post_store=post_store,
-        place_store=place_store,
-        user_store=user_store,
-    )
-    return {"posts": posts}
+    posts = await get_posts_from_post_ids(current_user=user, post_ids=post_ids, post_store=post_store)
+    return ModelResponse(PaginatedPosts(posts=posts))
 
 
 @router.get("/suggested", response_model=list[PublicUser])
 async def get_featured_users(
-    user_store: UserStore = Depends(get_user_store),
-    _user: InternalUser = Depends(get_caller_user),
+    user_store: UserStore = Depends(get_read_user_store),
+    _user: CallerUser = Depends(get_caller_user),
 ):
     """Get the list of featured jimo accounts."""
     featured_user_ids = await user_store.get_featured_users()
@@ -218,10 +208,14 @@ async def get_featured_users(
     return [user_map.get(user_id) for user_id in featured_user_ids if user_id in user_map]
 
 
-@router.get("/suggested-users", response_model=SuggestedUsersResponse)
+@router.get(
+    "/suggested-users",
+    response_model=SuggestedUsersResponse,
+    dependencies=[Depends(statement_timeout(config.SLOW_ROUTE_STATEMENT_TIMEOUT_SECONDS))],
+)
 async def get_suggested_users(
-    user_store: UserStore = Depends(get_user_store),
-    user: InternalUser = Depends(get_caller_user),
+    user_store: UserStore = Depends(get_read_user_store),
+    user: CallerUser = Depends(get_caller_user),
 ):
     """Get the list of suggested Jimo accounts for the current user."""
     suggested_users: list[SuggestedUserIdItem] = await user_store.get_suggested_users(user.id, limit=50)
@@ -241,7 +235,7 @@ async def get_suggested_users(
 async def get_existing_users(
     request: PhoneNumberList,
     user_store: UserStore = Depends(get_user_store),
-    user: InternalUser = Depends(get_caller_user),
+    user: InternalUser = Depends(get_full_caller_user),
 ):
     """Get the existing users from the list of e164 formatted phone numbers."""
     if user.phone_number is not None:
@@ -259,10 +253,10 @@ async def get_existing_users(
 @router.post("/following", response_model=SimpleResponse)
 async def follow_many(
     request: UsernameList,
-    background_tasks: BackgroundTasks,
+    jobs: JobQueue = Depends(get_job_queue),
     db: AsyncSession = Depends(get_db),
     user_store: UserStore = Depends(get_user_store),
-    user: InternalUser = Depends(get_caller_user),
+    user: CallerUser = Depends(get_caller_user),
 ):
     """Follow the given users."""
     username_list = [username.lower() for username in request.usernames if username.lower() != user.username_lower]
@@ -287,19 +281,18 @@ async def follow_many(
                 relation=UserRelationType.following,
             )
         )
+    await jobs.enqueue(tasks.notify_many_followed, user, users_to_follow)
     try:
         await db.commit()
     except IntegrityError:
         raise HTTPException(400)
-
-    background_tasks.add_task(notify_many_followed, user, users_to_follow)
     return SimpleResponse(success=True)
 
 
 @router.get("/saved-posts", response_model=PaginatedPosts)
 async def _deprecated_get_saved_posts(
     cursor: Optional[uuid.UUID] = None,
-    _user: InternalUser = Depends(get_caller_user),
+    _user: CallerUser = Depends(get_caller_user),
 ):
     return PaginatedPosts(posts=[], cursor=None)
 
@@ -307,8 +300,8 @@ async def _deprecated_get_saved_posts(
 @router.get("/saved-places", response_model=SavedPlacesResponse)
 async def get_saved_places(
     cursor: Optional[uuid.UUID] = None,
-    place_store: PlaceStore = Depends(get_place_store),
-    user: InternalUser = Depends(get_caller_user),
+    place_store: PlaceStore = Depends(get_read_place_store),
+    user: CallerUser = Depends(get_caller_user),
 ):
     """Get the given user's saved places."""
     page_size = 15
@@ -320,9 +313,9 @@ async def get_saved_places(
 @router.post("/saved-places", response_model=SavePlaceResponse)
 async def save_place(
     request: SavePlaceRequest,
-    background_tasks: BackgroundTasks,
+    jobs: JobQueue = Depends(get_job_queue),
     place_store: PlaceStore = Depends(get_place_store),
-    user: InternalUser = Depends(get_caller_user),
+    user: CallerUser = Depends(get_caller_user),
 ):
     # We can ignore the type because of SavePlaceRequest's validation (requires that place_id or place are present)
     place_id = request.place_id or await place_utils.get_or_create_place(
@@ -331,11 +324,16 @@ async def save_place(
         place_store=place_store,
     )
     # TODO: we don't validate request.place_id
-    save = await place_store.save_place(user_id=user.id, place_id=place_id, note=request.note)
-    background_tasks.add_task(tasks.slack_place_saved, user.username, save)
-    if request.place:
-        # Only update if place_data has been updated
-        background_tasks.add_task(tasks.update_place_metadata, place_id)
+
+    async def enqueue_jobs() -> None:
+        await jobs.enqueue(tasks.slack_place_saved, user.username, user.id, place_id)
+        if request.place:
+            # Only update if place_data has been updated
+            await jobs.enqueue(tasks.update_place_metadata, place_id)
+
+    save = await place_store.save_place(
+        user_id=user.id, place_id=place_id, note=request.note, before_commit=enqueue_jobs
+    )
     return SavePlaceResponse(save=save, create_place_request=request.place)
 
 
@@ -343,7 +341,7 @@ async def save_place(
 async def unsave_place(
     place_id: PlaceId,
     place_store: PlaceStore = Depends(get_place_store),
-    user: InternalUser = Depends(get_caller_user),
+    user: CallerUser = Depends(get_caller_user),
 ):
     await place_store.unsave_place(user_id=user.id, place_id=place_id)
     return SimpleResponse(success=True)
@@ -1,6 +1,6 @@
 from typing import Optional
 
-from sqlalchemy import select
+from sqlalchemy import Select, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 
@@ -18,6 +18,7 @@ from app.core.database.models import (
     UserRelationRow,
     UserRelationType,
 )
+from app.core.database.parallel_reads import gather_reads, on_session
 from app.core.types import UserId, PostId, CursorId
 from app.features.comments.entities import CommentWithoutLikeStatus
 from app.features.comments.types import Comment
@@ -39,9 +40,16 @@ class ActivityFeedStore:
         cursor: Optional[CursorId] = None,
         limit: int = 50,
     ) -> tuple[list[NotificationItem], Optional[CursorId]]:
-        follow_feed = await self.get_follow_feed(user_id, cursor, limit)
-        post_like_feed = await self.get_post_like_feed(post_store, place_store, user_id, cursor, limit)
-        comment_feed = await self.get_comment_feed(post_store, place_store, user_id, cursor, limit)
+        follow_feed, post_like_feed, comment_feed = await gather_reads(
+            self.db,
+            lambda db: on_session(self, db).get_follow_feed(user_id, cursor, limit),
+            lambda db: on_session(self, db).get_post_like_feed(
+                on_session(post_store, db), on_session(place_store, db), user_id, cursor, limit
+            ),
+            lambda db: on_session(self, db).get_comment_feed(
+                on_session(post_store, db), on_session(place_store, db), user_id, cursor, limit
+            ),
+        )
         merged = follow_feed + post_like_feed + comment_feed
         items = sorted(merged, key=lambda i: i.item_id, reverse=True)[:limit]
         next_cursor = items[-1].item_id if len(items) >= limit else None
@@ -50,19 +58,7 @@ class ActivityFeedStore:
     async def get_follow_feed(
         self, user_id: UserId, cursor: Optional[CursorId] = None, limit: int = 50
     ) -> list[NotificationItem]:
-        follow_query = (
-            select(UserRelationRow, UserRow)
-            .options(*eager_load_user_options())
-            .where(
-                UserRelationRow.to_user_id == user_id,
-                UserRow.id == UserRelationRow.from_user_id,
-                UserRelationRow.relation == UserRelationType.following,
-                ~UserRow.deleted,
-            )
-        )
-        if cursor is not None:
-            follow_query = follow_query.where(UserRelationRow.id < cursor)
-        result = await self.db.execute(follow_query.order_by(UserRelationRow.id.desc()).limit(limit))
+        result = await self.db.execute(self._follow_feed_query(user_id, cursor, limit))
         follow_results = result.all()
         follow_items = []
         for f in follow_results:
@@ -76,6 +72,21 @@ class ActivityFeedStore:
             )
         return follow_items
 
+    def _follow_feed_query(self, user_id: UserId, cursor: Optional[CursorId], limit: int) -> Select:
+        follow_query = (
+            select(UserRelationRow, UserRow)
+            .options(*eager_load_user_options())
+            .where(
+                UserRelationRow.to_user_id == user_id,
+                UserRow.id == UserRelationRow.from_user_id,
+                UserRelationRow.relation == UserRelationType.following,
+                ~UserRow.deleted,
+            )
+        )
+        if cursor is not None:
+            follow_query = follow_query.where(UserRelationRow.id < cursor)
+        return follow_query.order_by(UserRelationRow.id.desc()).limit(limit)
+
     async def get_post_like_feed(
         self,
         post_store: PostStore,
@@ -84,21 +95,7 @@ class ActivityFeedStore:
         cursor: Optional[CursorId] = None,
         limit: int = 50,
     ) -> list[NotificationItem]:
-        like_query = (
-            select(PostLikeRow, PostRow)
-            .options(joinedload(PostLikeRow.liked_by).options(*eager_load_user_options()), *eager_load_post_options())
-            .where(
-                PostLikeRow.post_id == PostRow.id,
-                PostRow.user_id == user_id,
-                ~PostRow.deleted,
-                PostLikeRow.user_id != user_id,
-                PostLikeRow.liked_by.has(deleted=False),
-            )
-        )
-        if cursor is not None:
-            like_query = like_query.where(PostLikeRow.id < cursor)
-
-        result = await self.db.execute(like_query.order_by(PostLikeRow.id.desc()).limit(limit))
+        result = await self.db.execute(self._post_like_feed_query(user_id, cursor, limit))
         like_results = result.all()
         post_ids = [post.id for _, post in like_results]
         place_ids = [post.place.id for _, post in like_results]
@@ -120,6 +117,22 @@ class ActivityFeedStore:
             )
         return like_items
 
+    def _post_like_feed_query(self, user_id: UserId, cursor: Optional[CursorId], limit: int) -> Select:
+        like_query = (
+            select(PostLikeRow, PostRow)
+            .options(joinedload(PostLikeRow.liked_by).options(*eager_load_user_options()), *eager_load_post_options())
+            .where(
+                PostLikeRow.post_id == PostRow.id,
+                PostRow.user_id == user_id,
+                ~PostRow.deleted,
+                PostLikeRow.user_id != user_id,
+                PostLikeRow.liked_by.has(deleted=False),
+            )
+        )
+        if cursor is not None:
+            like_query = like_query.where(PostLikeRow.id < cursor)
+        return like_query.order_by(PostLikeRow.id.desc()).limit(limit)
+
     async def get_comment_feed(
         self,
         post_store: PostStore,
@@ -128,22 +141,7 @@ class ActivityFeedStore:
         cursor: Optional[CursorId] = None,
         limit: int = 50,
     ) -> list[NotificationItem]:
-        comment_query = (
-            select(CommentRow, is_comment_liked_query(user_id))
-            .options(*eager_load_comment_options())
-            .join(PostRow)
-            .where(
-                CommentRow.post_id == PostRow.id,
-                PostRow.user_id == user_id,
-                CommentRow.user_id != user_id,
-                ~CommentRow.deleted,
-                ~PostRow.deleted,
-                CommentRow.user.has(deleted=False),
-            )
-        )
-        if cursor:
-            comment_query = comment_query.where(CommentRow.id < cursor)
-        result = await self.db.execute(comment_query.order_by(CommentRow.id.desc()).limit(limit))
+        result = await self.db.execute(self._comment_feed_query(user_id, cursor, limit))
         comment_rows = result.all()
         post_ids = [row.CommentRow.post_id for row in comment_rows]
         comment_items = []
@@ -177,6 +175,24 @@ class ActivityFeedStore:
             )
         return comment_items
 
+    def _comment_feed_query(self, user_id: UserId, cursor: Optional[CursorId], limit: int) -> Select:
+        comment_query = (
+            select(CommentRow, is_comment_liked_query(user_id))
+            .options(*eager_load_comment_options())
+            .join(PostRow)
+            .where(
+                CommentRow.post_id == PostRow.id,
+                PostRow.user_id == user_id,
+                CommentRow.user_id != user_id,
+                ~CommentRow.deleted,
+                ~PostRow.deleted,
+                CommentRow.user.has(deleted=False),
+            )
+        )
+        if cursor:
+            comment_query = comment_query.where(CommentRow.id < cursor)
+        return comment_query.order_by(CommentRow.id.desc()).limit(limit)
+
     async def _get_db_posts(self, post_ids: list[PostId]) -> list[PostRow]:
         posts_query = select(PostRow).options(*eager_load_post_options()).where(PostRow.id.in_(post_ids))
         result = await self.db.execute(posts_query)
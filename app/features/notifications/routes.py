@@ -7,7 +7,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database.engine import get_db
 from app.features.notifications import tokens
 from app.features.places.place_store import PlaceStore
-from app.features.users.entities import InternalUser
+from app.features.users.entities import CallerUser
 from app.core.types import SimpleResponse
 from app.features.notifications.activity_feed_store import ActivityFeedStore
 from app.features.notifications.types import (
@@ -16,7 +16,7 @@ from app.features.notifications.types import (
 )
 from app.features.posts.post_store import PostStore
 from app.features.users.dependencies import get_caller_user
-from app.features.stores import get_place_store, get_post_store, get_notification_store
+from app.features.stores import get_notification_store, get_read_place_store, get_read_post_store
 
 router = APIRouter(tags=["notifications"])
 
@@ -25,7 +25,7 @@ router = APIRouter(tags=["notifications"])
 async def register_token(
     request: NotificationTokenRequest,
     db: AsyncSession = Depends(get_db),
-    user: InternalUser = Depends(get_caller_user),
+    user: CallerUser = Depends(get_caller_user),
 ):
     """Register the Firebase Cloud Messaging token."""
     await tokens.register_fcm_token(db, user.id, request.token)
@@ -36,7 +36,7 @@ async def register_token(
 async def remove_token(
     request: NotificationTokenRequest,
     db: AsyncSession = Depends(get_db),
-    user: InternalUser = Depends(get_caller_user),
+    user: CallerUser = Depends(get_caller_user),
 ):
     """De-register the Firebase Cloud Messaging token."""
     await tokens.remove_fcm_token(db, user.id, request.token)
@@ -46,10 +46,10 @@ async def remove_token(
 @router.get("/feed", response_model=NotificationFeedResponse)
 async def get_notification_feed(
     cursor: Optional[uuid.UUID] = None,
-    post_store: PostStore = Depends(get_post_store),
-    place_store: PlaceStore = Depends(get_place_store),
+    post_store: PostStore = Depends(get_read_post_store),
+    place_store: PlaceStore = Depends(get_read_place_store),
     notification_store: ActivityFeedStore = Depends(get_notification_store),
-    user: InternalUser = Depends(get_caller_user),
+    user: CallerUser = Depends(get_caller_user),
 ):
     """
     Returns the notification feed for the current user.
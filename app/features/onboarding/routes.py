@@ -1,4 +1,4 @@
-from fastapi import APIRouter, BackgroundTasks, Depends
+from fastapi import APIRouter, Depends
 import sqlalchemy as sa
 
 from sqlalchemy.dialects import postgresql as pg
@@ -9,10 +9,13 @@ from app.core.database.models import PlaceSaveRow, PostRow, UserRow
 from app.core.types import SimpleResponse
 
 from app.features.onboarding.types import CreateMultiRequest, OnboardingCity, PlaceTilePage
+from app.features.stores import get_job_queue
 from app.features.users.dependencies import get_caller_user
-from app.features.users.entities import InternalUser
+from app.features.users.entities import CallerUser
+from app.features.users.user_cache import user_cache
 
 from app.features.onboarding.data import featured_posts_by_city
+from app.tasks.queue import JobQueue
 from app.utils import get_logger
 
 router = APIRouter(tags=["onboarding"])
@@ -22,7 +25,7 @@ log = get_logger(__name__)
 @router.get("/places", response_model=PlaceTilePage)
 def get_posts_for_city(
     city: OnboardingCity,
-    _current_user: InternalUser = Depends(get_caller_user),
+    _current_user: CallerUser = Depends(get_caller_user),
 ):
     """Get select posts for the given city."""
     places = featured_posts_by_city.get(city)
@@ -34,9 +37,9 @@ def get_posts_for_city(
 @router.post("/places", response_model=SimpleResponse)
 async def submit_onboarding_places(
     request: CreateMultiRequest,
-    background_tasks: BackgroundTasks,
+    jobs: JobQueue = Depends(get_job_queue),
     db: AsyncSession = Depends(get_db),
-    user: InternalUser = Depends(get_caller_user),
+    user: CallerUser = Depends(get_caller_user),
 ):
     posts = request.posts
     saves = request.saves
@@ -52,7 +55,6 @@ async def submit_onboarding_places(
         pg.insert(PlaceSaveRow).values(user_id=user.id, place_id=save.place_id, note="").on_conflict_do_nothing()
         for save in saves
     ]
-    background_tasks.add_task(tasks.slack_onboarding, user.username, request.city, len(posts), len(saves))
     try:
         for post_insert in post_inserts:
             await db.execute(post_insert)
@@ -63,7 +65,9 @@ async def submit_onboarding_places(
             .where(UserRow.id == user.id)
             .values(onboarded_at=sa.func.now(), onboarded_city=request.city)
         )
+        await jobs.enqueue(tasks.slack_onboarding, user.username, request.city, len(posts), len(saves))
         await db.commit()
+        user_cache.invalidate(user.id)
         return SimpleResponse(success=True)
     except Exception as e:
         await db.rollback()
@@ -1,10 +1,11 @@
-from typing import Optional
+from typing import Awaitable, Callable, Optional
 
 import sqlalchemy as sa
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 
+from app.core.database.helpers import in_array, post_has_image_or_content
 from app.core.database.models import (
     PlaceRow,
     PlaceDataRow,
@@ -18,6 +19,10 @@ from app.core.types import UserId, PlaceId, PostId, Category
 from app.features.places.entities import Region, AdditionalPlaceData, Place
 from app.features.places.types import SavedPlace
 
+GET_SAVED_PLACE_IDS_QUERY = sa.select(PlaceSaveRow.place_id).where(
+    PlaceSaveRow.user_id == sa.bindparam("user_id"), in_array(PlaceSaveRow.place_id, "place_ids")
+)
+
 
 class PlaceStore:
     def __init__(self, db: AsyncSession):
@@ -45,6 +50,14 @@ class PlaceStore:
     async def find_place(
         self, name: str, latitude: float, longitude: float, search_radius_meters: float = 10
     ) -> Optional[Place]:
+        query = self._find_place_query(name, latitude, longitude, search_radius_meters)
+        result = await self.db.execute(query)
+        maybe_place = result.scalars().first()
+        return Place.model_validate(maybe_place) if maybe_place else None
+
+    def _find_place_query(
+        self, name: str, latitude: float, longitude: float, search_radius_meters: float
+    ) -> sa.sql.Select:
         query = sa.select(PlaceRow).where(PlaceRow.name == name)
         if search_radius_meters > 0:
             point = sa.func.ST_GeographyFromText(f"POINT({longitude} {latitude})")
@@ -54,9 +67,7 @@ class PlaceStore:
             query = query.where(sa.func.ST_Distance(point, PlaceRow.location) < search_radius_meters)
         else:
             query = query.where(PlaceRow.latitude == latitude, PlaceRow.longitude == longitude)
-        result = await self.db.execute(query)
-        maybe_place = result.scalars().first()
-        return Place.model_validate(maybe_place) if maybe_place else None
+        return query
 
     async def get_place_save(self, user_id: UserId, place_id: PlaceId) -> SavedPlace | None:
         result = await self.db.execute(
@@ -68,11 +79,19 @@ class PlaceStore:
         return SavedPlace.model_validate(maybe_place_save) if maybe_place_save else None
 
     async def save_place(
-        self, user_id: UserId, place_id: PlaceId, note: str, category: str | None = None
+        self,
+        user_id: UserId,
+        place_id: PlaceId,
+        note: str,
+        category: str | None = None,
+        before_commit: Optional[Callable[[], Awaitable[None]]] = None,
     ) -> SavedPlace:
+        """Save the place (or update its note if it's already saved). before_commit is called before committing."""
         place_save = PlaceSaveRow(user_id=user_id, place_id=place_id, note=note, category=category)
         self.db.add(place_save)
         try:
+            if before_commit:
+                await before_commit()
             await self.db.commit()
         except IntegrityError:
             # Already saved place, update note
@@ -82,6 +101,8 @@ class PlaceStore:
                 .where(PlaceSaveRow.user_id == user_id, PlaceSaveRow.place_id == place_id)
                 .values(note=note)
             )
+            if before_commit:
+                await before_commit()
             await self.db.commit()
         created_save = await self.get_place_save(user_id=user_id, place_id=place_id)
         if created_save is None:
@@ -112,12 +133,7 @@ class PlaceStore:
         ]
 
     async def get_saved_place_ids(self, user_id: UserId, place_ids: list[PlaceId]) -> set[PlaceId]:
-        query = (
-            sa.select(PlaceSaveRow.place_id)
-            .select_from(PlaceSaveRow)
-            .where(PlaceSaveRow.user_id == user_id, PlaceSaveRow.place_id.in_(place_ids))
-        )
-        result = await self.db.execute(query)
+        result = await self.db.execute(GET_SAVED_PLACE_IDS_QUERY, {"user_id": user_id, "place_ids": place_ids})
         saved_places: list[PlaceId] = result.scalars().all()  # type: ignore
         return set(saved_places)
 
@@ -153,7 +169,7 @@ class PlaceStore:
         query = (
             sa.select(PostRow.id)
             .where(PostRow.place_id == place_id, ~PostRow.deleted)
-            .where(PostRow.image_id.is_not(None) | (PostRow.content != ""))
+            .where(post_has_image_or_content())
         )
         if categories:
             query = query.where(PostRow.category.in_(categories))
@@ -1,8 +1,9 @@
-import asyncio
 import uuid
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from app.core.database.parallel_reads import gather_reads, on_session
 from app.core.firebase import FirebaseUser, get_firebase_user
+from app.core.responses import ModelResponse
 
 from app.core.types import PostId, PlaceId
 from app.features.places.entities import Place
@@ -12,9 +13,9 @@ from app.features.posts.entities import Post
 from app.features.posts.post_store import PostStore
 from app.features.posts.post_utils import get_posts_from_post_ids
 from app.features.stores import (
-    get_post_store,
-    get_place_store,
-    get_user_store,
+    get_read_post_store,
+    get_read_place_store,
+    get_read_user_store,
 )
 from app.features.users.user_store import UserStore
 
@@ -27,7 +28,7 @@ async def find_place(
     name: str,
     latitude: float = Query(ge=-90, le=90),
     longitude: float = Query(ge=-180, le=180),
-    place_store: PlaceStore = Depends(get_place_store),
+    place_store: PlaceStore = Depends(get_read_place_store),
     _firebase_user: FirebaseUser = Depends(get_firebase_user),
 ):
     # NOTE: not authenticated (anonymous Firebase accounts can access)
@@ -40,32 +41,35 @@ async def find_place(
 @router.get("/{place_id}/details", response_model=GetPlaceDetailsResponse)
 async def get_place_details(
     place_id: PlaceId,
-    post_store: PostStore = Depends(get_post_store),
-    place_store: PlaceStore = Depends(get_place_store),
-    user_store: UserStore = Depends(get_user_store),
+    post_store: PostStore = Depends(get_read_post_store),
+    place_store: PlaceStore = Depends(get_read_place_store),
+    user_store: UserStore = Depends(get_read_user_store),
     firebase_user: FirebaseUser = Depends(get_firebase_user),
 ):
     """Get the details of the given place."""
-    # TODO this can be optimized but it's fine for now
-    place: Place | None = await place_store.get_place(place_id)
+    place: Place | None
+    place, user = await gather_reads(
+        place_store.db,
+        lambda db: on_session(place_store, db).get_place(place_id),
+        lambda db: on_session(user_store, db).get_caller(uid=firebase_user.uid),
+    )
     if place is None:
         raise HTTPException(404, detail="Place not found")
-
-    user = await user_store.get_user(uid=firebase_user.uid)
-    if not user:
-        return await guest_account_get_place_details(
-            place=place, place_store=place_store, post_store=post_store, user_store=user_store
+    if user is None or user.deleted:
+        return ModelResponse(
+            await guest_account_get_place_details(
+                place=place, place_store=place_store, post_store=post_store, user_store=user_store
+            )
         )
-    community_post_ids, featured_post_ids, friend_post_ids, my_save = await asyncio.gather(
-        place_store.get_community_posts(place_id=place_id),
-        place_store.get_featured_user_posts(place_id=place_id),
-        place_store.get_friend_posts(place_id=place_id, user_id=user.id),
-        place_store.get_place_save(user_id=user.id, place_id=place_id),
+    community_post_ids, featured_post_ids, friend_post_ids, my_save = await gather_reads(
+        place_store.db,
+        lambda db: on_session(place_store, db).get_community_posts(place_id=place_id),
+        lambda db: on_session(place_store, db).get_featured_user_posts(place_id=place_id),
+        lambda db: on_session(place_store, db).get_friend_posts(place_id=place_id, user_id=user.id),
+        lambda db: on_session(place_store, db).get_place_save(user_id=user.id, place_id=place_id),
     )
     all_post_ids = list(set(community_post_ids + featured_post_ids + friend_post_ids))
-    posts = await get_posts_from_post_ids(
-        current_user=user, post_ids=all_post_ids, post_store=post_store, place_store=place_store, user_store=user_store
-    )
+    posts = await get_posts_from_post_ids(current_user=user, post_ids=all_post_ids, post_store=post_store)
     posts_map = {post.id: post for post in posts}
     my_post: Post | None = next((post for _id, post in posts_map.items() if post.user.id == user.id), None)
     used = {my_post.id} if my_post else set()
@@ -77,13 +81,15 @@ async def get_place_details(
     def to_posts(post_ids: list[PostId]) -> list[Post]:
         return [posts_map[post_id] for post_id in post_ids if post_id in posts_map]
 
-    return GetPlaceDetailsResponse(
-        place=place,
-        my_post=my_post,
-        my_save=my_save,
-        following_posts=to_posts(friend_post_ids),
-        featured_posts=to_posts(featured_post_ids),
-        community_posts=to_posts(community_post_ids),
+    return ModelResponse(
+        GetPlaceDetailsResponse(
+            place=place,
+            my_post=my_post,
+            my_save=my_save,
+            following_posts=to_posts(friend_post_ids),
+            featured_posts=to_posts(featured_post_ids),
+            community_posts=to_posts(community_post_ids),
+        )
     )
 
 
@@ -0,0 +1,190 @@
+"""
+Moving deleted posts (and their likes, saves, reports, comments and comment likes) out of the hot tables.
+
+Posts that have been deleted for a while are moved to the archive tables in batches, so the post lists, feeds and map
+don't have to skip them and the indexes they use stay small. An admin un-deleting an archived post moves it back.
+
+Run `python -m app.features.posts.archive` to archive the posts deleted before the configured age. The size and index
+hit rate of the hot tables are logged before and after the run.
+"""
+
+import argparse
+import asyncio
+import datetime
+from typing import Optional
+
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import config
+from app.core.database.helpers import in_array
+from app.core.database.models import (
+    CommentLikeRow,
+    CommentRow,
+    PostLikeRow,
+    PostReportRow,
+    PostRow,
+    PostSaveRow,
+    comment_archive,
+    comment_like_archive,
+    post_archive,
+    post_like_archive,
+    post_report_archive,
+    post_save_archive,
+)
+from app.core.types import Base, PostId
+from app.utils import get_logger
+
+log = get_logger(__name__)
+
+HOT_TABLES = ["post", "post_like", "post_save", "post_report", "comment", "comment_like"]
+
+_post = PostRow.__table__
+_comment = CommentRow.__table__
+# (hot table, archive, column holding the post id) in the order rows are moved, parents before children
+_POST_TABLES: list[tuple[sa.Table, sa.Table, sa.Column]] = [
+    (_post, post_archive, _post.c.id),
+    (PostLikeRow.__table__, post_like_archive, PostLikeRow.__table__.c.post_id),
+    (PostSaveRow.__table__, post_save_archive, PostSaveRow.__table__.c.post_id),
+    (PostReportRow.__table__, post_report_archive, PostReportRow.__table__.c.post_id),
+    (_comment, comment_archive, _comment.c.post_id),
+]
+# Counts maintained by triggers, which restored rows count up again as their likes and comments are restored
+_COUNTERS = {"like_count", "comment_count"}
+
+
+class TableStats(Base):
+    name: str
+    rows: int
+    table_bytes: int
+    index_bytes: int
+    # Share of index block reads served from shared buffers since the stats were last reset
+    index_hit_rate: Optional[float]
+
+
+async def get_table_stats(db: AsyncSession, tables: list[str]) -> list[TableStats]:
+    """Return the size and index hit rate of the given tables, including all their partitions."""
+    result = await db.execute(
+        sa.text(
+            """
+            SELECT t.name,
+                coalesce(sum(s.n_live_tup), 0)::bigint AS rows,
+                sum(pg_table_size(p.relid))::bigint AS table_bytes,
+                sum(pg_indexes_size(p.relid))::bigint AS index_bytes,
+                sum(io.idx_blks_hit)::bigint AS hits,
+                sum(io.idx_blks_read)::bigint AS reads
+            FROM unnest(CAST(:tables AS text[])) t(name)
+            CROSS JOIN LATERAL pg_partition_tree(t.name::regclass) p
+            LEFT JOIN pg_stat_user_tables s ON s.relid = p.relid
+            LEFT JOIN pg_statio_user_tables io ON io.relid = p.relid
+            GROUP BY t.name
+            ORDER BY t.name
+            """
+        ),
+        {"tables": tables},
+    )
+    return [
+        TableStats(
+            name=row.name,
+            rows=row.rows,
+            table_bytes=row.table_bytes,
+            index_bytes=row.index_bytes,
+            index_hit_rate=row.hits / (row.hits + row.reads) if row.hits is not None and row.hits + row.reads else None,
+        )
+        for row in result
+    ]
+
+
+def _move(source: sa.Table, target: sa.Table, where: sa.ColumnElement[bool], reset_counters: bool = False):
+    columns = [
+        sa.literal(0).label(column.name) if reset_counters and column.name in _COUNTERS else column
+        for column in source.columns
+    ]
+    return sa.insert(target).from_select([column.name for column in source.columns], sa.select(*columns).where(where))
+
+
+async def archive_deleted_posts(db: AsyncSession, deleted_before: datetime.datetime, batch_size: int) -> int:
+    """Move a batch of posts deleted before the given time to the archive, returning the number of posts moved."""
+    result = await db.execute(
+        sa.select(PostRow.id)
+        .where(PostRow.deleted, PostRow.updated_at < deleted_before)
+        .order_by(PostRow.id)
+        .limit(batch_size)
+        # Skip posts being updated (e.g. un-deleted) right now
+        .with_for_update(skip_locked=True)
+    )
+    post_ids: list[PostId] = result.scalars().all()  # type: ignore
+    if not post_ids:
+        return 0
+    params = {"post_ids": post_ids}
+    for source, target, post_id_column in _POST_TABLES:
+        await db.execute(_move(source, target, in_array(post_id_column, "post_ids")), params)
+    comment_ids = sa.select(_comment.c.id).where(in_array(_comment.c.post_id, "post_ids"))
+    likes = CommentLikeRow.__table__
+    await db.execute(_move(likes, comment_like_archive, likes.c.comment_id.in_(comment_ids)), params)
+    # Cascades to the rows that belong to the posts
+    await db.execute(sa.delete(PostRow).where(in_array(PostRow.id, "post_ids")), params)
+    await db.commit()
+    return len(post_ids)
+
+
+async def restore_post(db: AsyncSession, post_id: PostId) -> bool:
+    """
+    Move the given post (and the rows that belong to it) back from the archive, returning false if it isn't archived.
+
+    The post stays deleted. Raises an IntegrityError if the post's user has since posted about the same place. Doesn't
+    commit.
+    """
+    result = await db.execute(sa.select(post_archive.c.id).where(post_archive.c.id == post_id).with_for_update())
+    if result.scalar() is None:
+        return False
+    params = {"post_ids": [post_id]}
+    for source, target, post_id_column in _POST_TABLES:
+        archived_post_id = target.c[post_id_column.name]
+        await db.execute(_move(target, source, in_array(archived_post_id, "post_ids"), reset_counters=True), params)
+    comment_ids = sa.select(comment_archive.c.id).where(in_array(comment_archive.c.post_id, "post_ids"))
+    likes = CommentLikeRow.__table__
+    await db.execute(_move(comment_like_archive, likes, comment_like_archive.c.comment_id.in_(comment_ids)), params)
+    # Cascades to the archived rows that belong to the post
+    await db.execute(sa.delete(post_archive).where(post_archive.c.id == post_id))
+    return True
+
+
+async def archive(
+    db: AsyncSession, deleted_before: datetime.datetime, batch_size: int, max_batches: Optional[int] = None
+) -> int:
+    """Archive the posts deleted before the given time, logging the hot tables' stats before and after."""
+    before = await get_table_stats(db, HOT_TABLES)
+    archived = batches = 0
+    while max_batches is None or batches < max_batches:
+        moved = await archive_deleted_posts(db, deleted_before, batch_size)
+        if moved == 0:
+            break
+        archived += moved
+        batches += 1
+        log.info("Archived %d posts", archived)
+    after = await get_table_stats(db, HOT_TABLES)
+    for table_before, table_after in zip(before, after):
+        log.info("%s before: %s", table_before.name, table_before.model_dump_json(exclude={"name"}))
+        log.info("%s after: %s", table_after.name, table_after.model_dump_json(exclude={"name"}))
+    return archived
+
+
+async def main(days: float, batch_size: int) -> None:
+    from app.core.database.engine import background_engine, get_background_db_context
+
+    deleted_before = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=days)
+    async with get_background_db_context() as db:
+        archived = await archive(db, deleted_before, batch_size)
+    log.info("Archived %d posts deleted before %s", archived, deleted_before)
+    await background_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move deleted posts to the archive tables.")
+    parser.add_argument(
+        "--days", type=float, default=config.ARCHIVE_POSTS_DELETED_DAYS, help="Archive posts deleted this long ago"
+    )
+    parser.add_argument("--batch-size", type=int, default=config.ARCHIVE_BATCH_SIZE, help="Posts moved per transaction")
+    args = parser.parse_args()
+    asyncio.run(main(days=args.days, batch_size=args.batch_size))
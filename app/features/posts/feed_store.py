@@ -3,6 +3,7 @@ from typing import Optional
 import sqlalchemy as sa
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.database.helpers import post_has_image_or_content
 from app.core.database.models import (
     PostRow,
     UserRow,
@@ -19,24 +20,23 @@ class FeedStore:
 
     async def get_feed_ids(self, user_id: UserId, cursor: Optional[CursorId] = None, limit: int = 10) -> list[PostId]:
         """Get the user's feed, returning a list of post ids."""
-        query = self._feed_ids_query(user_id)
-        # Skip bib gourmand account in feed because we posted 3.4k times at once
-        query = query.where(PostRow.user_id != "0183479c-a153-ab5f-f571-b1498a0957a4")
-        if cursor:
-            query = query.where(PostRow.id < cursor)
-        result = await self.db.execute(query.order_by(PostRow.id.desc()).limit(limit))
+        result = await self.db.execute(self._feed_page_query(user_id, cursor, limit))
         return result.scalars().all()  # type: ignore
 
     async def get_discover_feed_ids(
         self, user_id: UserId, location: Optional[Location] = None, limit: int = 100
     ) -> list[PostId]:
         """Get the user's discover feed. Most recent posts for now."""
+        result = await self.db.execute(self._discover_feed_ids_query(user_id, limit))
+        return result.scalars().all()  # type: ignore
+
+    def _discover_feed_ids_query(self, user_id: UserId, limit: int) -> sa.sql.Select:
         query = (
             sa.select(PostRow.id)
             .join(UserRow, UserRow.id == PostRow.user_id)
             .where(
                 PostRow.user_id != user_id,
-                (PostRow.image_id.is_not(None) | (PostRow.content != "")),
+                post_has_image_or_content(),
                 ~PostRow.deleted,
                 ~UserRow.deleted,
             )
@@ -52,8 +52,15 @@ class FeedStore:
         #         .limit(1000)
         #     )
         #     query = query.where(PostRow.id.in_(nearest_posts_subquery))
-        result = await self.db.execute(query)
-        return result.scalars().all()  # type: ignore
+        return query
+
+    def _feed_page_query(self, user_id: UserId, cursor: Optional[CursorId], limit: int) -> sa.sql.Select:
+        query = self._feed_ids_query(user_id)
+        # Skip bib gourmand account in feed because we posted 3.4k times at once
+        query = query.where(PostRow.user_id != "0183479c-a153-ab5f-f571-b1498a0957a4")
+        if cursor:
+            query = query.where(PostRow.id < cursor)
+        return query.order_by(PostRow.id.desc()).limit(limit)
 
     def _feed_ids_query(self, user_id: UserId) -> sa.sql.Select:
         followed_users_subquery = self._followed_users_subquery(user_id)
@@ -1,29 +1,96 @@
-from typing import Optional
+from typing import Awaitable, Callable, Optional
 
 import sqlalchemy as sa
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import jsonb_builder
+from app.core.invalidation import invalidation_bus
 
 from app.core.database.helpers import (
     is_unique_constraint_error,
     is_unique_column_error,
     eager_load_post_options,
+    in_array,
 )
 from app.features.images.image_utils import get_images
-from app.features.posts.entities import InternalPost, InternalPostSave
+from app.features.posts.entities import InternalPost, InternalPostSave, Post
+from app.features.users.user_cache import UserCache
 from app.core.types import UserId, PostId, PlaceId, CursorId, ImageId
 from app.core.database.models import (
+    ImageUploadRow,
+    PlaceRow,
+    PlaceSaveRow,
     PostRow,
     PostLikeRow,
     PostReportRow,
     PostSaveRow,
+    UserRow,
+)
+
+# Built once and bound to an array of ids, so every call (with any number of ids) reuses one compiled statement and
+# one prepared statement
+GET_POSTS_QUERY = (
+    sa.select(PostRow)
+    .options(*eager_load_post_options())
+    .where(in_array(PostRow.id, "post_ids"), ~PostRow.deleted)
+    .order_by(PostRow.id.desc())
+)
+GET_LIKED_POSTS_QUERY = sa.select(PostLikeRow.post_id).where(
+    PostLikeRow.user_id == sa.bindparam("user_id"), in_array(PostLikeRow.post_id, "post_ids")
+)
+
+_post, _place, _user = PostRow.__table__, PlaceRow.__table__, UserRow.__table__
+_post_like, _place_save = PostLikeRow.__table__, PlaceSaveRow.__table__
+_post_image = ImageUploadRow.__table__.alias("post_image")
+_profile_picture = ImageUploadRow.__table__.alias("profile_picture")
+_caller_id = sa.bindparam("caller_id", type_=_post.c.user_id.type)
+# Plain Core query for the posts with their place, author and the caller's like and save status, so hydrating a page of
+# posts skips ORM instances and the identity map. See get_public_posts.
+GET_PUBLIC_POSTS_QUERY = (
+    sa.select(
+        _post.c.id,
+        _post.c.category,
+        _post.c.content,
+        _post.c.stars,
+        _post.c.image_id,
+        _post_image.c.url.label("image_url"),
+        _post.c.media,
+        _post.c.created_at,
+        _post.c.like_count,
+        _post.c.comment_count,
+        _place.c.id.label("place_id"),
+        _place.c.name.label("place_name"),
+        _place.c.city.label("place_city"),
+        _place.c.category.label("place_category"),
+        _place.c.latitude.label("place_latitude"),
+        _place.c.longitude.label("place_longitude"),
+        _user.c.id.label("user_id"),
+        _user.c.username.label("user_username"),
+        _user.c.first_name.label("user_first_name"),
+        _user.c.last_name.label("user_last_name"),
+        _profile_picture.c.url.label("user_profile_picture_url"),
+        _user.c.post_count.label("user_post_count"),
+        _user.c.follower_count.label("user_follower_count"),
+        _user.c.following_count.label("user_following_count"),
+        sa.exists().where(_post_like.c.post_id == _post.c.id, _post_like.c.user_id == _caller_id).label("liked"),
+        sa.exists()
+        .where(_place_save.c.place_id == _post.c.place_id, _place_save.c.user_id == _caller_id)
+        .label("saved"),
+    )
+    .select_from(
+        _post.join(_place, _place.c.id == _post.c.place_id)
+        .join(_user, _user.c.id == _post.c.user_id)
+        .outerjoin(_post_image, _post_image.c.id == _post.c.image_id)
+        .outerjoin(_profile_picture, _profile_picture.c.id == _user.c.profile_picture_id)
+    )
+    .where(in_array(_post.c.id, "post_ids"), ~_post.c.deleted, ~_user.c.deleted)
 )
 
 
 class PostStore:
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, user_cache: Optional[UserCache] = None):
         self.db = db
+        self.user_cache = user_cache
 
     async def post_exists(
         self, post_id: Optional[PostId] = None, user_id: Optional[UserId] = None, place_id: Optional[PlaceId] = None
@@ -42,7 +109,7 @@ class PostStore:
 
     async def get_like_count(self, post_id: PostId) -> int:
         """Return the like count of the given post."""
-        query = sa.select(sa.func.count()).where(PostLikeRow.post_id == post_id)
+        query = sa.select(PostRow.like_count).where(PostRow.id == post_id)
         result = await self.db.execute(query)
         like_count: int = result.scalar()  # type: ignore
         return like_count
@@ -70,19 +137,53 @@ class PostStore:
 
     async def get_posts(self, post_ids: list[PostId]) -> dict[PostId, InternalPost]:
         """Get the given posts that aren't deleted."""
-        query = (
-            sa.select(PostRow)
-            .options(*eager_load_post_options())
-            .where(PostRow.id.in_(post_ids), ~PostRow.deleted)
-            .order_by(PostRow.id.desc())
-        )
-        result = await self.db.execute(query)
+        result = await self.db.execute(GET_POSTS_QUERY, {"post_ids": post_ids})
         posts = result.scalars().all()
         return {post.id: InternalPost.model_validate(post) for post in posts}
 
+    async def get_public_posts(self, caller_id: UserId, post_ids: list[PostId]) -> dict[PostId, Post]:
+        """Get the given posts that aren't deleted (and whose author isn't deleted) as seen by the caller."""
+        result = await self.db.execute(GET_PUBLIC_POSTS_QUERY, {"caller_id": caller_id, "post_ids": post_ids})
+        posts = {}
+        for row in result.mappings():
+            posts[row["id"]] = Post.model_validate(
+                dict(
+                    id=row["id"],
+                    user=dict(
+                        id=row["user_id"],
+                        username=row["user_username"],
+                        first_name=row["user_first_name"],
+                        last_name=row["user_last_name"],
+                        profile_picture_url=row["user_profile_picture_url"],
+                        post_count=row["user_post_count"],
+                        follower_count=row["user_follower_count"],
+                        following_count=row["user_following_count"],
+                    ),
+                    place=dict(
+                        id=row["place_id"],
+                        name=row["place_name"],
+                        city=row["place_city"],
+                        category=row["place_category"],
+                        latitude=row["place_latitude"],
+                        longitude=row["place_longitude"],
+                    ),
+                    category=row["category"],
+                    content=row["content"],
+                    stars=row["stars"],
+                    image_id=row["image_id"],
+                    image_url=row["image_url"],
+                    media=row["media"],
+                    created_at=row["created_at"],
+                    like_count=row["like_count"],
+                    comment_count=row["comment_count"],
+                    liked=row["liked"],
+                    saved=row["saved"],
+                )
+            )
+        return posts
+
     async def get_liked_posts(self, user_id: UserId, post_ids: list[PostId]) -> set[PostId]:
-        query = sa.select(PostLikeRow.post_id).where(PostLikeRow.user_id == user_id, PostLikeRow.post_id.in_(post_ids))
-        result = await self.db.execute(query)
+        result = await self.db.execute(GET_LIKED_POSTS_QUERY, {"user_id": user_id, "post_ids": post_ids})
         liked_posts: list[PostId] = result.scalars().all()  # type: ignore
         return set(liked_posts)
 
@@ -106,8 +207,12 @@ class PostStore:
         content: str,
         media_ids: list[ImageId],
         stars: int | None,
+        before_commit: Optional[Callable[[PostId], Awaitable[None]]] = None,
     ) -> InternalPost:
-        """Try to create a post with the given details, raising a ValueError if the request is invalid."""
+        """
+        Try to create a post with the given details, raising a ValueError if the request is invalid. before_commit is
+        called with the new post's id in the post's transaction.
+        """
         self._validate_category(category)
         self._validate_stars(stars)  # Already validated by Pydantic but adding extra sanity check
         if await self.post_exists(user_id=user_id, place_id=place_id):
@@ -126,7 +231,11 @@ class PostStore:
             for image in media:
                 image.used = True
             self.db.add(post)
+            if before_commit:
+                await self.db.flush([post])
+                await before_commit(post.id)
             await self.db.commit()
+            self._invalidate_post_count(user_id)
             await self.db.refresh(post, ["id"])
             created_post = await self.get_post(post.id)
             if created_post is None:
@@ -149,6 +258,7 @@ class PostStore:
         content: str,
         media_ids: list[ImageId],
         stars: int | None,
+        before_commit: Optional[Callable[[], Awaitable[None]]] = None,
     ) -> InternalPost:
         post: Optional[PostRow] = await self._get_post_row(post_id)
         if post is None:
@@ -168,7 +278,11 @@ class PostStore:
             new_media = await get_images(self.db, post.user_id, image_ids=media_ids)
             post.image_id = new_media[0].id if len(new_media) else None
             post.media = jsonb_builder.media_jsonb(new_media)
+            for image in new_media:
+                image.used = True
         try:
+            if before_commit:
+                await before_commit()
             await self.db.commit()
         except IntegrityError as e:
             await self.db.rollback()
@@ -178,6 +292,7 @@ class PostStore:
                 raise ValueError("Duplicate image.")
             else:
                 raise ValueError("Could not update post.")
+        invalidation_bus.publish("post", str(post_id))
         updated_post = await self.get_post(post_id)
         if updated_post is None:
             raise ValueError("Can't find post.")
@@ -185,9 +300,13 @@ class PostStore:
 
     async def delete_post(self, post_id: PostId) -> None:
         """Delete the given post."""
-        query = sa.delete(PostRow).where(PostRow.id == post_id)
-        await self.db.execute(query)
+        query = sa.delete(PostRow).where(PostRow.id == post_id).returning(PostRow.user_id)
+        result = await self.db.execute(query)
         await self.db.commit()
+        user_id: Optional[UserId] = result.scalars().first()
+        if user_id is not None:
+            self._invalidate_post_count(user_id)
+            invalidation_bus.publish("post", str(post_id))
 
     async def like_post(self, user_id: UserId, post_id: PostId) -> None:
         """Like the given post."""
@@ -234,6 +353,10 @@ class PostStore:
             await self.db.rollback()
             return False
 
+    def _invalidate_post_count(self, user_id: UserId) -> None:
+        if self.user_cache is not None:
+            self.user_cache.invalidate(user_id)
+
     async def _get_post_row(self, post_id: PostId) -> Optional[PostRow]:
         """Return the post with the given id or None if no such post exists or the post is deleted."""
         query = sa.select(PostRow).options(*eager_load_post_options()).where(PostRow.id == post_id, ~PostRow.deleted)
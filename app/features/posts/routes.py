@@ -1,6 +1,6 @@
 from typing import Optional
 
-from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import tasks
@@ -23,16 +23,21 @@ from app.features.posts.types import (
     SavePostResponse,
 )
 from app.features.stores import (
+    get_job_queue,
     get_user_store,
     get_post_store,
     get_relation_store,
     get_place_store,
     get_comment_store,
+    get_read_place_store,
+    get_read_post_store,
+    get_read_user_store,
 )
-from app.features.users.dependencies import get_caller_user
-from app.features.users.entities import InternalUser
+from app.features.users.dependencies import get_caller_user, get_full_caller_user
+from app.features.users.entities import CallerUser, InternalUser
 from app.features.users.relation_store import RelationStore
 from app.features.users.user_store import UserStore
+from app.tasks.queue import JobQueue
 from app.utils import get_logger
 
 router = APIRouter(tags=["posts"])
@@ -42,11 +47,11 @@ log = get_logger(__name__)
 @router.get("/{post_id}", response_model=Post)
 async def get_post(
     post_id: PostId,
-    user_store: UserStore = Depends(get_user_store),
-    post_store: PostStore = Depends(get_post_store),
-    place_store: PlaceStore = Depends(get_place_store),
+    user_store: UserStore = Depends(get_read_user_store),
+    post_store: PostStore = Depends(get_read_post_store),
+    place_store: PlaceStore = Depends(get_read_place_store),
     relation_store: RelationStore = Depends(get_relation_store),
-    current_user: InternalUser = Depends(get_caller_user),
+    current_user: CallerUser = Depends(get_caller_user),
 ):
     """Get the given post."""
     post: InternalPost = await post_utils.get_post_and_validate_or_raise(
@@ -77,11 +82,11 @@ async def get_post(
 @router.post("", response_model=Post)
 async def create_post(
     request: CreatePostRequest,
-    background_tasks: BackgroundTasks,
+    jobs: JobQueue = Depends(get_job_queue),
     db: AsyncSession = Depends(get_db),
     place_store: PlaceStore = Depends(get_place_store),
     post_store: PostStore = Depends(get_post_store),
-    user: InternalUser = Depends(get_caller_user),
+    user: InternalUser = Depends(get_full_caller_user),
 ):
     """Create a new post."""
     try:
@@ -89,9 +94,15 @@ async def create_post(
             place_id = request.place_id
         elif request.place:
             place_id = await place_utils.get_or_create_place(user.id, request.place, place_store)
-            background_tasks.add_task(tasks.update_place_metadata, place_id)
         else:
             raise HTTPException(400, "Either place_id or place must be specified")
+
+        async def enqueue_jobs(post_id: PostId) -> None:
+            if request.place:
+                await jobs.enqueue(tasks.update_place_metadata, place_id)
+            await jobs.enqueue(tasks.slack_post_created, user.username, post_id)
+            await jobs.enqueue(tasks.notify_post_created, post_id, user)
+
         post: InternalPost = await post_store.create_post(
             user_id=user.id,
             place_id=place_id,
@@ -99,9 +110,8 @@ async def create_post(
             content=request.content,
             media_ids=request.media,
             stars=request.stars,
+            before_commit=enqueue_jobs,
         )
-        background_tasks.add_task(tasks.slack_post_created, user.username, post)
-        background_tasks.add_task(tasks.notify_post_created, post, user)
         return Post(
             **post.model_dump(),
             user=user.to_public(),
@@ -116,11 +126,11 @@ async def create_post(
 async def update_post(
     post_id: PostId,
     req: CreatePostRequest,
-    background_tasks: BackgroundTasks,
+    jobs: JobQueue = Depends(get_job_queue),
     firebase_user: FirebaseUser = Depends(get_firebase_user),
     place_store: PlaceStore = Depends(get_place_store),
     post_store: PostStore = Depends(get_post_store),
-    user: InternalUser = Depends(get_caller_user),
+    user: InternalUser = Depends(get_full_caller_user),
 ):
     """Update the given post."""
     try:
@@ -133,9 +143,16 @@ async def update_post(
             place_id = req.place_id
         elif req.place:
             place_id = await place_utils.get_or_create_place(user.id, req.place, place_store)
-            background_tasks.add_task(tasks.update_place_metadata, place_id)
         else:
             raise HTTPException(400, "Either place_id or place must be specified")
+
+        async def enqueue_jobs() -> None:
+            if req.place:
+                await jobs.enqueue(tasks.update_place_metadata, place_id)
+            if old_post.stars != req.stars:
+                # Slack stars updated
+                await jobs.enqueue(tasks.slack_post_stars_changed, user.username, post_id, old_post.stars)
+
         updated_post = await post_store.update_post(
             post_id=post_id,
             place_id=place_id,
@@ -143,15 +160,13 @@ async def update_post(
             content=req.content,
             media_ids=req.media,
             stars=req.stars,
+            before_commit=enqueue_jobs,
         )
         if old_post.media and old_post.media != updated_post.media:
             to_delete = [media.blob_name for media in old_post.media if media not in updated_post.media]
             # Delete old image
             for blob_name in to_delete:
                 await firebase_user.shared_firebase.delete_image(blob_name)
-        if old_post.stars != updated_post.stars:
-            # Slack stars updated
-            background_tasks.add_task(tasks.slack_post_stars_changed, user.username, updated_post, old_post.stars)
         return Post(
             **updated_post.model_dump(),
             user=user.to_public(),
@@ -167,7 +182,7 @@ async def delete_post(
     post_id: PostId,
     firebase_user: FirebaseUser = Depends(get_firebase_user),
     post_store: PostStore = Depends(get_post_store),
-    user: InternalUser = Depends(get_caller_user),
+    user: CallerUser = Depends(get_caller_user),
 ):
     """Delete the given post."""
     post: Optional[InternalPost] = await post_store.get_post(post_id)
@@ -182,19 +197,20 @@ async def delete_post(
 @router.post("/{post_id}/likes", response_model=LikePostResponse)
 async def like_post(
     post_id: PostId,
-    background_tasks: BackgroundTasks,
+    jobs: JobQueue = Depends(get_job_queue),
     db: AsyncSession = Depends(get_db),
     user_store: UserStore = Depends(get_user_store),
     post_store: PostStore = Depends(get_post_store),
     relation_store: RelationStore = Depends(get_relation_store),
-    user: InternalUser = Depends(get_caller_user),
+    user: CallerUser = Depends(get_caller_user),
 ):
     """Like the given post if the user has not already liked the post."""
     post = await post_utils.get_post_and_validate_or_raise(
         post_store, relation_store, caller_user_id=user.id, post_id=post_id
     )
+    # Committed with the like, and rolled back if the post was already liked
+    await jobs.enqueue(tasks.notify_post_liked, post, user)
     await post_store.like_post(user.id, post.id)
-    background_tasks.add_task(tasks.notify_post_liked, post, user)
     return {"likes": await post_store.get_like_count(post.id)}
 
 
@@ -203,7 +219,7 @@ async def unlike_post(
     post_id: PostId,
     post_store: PostStore = Depends(get_post_store),
     relation_store: RelationStore = Depends(get_relation_store),
-    user: InternalUser = Depends(get_caller_user),
+    user: CallerUser = Depends(get_caller_user),
 ):
     """Unlike the given post if the user has already liked the post."""
     post = await post_utils.get_post_and_validate_or_raise(
@@ -216,22 +232,25 @@ async def unlike_post(
 @router.post("/{post_id}/save", response_model=SavePostResponse)
 async def save_post(
     post_id: PostId,
-    background_tasks: BackgroundTasks,
+    jobs: JobQueue = Depends(get_job_queue),
     post_store: PostStore = Depends(get_post_store),
     place_store: PlaceStore = Depends(get_place_store),
     relation_store: RelationStore = Depends(get_relation_store),
-    user: InternalUser = Depends(get_caller_user),
+    user: CallerUser = Depends(get_caller_user),
 ):
     """Save the given post if the user has not already saved the post."""
     post = await post_utils.get_post_and_validate_or_raise(
         post_store, relation_store, caller_user_id=user.id, post_id=post_id
     )
     await post_store.save_post(user.id, post.id)
+
+    async def enqueue_jobs() -> None:
+        await jobs.enqueue(tasks.slack_place_saved, user.username, user.id, post.place.id)
+
     # TODO(gmekkat): Remove after migrating to saved places
     saved_place = await place_store.save_place(
-        user_id=user.id, place_id=post.place.id, note="Want to go", category=post.category
+        user_id=user.id, place_id=post.place.id, note="Want to go", category=post.category, before_commit=enqueue_jobs
     )
-    background_tasks.add_task(tasks.slack_place_saved, user.username, saved_place)
     return {"success": True, "save": saved_place}
 
 
@@ -241,7 +260,7 @@ async def unsave_post(
     post_store: PostStore = Depends(get_post_store),
     place_store: PlaceStore = Depends(get_place_store),
     relation_store: RelationStore = Depends(get_relation_store),
-    user: InternalUser = Depends(get_caller_user),
+    user: CallerUser = Depends(get_caller_user),
 ):
     """Unsave the given post."""
     post: InternalPost = await post_utils.get_post_and_validate_or_raise(
@@ -259,7 +278,7 @@ async def report_post(
     request: ReportPostRequest,
     post_store: PostStore = Depends(get_post_store),
     relation_store: RelationStore = Depends(get_relation_store),
-    reported_by: InternalUser = Depends(get_caller_user),
+    reported_by: CallerUser = Depends(get_caller_user),
 ):
     """Report the given post."""
     post = await post_utils.get_post_and_validate_or_raise(
@@ -273,10 +292,10 @@ async def report_post(
 async def get_comments(
     post_id: PostId,
     cursor: Optional[CursorId] = None,
-    post_store: PostStore = Depends(get_post_store),
+    post_store: PostStore = Depends(get_read_post_store),
     comment_store: CommentStore = Depends(get_comment_store),
     relation_store: RelationStore = Depends(get_relation_store),
-    user: InternalUser = Depends(get_caller_user),
+    user: CallerUser = Depends(get_caller_user),
 ) -> CommentPageResponse:
     post = await post_utils.get_post_and_validate_or_raise(
         post_store, relation_store, caller_user_id=user.id, post_id=post_id
@@ -10,6 +10,10 @@ class SearchStore:
         self.db = db
 
     async def search_users(self, keyword: str) -> list[UserRow]:
+        result = await self.db.execute(self._search_users_query(keyword))
+        return result.scalars().all()  # type: ignore
+
+    def _search_users_query(self, keyword: str) -> sa.sql.Select:
         keyword = keyword.replace("\\", "\\\\").replace("_", "\\_").replace("%", "\\%")
         ilike = f"{keyword}%"
         query = (
@@ -21,6 +25,4 @@ class SearchStore:
             )
             .where(~UserRow.deleted)
         )
-        query = query.order_by(UserRow.follower_count.desc()).limit(25)
-        result = await self.db.execute(query)
-        return result.scalars().all()  # type: ignore
+        return query.order_by(UserRow.follower_count.desc()).limit(25)
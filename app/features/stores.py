@@ -1,7 +1,7 @@
 from fastapi import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database.engine import get_db
+from app.core.database.engine import ReadSession, get_db, get_read_db
 from app.features.comments.comment_store import CommentStore
 from app.features.map.map_store import MapStore
 from app.features.notifications.activity_feed_store import ActivityFeedStore
@@ -10,22 +10,28 @@ from app.features.posts.feed_store import FeedStore
 from app.features.posts.post_store import PostStore
 from app.features.search.search_store import SearchStore
 from app.features.users.relation_store import RelationStore
+from app.features.users.user_cache import user_cache
 from app.features.users.user_store import UserStore
+from app.tasks.queue import JobQueue
 
 
 def get_comment_store(db: AsyncSession = Depends(get_db)):
     return CommentStore(db=db)
 
 
-def get_feed_store(db: AsyncSession = Depends(get_db)):
+def get_feed_store(db: AsyncSession = Depends(get_read_db)):
     return FeedStore(db=db)
 
 
-def get_map_store(db: AsyncSession = Depends(get_db)):
+def get_job_queue(db: AsyncSession = Depends(get_db)):
+    return JobQueue(db=db)
+
+
+def get_map_store(db: AsyncSession = Depends(get_read_db)):
     return MapStore(db=db)
 
 
-def get_notification_store(db: AsyncSession = Depends(get_db)):
+def get_notification_store(db: AsyncSession = Depends(get_read_db)):
     return ActivityFeedStore(db=db)
 
 
@@ -34,16 +40,28 @@ def get_place_store(db: AsyncSession = Depends(get_db)):
 
 
 def get_post_store(db: AsyncSession = Depends(get_db)):
-    return PostStore(db=db)
+    return PostStore(db=db, user_cache=user_cache)
+
+
+def get_read_place_store(db: AsyncSession = Depends(get_read_db)):
+    return PlaceStore(db=db)
+
+
+def get_read_post_store(db: AsyncSession = Depends(get_read_db)):
+    return PostStore(db=db, user_cache=user_cache)
 
 
 def get_relation_store(db: AsyncSession = Depends(get_db)):
-    return RelationStore(db=db)
+    return RelationStore(db=db, user_cache=user_cache)
 
 
 def get_user_store(db: AsyncSession = Depends(get_db)):
-    return UserStore(db=db)
+    return UserStore(db=db, cache=user_cache)
+
+
+def get_read_user_store(db: AsyncSession = Depends(get_read_db)):
+    return UserStore(db=db, cache=user_cache, populate_cache=not isinstance(db.sync_session, ReadSession))
 
 
-def get_search_store(db: AsyncSession = Depends(get_db)):
+def get_search_store(db: AsyncSession = Depends(get_read_db)):
     return SearchStore(db=db)
@@ -4,7 +4,7 @@ from fastapi import Depends, HTTPException, Request
 
 from app.core.firebase import FirebaseUser, get_firebase_user
 from app.features.stores import get_user_store
-from app.features.users.entities import InternalUser
+from app.features.users.entities import CallerUser, InternalUser
 from app.features.users.user_store import UserStore
 
 
@@ -19,7 +19,18 @@ def get_authorization_header(request: Request) -> str:
 async def get_caller_user(
     firebase_user: FirebaseUser = Depends(get_firebase_user),
     user_store: UserStore = Depends(get_user_store),
+) -> CallerUser:
+    user: Optional[CallerUser] = await user_store.get_caller(uid=firebase_user.uid)
+    if user is None or user.deleted:
+        raise HTTPException(403)
+    return user
+
+
+async def get_full_caller_user(
+    firebase_user: FirebaseUser = Depends(get_firebase_user),
+    user_store: UserStore = Depends(get_user_store),
 ) -> InternalUser:
+    """Like get_caller_user, but also loads the profile picture and counts. Only use on routes that need them."""
     user: Optional[InternalUser] = await user_store.get_user(uid=firebase_user.uid)
     if user is None or user.deleted:
         raise HTTPException(403)
@@ -43,20 +43,25 @@ NumMutualFriends = int
 SuggestedUserIdItem = tuple[UserId, NumMutualFriends]
 
 
-class InternalUser(InternalBase):
+class CallerUser(InternalBase):
+    """The authenticated user making a request. Cheap to load, see InternalUser for the full user."""
+
     id: UserId
     uid: str
     username: str
     username_lower: str
+    is_featured: bool
+    is_admin: bool
+    deleted: bool
+
+
+class InternalUser(CallerUser):
     first_name: str
     last_name: str
     phone_number: str | None
     profile_picture_id: ImageId | None
     profile_picture_url: str | None
     profile_picture_blob_name: str | None
-    is_featured: bool
-    is_admin: bool
-    deleted: bool
     created_at: datetime
     updated_at: datetime
     post_count: int
@@ -4,14 +4,21 @@ import sqlalchemy as sa
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.database.helpers import in_array
 from app.core.types import UserId, UserRelationId, CursorId
 from app.features.users.entities import UserRelation
 from app.core.database.models import UserRelationType, UserRelationRow
+from app.features.users.user_cache import UserCache
+
+GET_RELATIONS_QUERY = sa.select(UserRelationRow).where(
+    UserRelationRow.from_user_id == sa.bindparam("from_user_id"), in_array(UserRelationRow.to_user_id, "to_user_ids")
+)
 
 
 class RelationStore:
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, user_cache: Optional[UserCache] = None):
         self.db = db
+        self.user_cache = user_cache
 
     # Scalar query
 
@@ -57,15 +64,13 @@ class RelationStore:
         return user_ids, cursor
 
     async def get_relations(self, from_user_id: UserId, to_user_ids: list[UserId]) -> dict[UserId, UserRelation]:
-        query = sa.select(UserRelationRow).where(
-            UserRelationRow.from_user_id == from_user_id, UserRelationRow.to_user_id.in_(to_user_ids)
-        )
-        result = await self.db.execute(query)
+        result = await self.db.execute(GET_RELATIONS_QUERY, {"from_user_id": from_user_id, "to_user_ids": to_user_ids})
         rows = result.scalars().all()
         return {row.to_user_id: row.relation.value for row in rows}
 
     async def follow_user(self, from_user_id: UserId, to_user_id: UserId) -> None:
         existing = await self._try_add_relation(from_user_id, to_user_id, UserRelationType.following)
+        self._invalidate_follow_counts(from_user_id, to_user_id)
         if existing == UserRelationType.following:
             raise ValueError("Already following user")
         elif existing == UserRelationType.blocked:
@@ -73,6 +78,7 @@ class RelationStore:
 
     async def unfollow_user(self, from_user_id: UserId, to_user_id: UserId) -> None:
         unfollowed = await self._remove_relation(from_user_id, to_user_id, UserRelationType.following)
+        self._invalidate_follow_counts(from_user_id, to_user_id)
         if not unfollowed:
             raise ValueError("Not following user")
 
@@ -101,6 +107,7 @@ class RelationStore:
             UserRelationType.blocked,
             before_commit=before_commit,
         )
+        self._invalidate_follow_counts(from_user_id, to_user_id)
         if existing == UserRelationType.following:
             raise ValueError("Cannot block someone you follow")
         elif existing == UserRelationType.blocked:
@@ -113,6 +120,11 @@ class RelationStore:
 
     # Helpers
 
+    def _invalidate_follow_counts(self, *user_ids: UserId) -> None:
+        """Drop cached users whose follower or following counts may have changed."""
+        if self.user_cache is not None:
+            self.user_cache.invalidate(*user_ids)
+
     async def _try_add_relation(
         self,
         from_user_id: UserId,
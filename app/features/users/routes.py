@@ -1,7 +1,7 @@
 import uuid
 from typing import Optional
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -9,14 +9,20 @@ from app import tasks
 from app.core.database.engine import get_db
 from app.core.database.models import UserRelationRow, UserRelationType
 from app.core.firebase import FirebaseUser, get_firebase_user
+from app.core.responses import ModelResponse
 from app.core.types import SimpleResponse, PostId
-from app.features.places.place_store import PlaceStore
 from app.features.posts import post_utils
 from app.features.posts.post_store import PostStore
 from app.features.posts.types import PaginatedPosts
-from app.features.stores import get_place_store, get_user_store, get_relation_store, get_post_store
+from app.features.stores import (
+    get_job_queue,
+    get_user_store,
+    get_relation_store,
+    get_read_post_store,
+    get_read_user_store,
+)
 from app.features.users.dependencies import get_caller_user
-from app.features.users.entities import UserFieldErrors, PublicUser, InternalUser
+from app.features.users.entities import UserFieldErrors, PublicUser, CallerUser, InternalUser
 from app.features.users.relation_store import RelationStore
 from app.features.users.types import (
     CreateUserResponse,
@@ -26,6 +32,7 @@ from app.features.users.types import (
     CreateUserRequest,
 )
 from app.features.users.user_store import UserStore
+from app.tasks.queue import JobQueue
 
 router = APIRouter(tags=["users"])
 
@@ -34,7 +41,7 @@ async def get_requested_user(
     username: str,
     user_store: UserStore = Depends(get_user_store),
     relation_store: RelationStore = Depends(get_relation_store),
-    caller_user: InternalUser = Depends(get_caller_user),
+    caller_user: CallerUser = Depends(get_caller_user),
 ) -> InternalUser:
     user: InternalUser | None = await user_store.get_user(username=username)
     if (
@@ -53,9 +60,9 @@ async def create_user(
     user_store: UserStore = Depends(get_user_store),
 ):
     """Create a new user."""
-    phone_number: Optional[str] = await firebase_user.shared_firebase.get_phone_number_from_uid(firebase_user.uid)
+    shared_firebase = firebase_user.shared_firebase
+    phone_number, email = await shared_firebase.get_phone_number_and_email_from_uid(firebase_user.uid)
     if phone_number is None:
-        email: Optional[str] = await firebase_user.shared_firebase.get_email_from_uid(firebase_user.uid)
         if email is None or not email.endswith("@jimoapp.com"):
             return CreateUserResponse(
                 created=None,
@@ -83,10 +90,8 @@ async def get_user(
 async def get_posts(
     cursor: Optional[uuid.UUID] = None,
     limit: Optional[int] = 15,
-    user_store: UserStore = Depends(get_user_store),
-    post_store: PostStore = Depends(get_post_store),
-    place_store: PlaceStore = Depends(get_place_store),
-    caller_user: InternalUser = Depends(get_caller_user),
+    post_store: PostStore = Depends(get_read_post_store),
+    caller_user: CallerUser = Depends(get_caller_user),
     requested_user: InternalUser = Depends(get_requested_user),
 ):
     """Get the posts of the given user."""
@@ -96,16 +101,16 @@ async def get_posts(
     # Step 1: Get post ids
     post_ids = await post_store.get_post_ids(requested_user.id, cursor=cursor, limit=page_size)
     if len(post_ids) == 0:
-        return PaginatedPosts(posts=[], cursor=None)
-    posts = await post_utils.get_posts_from_post_ids(caller_user, post_ids, post_store, place_store, user_store)
+        return ModelResponse(PaginatedPosts(posts=[], cursor=None))
+    posts = await post_utils.get_posts_from_post_ids(caller_user, post_ids, post_store)
     next_cursor: Optional[PostId] = min(post.id for post in posts) if len(posts) >= page_size else None
-    return PaginatedPosts(posts=posts, cursor=next_cursor)
+    return ModelResponse(PaginatedPosts(posts=posts, cursor=next_cursor))
 
 
 @router.get("/{username}/relation", response_model=RelationToUser)
 async def get_relation(
     db: AsyncSession = Depends(get_db),
-    from_user: InternalUser = Depends(get_caller_user),
+    from_user: CallerUser = Depends(get_caller_user),
     to_user: InternalUser = Depends(get_requested_user),
 ):
     """Get the relationship to the given user."""
@@ -121,9 +126,9 @@ async def get_relation(
 @router.get("/{username}/followers", response_model=FollowFeedResponse)
 async def get_followers(
     cursor: Optional[uuid.UUID] = None,
-    user_store: UserStore = Depends(get_user_store),
+    user_store: UserStore = Depends(get_read_user_store),
     relation_store: RelationStore = Depends(get_relation_store),
-    user: InternalUser = Depends(get_caller_user),
+    user: CallerUser = Depends(get_caller_user),
     requested_user: InternalUser = Depends(get_requested_user),
 ):
     """Get the followers of the given user."""
@@ -138,9 +143,9 @@ async def get_followers(
 @router.get("/{username}/following", response_model=FollowFeedResponse)
 async def get_following(
     cursor: Optional[uuid.UUID] = None,
-    user_store: UserStore = Depends(get_user_store),
+    user_store: UserStore = Depends(get_read_user_store),
     relation_store: RelationStore = Depends(get_relation_store),
-    user: InternalUser = Depends(get_caller_user),
+    user: CallerUser = Depends(get_caller_user),
     requested_user: InternalUser = Depends(get_requested_user),
 ):
     """Get the given user's following."""
@@ -154,19 +159,20 @@ async def get_following(
 
 @router.post("/{username}/follow", response_model=FollowUserResponse)
 async def follow_user(
-    background_tasks: BackgroundTasks,
+    jobs: JobQueue = Depends(get_job_queue),
     db: AsyncSession = Depends(get_db),
     user_store: UserStore = Depends(get_user_store),
     relation_store: RelationStore = Depends(get_relation_store),
-    from_user: InternalUser = Depends(get_caller_user),
+    from_user: CallerUser = Depends(get_caller_user),
     to_user: InternalUser = Depends(get_requested_user),
 ):
     """Follow the given user."""
     if to_user.id == from_user.id:
         raise HTTPException(400, "Cannot follow yourself")
     try:
+        # Committed with the follow, and discarded if it fails
+        await jobs.enqueue(tasks.notify_follow, to_user.id, followed_by=from_user)
         await relation_store.follow_user(from_user.id, to_user.id)
-        background_tasks.add_task(tasks.notify_follow, to_user.id, followed_by=from_user)
         return FollowUserResponse(followed=True, followers=to_user.follower_count + 1)
     except ValueError as e:
         raise HTTPException(400, detail=str(e))
@@ -175,7 +181,7 @@ async def follow_user(
 @router.post("/{username}/unfollow", response_model=FollowUserResponse)
 async def unfollow_user(
     relation_store: RelationStore = Depends(get_relation_store),
-    from_user: InternalUser = Depends(get_caller_user),
+    from_user: CallerUser = Depends(get_caller_user),
     to_user: InternalUser = Depends(get_requested_user),
 ):
     """Unfollow the given user."""
@@ -191,7 +197,7 @@ async def unfollow_user(
 @router.post("/{username}/block", response_model=SimpleResponse)
 async def block_user(
     relation_store: RelationStore = Depends(get_relation_store),
-    from_user: InternalUser = Depends(get_caller_user),
+    from_user: CallerUser = Depends(get_caller_user),
     to_block: InternalUser = Depends(get_requested_user),
 ):
     """Block the given user."""
@@ -207,7 +213,7 @@ async def block_user(
 @router.post("/{username}/unblock", response_model=SimpleResponse)
 async def unblock_user(
     relation_store: RelationStore = Depends(get_relation_store),
-    from_user: InternalUser = Depends(get_caller_user),
+    from_user: CallerUser = Depends(get_caller_user),
     to_user: InternalUser = Depends(get_requested_user),
 ):
     """Unblock the given user."""
@@ -0,0 +1,116 @@
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from app.core import config
+from app.core.invalidation import InvalidationBus, invalidation_bus
+from app.core.types import Base, UserId
+from app.features.users.entities import InternalUser
+
+
+class CacheStats(Base):
+    size: int
+    max_size: int
+    hits: int
+    misses: int
+
+
+class UserCache:
+    """
+    Bounded, per-worker LRU of hydrated users, looked up by id, uid or username.
+
+    Entries expire after `ttl_seconds`. Writes made through the stores invalidate the affected users explicitly, and the
+    invalidations are published to the other workers through the bus, if given. The TTL only bounds how stale a user
+    can be when an invalidation doesn't reach a worker.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float, bus: Optional[InvalidationBus] = None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.bus = bus
+        if bus is not None:
+            bus.subscribe("user", lambda key: self.evict(UserId(key)), self.clear)
+        self._entries: OrderedDict[UserId, tuple[InternalUser, float]] = OrderedDict()
+        self._ids_by_uid: dict[str, UserId] = {}
+        self._ids_by_username: dict[str, UserId] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(
+        self,
+        user_id: Optional[UserId] = None,
+        uid: Optional[str] = None,
+        username: Optional[str] = None,
+    ) -> Optional[InternalUser]:
+        if user_id is None:
+            if uid is not None:
+                user_id = self._ids_by_uid.get(uid)
+            elif username is not None:
+                user_id = self._ids_by_username.get(username.lower())
+        user = self._get(user_id) if user_id is not None else None
+        if user is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return user
+
+    def get_many(self, user_ids: Iterable[UserId]) -> dict[UserId, InternalUser]:
+        """Return the cached users among the given ids."""
+        users = {}
+        for user_id in user_ids:
+            user = self.get(user_id=user_id)
+            if user is not None:
+                users[user_id] = user
+        return users
+
+    def put(self, user: InternalUser) -> None:
+        self.evict(user.id)
+        self._entries[user.id] = (user, time.monotonic() + self.ttl_seconds)
+        self._ids_by_uid[user.uid] = user.id
+        self._ids_by_username[user.username_lower] = user.id
+        while len(self._entries) > self.max_size:
+            oldest_id = next(iter(self._entries))
+            self.evict(oldest_id)
+
+    def invalidate(self, *user_ids: UserId) -> None:
+        """Remove the given users from this worker's cache and the other workers' caches."""
+        self.evict(*user_ids)
+        if self.bus is not None:
+            self.bus.publish("user", *(str(user_id) for user_id in user_ids))
+
+    def evict(self, *user_ids: UserId) -> None:
+        """Remove the given users from this worker's cache."""
+        for user_id in user_ids:
+            entry = self._entries.pop(user_id, None)
+            if entry is None:
+                continue
+            user, _ = entry
+            if self._ids_by_uid.get(user.uid) == user_id:
+                del self._ids_by_uid[user.uid]
+            if self._ids_by_username.get(user.username_lower) == user_id:
+                del self._ids_by_username[user.username_lower]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._ids_by_uid.clear()
+        self._ids_by_username.clear()
+
+    def stats(self) -> CacheStats:
+        return CacheStats(size=len(self._entries), max_size=self.max_size, hits=self.hits, misses=self.misses)
+
+    def _get(self, user_id: UserId) -> Optional[InternalUser]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        user, expires_at = entry
+        if expires_at <= time.monotonic():
+            self.evict(user_id)
+            return None
+        self._entries.move_to_end(user_id)
+        return user
+
+
+user_cache = UserCache(max_size=config.USER_CACHE_SIZE, ttl_seconds=config.USER_CACHE_TTL_SECONDS, bus=invalidation_bus)
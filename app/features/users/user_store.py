@@ -4,7 +4,7 @@ import sqlalchemy as sa
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database.helpers import eager_load_user_options
+from app.core.database.helpers import eager_load_user_options, in_array
 from app.features.images.image_utils import maybe_get_image
 from app.core.database.models import (
     UserRow,
@@ -18,12 +18,22 @@ from app.features.users.entities import (
     SuggestedUserIdItem,
     UserFieldErrors,
     InternalUser,
+    CallerUser,
+)
+from app.features.users.user_cache import UserCache
+
+GET_USERS_QUERY = (
+    sa.select(UserRow).options(*eager_load_user_options()).where(in_array(UserRow.id, "user_ids"), ~UserRow.deleted)
 )
 
 
 class UserStore:
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, cache: Optional[UserCache] = None, populate_cache: bool = True):
         self.db = db
+        self.cache = cache
+        # Stores reading from a replica only read the cache, a lagging replica could refill it with a stale user right
+        # after a write invalidated it
+        self.populate_cache = populate_cache
 
     async def user_exists(self, username: Optional[str] = None, uid: Optional[str] = None) -> bool:
         """Return whether or not a user (deleted or not) with the given attributes exists."""
@@ -42,6 +52,11 @@ class UserStore:
         uid: Optional[str] = None,
         username: Optional[str] = None,
     ) -> Optional[InternalUser]:
+        lookups = [lookup for lookup in (user_id, uid, username) if lookup]
+        if self.cache is not None and len(lookups) == 1:
+            cached = self.cache.get(user_id=user_id or None, uid=uid or None, username=username or None)
+            if cached is not None:
+                return cached
         query = sa.select(UserRow).options(*eager_load_user_options()).where(~UserRow.deleted)
         if user_id:
             query = query.where(UserRow.id == user_id)
@@ -50,14 +65,41 @@ class UserStore:
         if username:
             query = query.where(UserRow.username_lower == username.lower())
         result = await self.db.execute(query)
-        user: Optional[UserRow] = result.scalars().first()
-        return InternalUser.model_validate(user) if user else None
+        row: Optional[UserRow] = result.scalars().first()
+        if row is None:
+            return None
+        user = InternalUser.model_validate(row)
+        if self.cache is not None and self.populate_cache:
+            self.cache.put(user)
+        return user
 
-    async def get_users(self, user_ids: list[UserId]) -> dict[UserId, InternalUser]:
-        query = sa.select(UserRow).options(*eager_load_user_options()).where(UserRow.id.in_(user_ids), ~UserRow.deleted)
+    async def get_caller(self, uid: str) -> Optional[CallerUser]:
+        """Return the (possibly deleted) user with the given uid without loading their profile or counts."""
+        query = sa.select(
+            UserRow.id,
+            UserRow.uid,
+            UserRow.username,
+            UserRow.username_lower,
+            UserRow.is_featured,
+            UserRow.is_admin,
+            UserRow.deleted,
+        ).where(UserRow.uid == uid)
         result = await self.db.execute(query)
-        users = result.scalars().all()
-        return {user.id: InternalUser.model_validate(user) for user in users}
+        row = result.first()
+        return CallerUser.model_validate(row) if row else None
+
+    async def get_users(self, user_ids: list[UserId]) -> dict[UserId, InternalUser]:
+        users = self.cache.get_many(user_ids) if self.cache is not None else {}
+        missing_ids = [user_id for user_id in user_ids if user_id not in users]
+        if not missing_ids:
+            return users
+        result = await self.db.execute(GET_USERS_QUERY, {"user_ids": missing_ids})
+        for row in result.scalars().all():
+            user = InternalUser.model_validate(row)
+            users[user.id] = user
+            if self.cache is not None and self.populate_cache:
+                self.cache.put(user)
+        return users
 
     async def get_users_by_phone_number(self, phone_numbers: Sequence[PhoneNumber], limit: int = 100) -> list[UserId]:
         """Return up to `limit` users with the given phone numbers."""
@@ -169,6 +211,7 @@ class UserStore:
             user.last_name = last_name
         try:
             await self.db.commit()
+            self.invalidate_cached_users(user_id)
             return await self.get_user(user_id=user_id), None
         except IntegrityError as e:
             await self.db.rollback()
@@ -183,11 +226,13 @@ class UserStore:
         """Mark the given user for deletion"""
         await self.db.execute(sa.update(UserRow).where(UserRow.id == user_id).values(deleted=True))
         await self.db.commit()
+        self.invalidate_cached_users(user_id)
 
     async def hard_delete_user(self, user_id: UserId) -> None:
         """Mark the given user for deletion"""
         await self.db.execute(sa.delete(UserRow).where(UserRow.id == user_id))
         await self.db.commit()
+        self.invalidate_cached_users(user_id)
 
     async def update_preferences(self, user_id: UserId, request: UserPrefs) -> UserPrefs:
         """Update the given user's preferences."""
@@ -211,6 +256,11 @@ class UserStore:
         await self.db.refresh(prefs)
         return UserPrefs.model_validate(prefs)
 
+    def invalidate_cached_users(self, *user_ids: UserId) -> None:
+        """Drop the given users from the cache after they've been modified."""
+        if self.cache is not None:
+            self.cache.invalidate(*user_ids)
+
     def _get_suggested_users_query(self, user_id: UserId, limit: int) -> sa.sql.Select:
         """
         How this is computed:
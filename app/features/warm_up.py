@@ -0,0 +1,82 @@
+"""
+Warm up a worker before it serves requests: open part of each request pool, and run the hot statements on each of
+those connections so they're compiled by SQLAlchemy, prepared by asyncpg (with their types introspected) and, for the
+primary, planned once by postgres. Also loads the Firebase credentials, public keys and bucket.
+"""
+
+import asyncio
+import time
+import uuid
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.core import config
+from app.core.database.engine import engine, read_engine
+from app.core.firebase import warm_up_firebase
+from app.features.notifications.activity_feed_store import ActivityFeedStore
+from app.features.places.place_store import PlaceStore
+from app.features.posts.feed_store import FeedStore
+from app.features.posts.post_store import PostStore
+from app.features.users.relation_store import RelationStore
+from app.features.users.user_store import UserStore
+from app.utils import get_logger
+
+log = get_logger(__name__)
+
+# Doesn't match any row, so the statements run (and get prepared) without returning anything
+_NO_ID = uuid.UUID(int=0)
+
+
+async def run_hot_statements(db: AsyncSession) -> None:
+    """
+    Run the statements most requests use, through the store methods so the SQL is exactly what requests send and the
+    prepared statements are reused. With DB_TAG_QUERIES, requests send tagged statements, prepared on first use instead.
+    """
+    user_id = _NO_ID
+    post_ids = [_NO_ID]
+    # No cache, so the users are looked up in the database
+    user_store = UserStore(db=db)
+    await user_store.get_caller(uid="")
+    await user_store.get_users([user_id])
+    post_store = PostStore(db=db)
+    await post_store.get_posts(post_ids)
+    await post_store.get_public_posts(user_id, post_ids)
+    await post_store.get_liked_posts(user_id, post_ids)
+    place_store = PlaceStore(db=db)
+    await place_store.get_place(_NO_ID)
+    await place_store.get_saved_place_ids(user_id, [_NO_ID])
+    await RelationStore(db=db).get_relations(user_id, [user_id])
+    await FeedStore(db=db).get_feed_ids(user_id)
+    await ActivityFeedStore(db=db).get_follow_feed(user_id)
+
+
+async def _warm_up_connection(warmed_engine: AsyncEngine) -> None:
+    async with warmed_engine.connect() as connection:
+        async with AsyncSession(bind=connection) as db:
+            await run_hot_statements(db)
+
+
+async def warm_up_engine(warmed_engine: AsyncEngine, connections: int) -> None:
+    """Open `connections` connections at the same time, so the pool keeps them, and run the hot statements on each."""
+    await asyncio.gather(*(_warm_up_connection(warmed_engine) for _ in range(connections)))
+
+
+async def warm_up(connections: int = config.WARM_UP_DB_CONNECTIONS) -> Optional[float]:
+    """Warm up the request pools and Firebase, returning how long it took, or None if it failed or timed out."""
+    if connections <= 0:
+        return None
+    start = time.perf_counter()
+    engines = [engine] if read_engine is None else [engine, read_engine]
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(*(warm_up_engine(e, connections) for e in engines), warm_up_firebase()),
+            timeout=config.WARM_UP_TIMEOUT_SECONDS,
+        )
+    except Exception:  # noqa
+        # Whatever didn't get warmed up is set up lazily by the first requests instead
+        log.exception("Warm-up failed after %.2fs", time.perf_counter() - start)
+        return None
+    duration = time.perf_counter() - start
+    log.info("Warmed up %d connection(s) per pool in %.2fs", connections, duration)
+    return duration
@@ -1,8 +1,11 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Depends, UploadFile, File
 from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
 from slowapi import Limiter
 from slowapi.errors import RateLimitExceeded
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.middleware.cors import CORSMiddleware
 from starlette.requests import Request
@@ -11,13 +14,19 @@ from timing_asgi import TimingMiddleware, TimingClient  # type: ignore
 from timing_asgi.integrations import StarletteScopeToName  # type: ignore
 
 from app.core import config
-from app.core.database.engine import get_db
+from app.core.bulkheads import BulkheadMiddleware, bulkheads
+from app.core.database.engine import StickToPrimaryMiddleware, get_db, get_request_pool_wait_seconds
+from app.core.database.query_stats import QueryStatsMiddleware, get_query_stats
+from app.core.database.query_tags import QueryTagMiddleware
+from app.core.database.timeouts import QueryCancellationMiddleware, is_statement_timeout
 from app.core.firebase import FirebaseUser, get_firebase_user
+from app.core.invalidation import invalidation_bus
 from app.features.admin.routes import router as admin_router
 from app.features.comments.routes import router as comment_router
 from app.features.feedback.routes import router as feedback_router
 from app.features.images import image_utils
 from app.features.images.types import ImageUploadResponse
+from app.features.maintenance import scheduler
 from app.features.map.routes import router as map_router
 from app.features.me import router as me_router
 from app.features.notifications.routes import router as notification_router
@@ -26,14 +35,36 @@ from app.features.posts.routes import router as post_router
 from app.features.search.routes import router as search_router
 from app.features.onboarding.routes import router as onboarding_router
 from app.features.users.dependencies import get_authorization_header, get_caller_user
-from app.features.users.entities import InternalUser
+from app.features.users.entities import CallerUser
 from app.features.users.routes import router as user_router
+from app.features.warm_up import warm_up
+from app.tasks.worker import JobWorker
 from app.utils import get_logger
 
 
 log = get_logger(__name__)
 log.info("Initializing server")
-app = FastAPI(openapi_url="/openapi.json" if config.ENABLE_DOCS else None)
+job_worker = JobWorker()
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    if config.CACHE_INVALIDATION_ENABLED:
+        await invalidation_bus.start()
+    # Uvicorn only starts accepting requests once startup completes, so the worker is ready only after the warm-up
+    await warm_up()
+    if config.MAINTENANCE_ENABLED:
+        await scheduler.start()
+    if config.JOB_WORKER_IN_APP:
+        await job_worker.start()
+    log.info("Worker ready")
+    yield
+    await job_worker.stop()
+    await scheduler.stop()
+    await invalidation_bus.stop()
+
+
+app = FastAPI(openapi_url="/openapi.json" if config.ENABLE_DOCS else None, lifespan=lifespan)
 limiter = Limiter(key_func=get_authorization_header)
 app.state.limiter = limiter
 app.title = "Jimo"
@@ -41,10 +72,33 @@ app.title = "Jimo"
 
 class PrintTimings(TimingClient):
     def timing(self, metric_name, timing, tags):
-        log.debug(dict(route=metric_name.removeprefix("main.app.features."), timing=timing, tags=tags))
-
-
+        query_stats = get_query_stats()
+        log.debug(
+            dict(
+                route=metric_name.removeprefix("main.app.features."),
+                timing=timing,
+                tags=tags,
+                **(query_stats.to_log() if query_stats else {}),
+            )
+        )
+
+
+if config.DB_TAG_QUERIES:
+    # Innermost, so it sees the route the router adds to the scope
+    app.add_middleware(QueryTagMiddleware)
 app.add_middleware(TimingMiddleware, client=PrintTimings(), metric_namer=StarletteScopeToName("main", app))
+app.add_middleware(StickToPrimaryMiddleware, window_seconds=config.READ_AFTER_WRITE_SECONDS)
+app.add_middleware(QueryCancellationMiddleware)
+# Must be added after (outside) TimingMiddleware so the stats are available when PrintTimings logs them
+app.add_middleware(QueryStatsMiddleware)
+# Outermost, so rejected requests skip the rest of the stack
+app.add_middleware(
+    BulkheadMiddleware,
+    bulkheads=bulkheads,
+    get_pool_wait_seconds=get_request_pool_wait_seconds,
+    max_pool_wait_seconds=config.LOAD_SHED_POOL_WAIT_SECONDS,
+    retry_after_seconds=config.BULKHEAD_RETRY_AFTER_SECONDS,
+)
 
 if config.ENABLE_DOCS:
     log.warning("Docs enabled")
@@ -79,6 +133,14 @@ def rate_limit_exceeded_handler(_request: Request, _exc: RateLimitExceeded) -> R
     return JSONResponse({"error": "You are going too fast"}, status_code=429)
 
 
+@app.exception_handler(DBAPIError)
+def database_error_handler(_request: Request, exc: DBAPIError) -> Response:
+    if is_statement_timeout(exc):
+        log.warning("Statement timed out: %s", exc.statement)
+        return JSONResponse({"error": "Request timed out"}, status_code=503)
+    raise exc
+
+
 @app.get("/")
 async def index():
     return RedirectResponse("https://www.jimoapp.com/")
@@ -89,7 +151,7 @@ async def upload_image(
     file: UploadFile = File(...),
     firebase_user: FirebaseUser = Depends(get_firebase_user),
     db: AsyncSession = Depends(get_db),
-    user: InternalUser = Depends(get_caller_user),
+    user: CallerUser = Depends(get_caller_user),
 ):
     """Upload the given image to Firebase if allowed, returning the image id (used for posts + profile pictures)."""
     image_upload = await image_utils.upload_image(file, user, firebase_user.shared_firebase, db)
@@ -2,6 +2,7 @@ from app.tasks.push_notifications import (
     notify_post_created,
     notify_post_liked,
     notify_follow,
+    notify_many_followed,
     notify_comment,
     notify_comment_liked,
 )
@@ -13,6 +14,7 @@ __all__ = [
     "notify_post_created",
     "notify_post_liked",
     "notify_follow",
+    "notify_many_followed",
     "notify_comment",
     "notify_comment_liked",
     "slack_onboarding",
@@ -1,6 +1,10 @@
+import uuid
+from typing import Optional
+
 import sqlalchemy as sa
-from app.core.database.engine import get_db_context
+from app.core.database.engine import get_background_db_context
 from app.core.database.models import PlaceRow
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.types import PlaceId
 
@@ -16,27 +20,53 @@ from place_data
 where place_data.place_id = :place_id
 """
 
+# Recomputes the metadata of the next batch of places by id, only writing the places whose metadata changed.
 # substr(..., 14) removes the leading 'MKPOICategory'
-UPDATE_FOR_ALL_PLACES_QUERY = """
-update place
-set city = (
-    select mode() within group (order by jsonb_object_field_text(place_data.additional_data, 'locality'))
-    from place_data
-    where place_data.place_id = place.id
-), category = substr((
-    select mode() within group (order by jsonb_object_field_text(place_data.additional_data, 'poi_category'))
-    from place_data
-    where place_data.place_id = place.id
-), 14);
+UPDATE_PLACES_BATCH_QUERY = """
+with batch as (
+    select place.id, (
+        select mode() within group (order by jsonb_object_field_text(place_data.additional_data, 'locality'))
+        from place_data
+        where place_data.place_id = place.id
+    ) as city, substr((
+        select mode() within group (order by jsonb_object_field_text(place_data.additional_data, 'poi_category'))
+        from place_data
+        where place_data.place_id = place.id
+    ), 14) as category
+    from place
+    where place.id > :after_id
+    order by place.id
+    limit :batch_size
+), updated as (
+    update place
+    set city = batch.city, category = batch.category
+    from batch
+    where place.id = batch.id and (place.city, place.category) is distinct from (batch.city, batch.category)
+    returning place.id
+)
+select (select id from batch order by id desc limit 1) as last_id, (select count(*) from updated) as updated;
 """
 
 
 async def update_place_metadata(place_id: PlaceId):
     """Update the place metadata based on the values in place_data."""
-    async with get_db_context() as db:
+    async with get_background_db_context() as db:
         city = (await db.execute(sa.text(CITY_QUERY), {"place_id": place_id})).scalar_one_or_none()
         mapkit_category = (await db.execute(sa.text(MKPOICATEGORY_QUERY), {"place_id": place_id})).scalar_one_or_none()
         category = mapkit_category.removeprefix("MKPOICategory") if mapkit_category else None
         if city or category:
             await db.execute(sa.update(PlaceRow).where(PlaceRow.id == place_id).values(city=city, category=category))
             await db.commit()
+
+
+async def update_places_metadata_batch(
+    db: AsyncSession, after_id: Optional[PlaceId], batch_size: int
+) -> tuple[int, Optional[PlaceId]]:
+    """
+    Recompute the metadata of up to batch_size places after the given id, and commit. Returns the number of places
+    updated and the id of the last place in the batch, or None once there are no places left.
+    """
+    params = {"after_id": after_id or uuid.UUID(int=0), "batch_size": batch_size}
+    row = (await db.execute(sa.text(UPDATE_PLACES_BATCH_QUERY), params)).one()
+    await db.commit()
+    return row.updated, row.last_id
@@ -1,23 +1,25 @@
-from asyncio import get_event_loop
 from typing import Optional
 
 import sqlalchemy as sa
-from app.core.database.engine import get_db_context
+from app.core.database.engine import get_background_db_context
+from app.core.firebase import messaging_executor
 from app.features.users.user_store import UserStore
 from firebase_admin import messaging  # type: ignore
 from firebase_admin.exceptions import FirebaseError, InvalidArgumentError  # type: ignore
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database.models import FCMTokenRow, UserRelationRow, UserPrefsRow
-from app.core.types import UserId
+from app.core.types import CommentId, PostId, UserId
+from app.features.comments.comment_store import CommentStore
 from app.features.comments.entities import InternalComment
 from app.features.posts.entities import InternalPost
-from app.features.users.entities import InternalUser
+from app.features.posts.post_store import PostStore
+from app.features.users.entities import CallerUser
 
 
 async def notify_post_created(
-    post: InternalPost,
-    post_author: InternalUser,
+    post_id: PostId,
+    post_author: CallerUser,
 ):
     """Notify the post author's followers that they made a new post."""
     if post_author.is_featured:
@@ -29,7 +31,11 @@ async def notify_post_created(
         .where(UserRelationRow.to_user_id == post_author.id, UserPrefsRow.post_notifications)
     )
     query = sa.select(FCMTokenRow).where(FCMTokenRow.user_id.in_(followed_user_ids_subquery))
-    async with get_db_context() as db:
+    async with get_background_db_context() as db:
+        post = await PostStore(db=db).get_post(post_id)
+        if post is None:
+            # Deleted since
+            return
         result = await db.execute(query)
         # TODO: should we paginate this?
         tokens = result.scalars().all()
@@ -44,9 +50,9 @@ async def notify_post_created(
         )
 
 
-async def notify_post_liked(post: InternalPost, liked_by: InternalUser):
+async def notify_post_liked(post: InternalPost, liked_by: CallerUser):
     """Notify the user their post was liked if their notifications are enabled."""
-    async with get_db_context() as db:
+    async with get_background_db_context() as db:
         user_store = UserStore(db=db)
         author_prefs = await user_store.get_user_preferences(post.user_id)
         if liked_by.id != post.user_id and author_prefs.post_liked_notifications:
@@ -56,10 +62,14 @@ async def notify_post_liked(post: InternalPost, liked_by: InternalUser):
 
 async def notify_comment(
     post: InternalPost,
-    comment: InternalComment,
-    comment_by: InternalUser,
+    comment_id: CommentId,
+    comment_by: CallerUser,
 ):
-    async with get_db_context() as db:
+    async with get_background_db_context() as db:
+        comment = await CommentStore(db=db).get_comment(comment_id)
+        if comment is None:
+            # Deleted since
+            return
         user_store = UserStore(db=db)
         post_author_prefs = await user_store.get_user_preferences(post.user_id)
         if comment_by.id != post.user_id and post_author_prefs.comment_notifications:
@@ -69,21 +79,21 @@ async def notify_comment(
 
 async def notify_comment_liked(
     comment: InternalComment,
-    liked_by: InternalUser,
+    liked_by: CallerUser,
 ):
     if liked_by.id == comment.user_id:
         # Don't notify the user who created the comment
         return
-    async with get_db_context() as db:
+    async with get_background_db_context() as db:
         commenter_prefs = await UserStore(db=db).get_user_preferences(comment.user_id)
         if commenter_prefs.comment_liked_notifications:
             body = f'{liked_by.username} likes your comment: "{comment.content}"'
             await _send_notification(db, comment.user_id, body, badge=None, post_id=str(comment.post_id))
 
 
-async def notify_many_followed(user: InternalUser, followed_users: list[UserId]):
+async def notify_many_followed(user: CallerUser, followed_users: list[UserId]):
     """Note: This makes N queries, can optimize later"""
-    async with get_db_context() as db:
+    async with get_background_db_context() as db:
         user_store = UserStore(db)
         for followed in followed_users:
             prefs = await user_store.get_user_preferences(followed)
@@ -91,14 +101,14 @@ async def notify_many_followed(user: InternalUser, followed_users: list[UserId])
                 await _actually_notify_follow(db, followed, followed_by=user)
 
 
-async def notify_follow(user_id: UserId, followed_by: InternalUser):
-    async with get_db_context() as db:
+async def notify_follow(user_id: UserId, followed_by: CallerUser):
+    async with get_background_db_context() as db:
         prefs = await UserStore(db).get_user_preferences(user_id)
         if prefs.follow_notifications:
             await _actually_notify_follow(db, user_id, followed_by)
 
 
-async def _actually_notify_follow(db: AsyncSession, user_id: UserId, followed_by: InternalUser):
+async def _actually_notify_follow(db: AsyncSession, user_id: UserId, followed_by: CallerUser):
     """Notify the user of their new follower."""
     body = f"{followed_by.username} started following you"
     await _send_notification(db, user_id, body, username=str(followed_by.username))
@@ -117,8 +127,7 @@ async def _actually_send_notification(fcm_token: str, body: str, badge: Optional
     apns = _get_apns(badge, **kwargs)
     message = messaging.Message(notification=messaging.Notification(body=body), apns=apns, token=fcm_token)
     try:
-        loop = get_event_loop()
-        await loop.run_in_executor(None, messaging.send, message)
+        await messaging_executor.run(messaging.send, message)
     except (ValueError, FirebaseError, InvalidArgumentError) as e:
         print(f"Exception when notifying: {e}, {e.__dict__}")
 
@@ -0,0 +1,282 @@
+"""
+Durable background jobs, stored in the job table.
+
+Routes enqueue a task function with its arguments (`await jobs.enqueue(tasks.notify_follow, user_id, followed_by=user)`)
+in the transaction of the write the job is for, and worker processes (see app/tasks/worker.py) claim and run them. The
+arguments are stored as JSON and validated back into the types the task function is annotated with, so only the task
+functions exported by app.tasks can be enqueued. Tasks about a row created in the same transaction take its id and load
+it, since the row only exists once the transaction commits.
+
+Workers claim jobs with FOR UPDATE SKIP LOCKED, so they don't block each other. A failed job is retried with backoff,
+and once it runs out of attempts it's dead-lettered: kept with its last error until an admin retries it.
+"""
+
+import datetime
+import functools
+import inspect
+import typing
+from typing import Any, Awaitable, Callable, Optional
+
+import sqlalchemy as sa
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import tasks
+from app.core import config
+from app.core.database.models import JobRow, JobStatus
+from app.core.types import Base, JobId
+
+TaskFunction = Callable[..., Awaitable[None]]
+
+JOB_TYPES: dict[str, TaskFunction] = {name: getattr(tasks, name) for name in tasks.__all__}
+
+
+class Job(Base):
+    id: JobId
+    type: str
+    payload: dict[str, Any]
+    # Including the current attempt
+    attempts: int
+    max_attempts: int
+    run_at: datetime.datetime
+    created_at: datetime.datetime
+
+
+class JobTypeStats(Base):
+    type: str
+    queued: int
+    running: int
+    dead: int
+    # The rest are over the requested window
+    done: int
+    done_per_minute: float
+    # Failed attempts of the jobs that finished
+    retries: int
+    # Time from when a job could run to when it started, time it took to run, and time from enqueue to done
+    mean_wait_ms: Optional[float]
+    p95_wait_ms: Optional[float]
+    mean_run_ms: Optional[float]
+    p95_run_ms: Optional[float]
+    mean_total_ms: Optional[float]
+    # How long the oldest job that could run has been waiting
+    oldest_ready_seconds: Optional[float]
+
+
+class DeadJob(Base):
+    id: JobId
+    type: str
+    payload: dict[str, Any]
+    attempts: int
+    last_error: Optional[str]
+    created_at: datetime.datetime
+    finished_at: Optional[datetime.datetime]
+
+
+@functools.cache
+def _get_adapters(function: TaskFunction) -> dict[str, TypeAdapter]:
+    hints = typing.get_type_hints(function)
+    return {name: TypeAdapter(hints.get(name, Any)) for name in inspect.signature(function).parameters}
+
+
+def dump_arguments(function: TaskFunction, *args, **kwargs) -> dict[str, Any]:
+    """Return the JSON payload for calling the function with the given arguments."""
+    arguments = inspect.signature(function).bind(*args, **kwargs).arguments
+    adapters = _get_adapters(function)
+    return {name: adapters[name].dump_python(value, mode="json") for name, value in arguments.items()}
+
+
+def load_job(job: Job) -> Awaitable[None]:
+    """Return the task call for the given job. Raises a ValueError if it can't run (unknown type or invalid payload)."""
+    function = JOB_TYPES.get(job.type)
+    if function is None:
+        raise ValueError(f"Unknown job type {job.type}")
+    try:
+        inspect.signature(function).bind(**job.payload)
+    except TypeError as e:
+        raise ValueError(f"Invalid arguments: {e}") from e
+    adapters = _get_adapters(function)
+    return function(**{name: adapters[name].validate_python(value) for name, value in job.payload.items()})
+
+
+class JobQueue:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def enqueue(self, function: TaskFunction, *args, **kwargs) -> JobId:
+        """
+        Add a job that calls the given task function with the given arguments, without committing, so the job commits
+        (or rolls back) with the write it's for. Enqueue jobs before the store call that commits that write.
+        """
+        if JOB_TYPES.get(function.__name__) is not function:
+            raise ValueError(f"{function.__name__} is not a job type")
+        job = JobRow(
+            type=function.__name__,
+            payload=dump_arguments(function, *args, **kwargs),
+            max_attempts=config.JOB_MAX_ATTEMPTS,
+        )
+        self.db.add(job)
+        await self.db.flush([job])
+        return job.id
+
+
+async def claim_jobs(db: AsyncSession, limit: int) -> list[Job]:
+    """Mark up to `limit` jobs that are ready to run as running, and commit."""
+    ready = (
+        sa.select(JobRow.id)
+        .where(JobRow.status == JobStatus.queued, JobRow.run_at <= sa.func.now())
+        .order_by(JobRow.run_at)
+        .limit(limit)
+        # Skip the jobs other workers are claiming right now
+        .with_for_update(skip_locked=True)
+        .cte("ready")
+    )
+    query = (
+        sa.update(JobRow)
+        .where(JobRow.id.in_(sa.select(ready.c.id)))
+        .values(status=JobStatus.running, attempts=JobRow.attempts + 1, started_at=sa.func.now())
+        .returning(
+            JobRow.id,
+            JobRow.type,
+            JobRow.payload,
+            JobRow.attempts,
+            JobRow.max_attempts,
+            JobRow.run_at,
+            JobRow.created_at,
+        )
+    )
+    result = await db.execute(query)
+    jobs = [Job(**row._mapping) for row in result]
+    await db.commit()
+    return sorted(jobs, key=lambda job: job.run_at)
+
+
+async def complete_job(db: AsyncSession, job_id: JobId) -> None:
+    query = sa.update(JobRow).where(JobRow.id == job_id).values(status=JobStatus.done, finished_at=sa.func.now())
+    await db.execute(query)
+    await db.commit()
+
+
+async def fail_job(db: AsyncSession, job: Job, error: str, retry_delay_seconds: Optional[float]) -> JobStatus:
+    """
+    Queue the job to run again after the given delay, or dead-letter it if the delay is None or it has no attempts
+    left, and commit. Returns the job's new status.
+    """
+    if retry_delay_seconds is None or job.attempts >= job.max_attempts:
+        values: dict[str, Any] = dict(status=JobStatus.dead, finished_at=sa.func.now())
+    else:
+        run_at = sa.func.now() + datetime.timedelta(seconds=retry_delay_seconds)
+        values = dict(status=JobStatus.queued, run_at=run_at)
+    await db.execute(sa.update(JobRow).where(JobRow.id == job.id).values(last_error=error, **values))
+    await db.commit()
+    return values["status"]
+
+
+async def requeue_stalled_jobs(db: AsyncSession, started_before: datetime.datetime) -> int:
+    """
+    Queue the running jobs started before the given time again, e.g. after their worker was killed, and commit. Jobs
+    with no attempts left are dead-lettered, in case it's the job that kills the worker. Returns the number of jobs.
+    """
+    stalled = (JobRow.status == JobStatus.running, JobRow.started_at < started_before)
+    error = "Stalled, the worker stopped while running the job"
+    dead = await db.execute(
+        sa.update(JobRow)
+        .where(*stalled, JobRow.attempts >= JobRow.max_attempts)
+        .values(status=JobStatus.dead, finished_at=sa.func.now(), last_error=error)
+    )
+    queued = await db.execute(
+        sa.update(JobRow).where(*stalled).values(status=JobStatus.queued, run_at=sa.func.now(), last_error=error)
+    )
+    await db.commit()
+    return dead.rowcount + queued.rowcount  # type: ignore
+
+
+async def delete_finished_jobs(db: AsyncSession, finished_before: datetime.datetime) -> int:
+    """Delete the jobs that succeeded before the given time, and commit. Returns the number of jobs deleted."""
+    query = sa.delete(JobRow).where(JobRow.status == JobStatus.done, JobRow.finished_at < finished_before)
+    result = await db.execute(query)
+    await db.commit()
+    return result.rowcount  # type: ignore
+
+
+async def get_dead_jobs(db: AsyncSession, limit: int) -> list[DeadJob]:
+    query = sa.select(JobRow).where(JobRow.status == JobStatus.dead).order_by(JobRow.finished_at.desc()).limit(limit)
+    result = await db.execute(query)
+    return [DeadJob.model_validate(row) for row in result.scalars()]
+
+
+async def retry_dead_jobs(db: AsyncSession, job_type: Optional[str] = None) -> int:
+    """Queue the dead jobs (of the given type, if any) again with all their attempts, and commit."""
+    query = (
+        sa.update(JobRow)
+        .where(JobRow.status == JobStatus.dead)
+        .values(status=JobStatus.queued, attempts=0, run_at=sa.func.now(), finished_at=None)
+    )
+    if job_type is not None:
+        query = query.where(JobRow.type == job_type)
+    result = await db.execute(query)
+    await db.commit()
+    return result.rowcount  # type: ignore
+
+
+async def get_job_stats(db: AsyncSession, since: datetime.datetime) -> list[JobTypeStats]:
+    """Return the queue depth of each job type, and the throughput and latency of the jobs done since the given time."""
+    result = await db.execute(
+        sa.text(
+            """
+            WITH finished AS (
+                SELECT type, attempts,
+                    extract(epoch FROM started_at - run_at)::float * 1000 AS wait_ms,
+                    extract(epoch FROM finished_at - started_at)::float * 1000 AS run_ms,
+                    extract(epoch FROM finished_at - created_at)::float * 1000 AS total_ms
+                FROM job
+                WHERE status = 'done' AND finished_at >= :since
+            ), pending AS (
+                SELECT type,
+                    count(*) FILTER (WHERE status = 'queued') AS queued,
+                    count(*) FILTER (WHERE status = 'running') AS running,
+                    count(*) FILTER (WHERE status = 'dead') AS dead,
+                    extract(epoch FROM now() - min(run_at) FILTER (WHERE status = 'queued' AND run_at <= now()))::float
+                        AS oldest_ready_seconds
+                FROM job
+                WHERE status != 'done'
+                GROUP BY type
+            ), done AS (
+                SELECT type,
+                    count(*) AS done,
+                    sum(attempts - 1)::bigint AS retries,
+                    avg(wait_ms) AS mean_wait_ms,
+                    percentile_cont(0.95) WITHIN GROUP (ORDER BY wait_ms) AS p95_wait_ms,
+                    avg(run_ms) AS mean_run_ms,
+                    percentile_cont(0.95) WITHIN GROUP (ORDER BY run_ms) AS p95_run_ms,
+                    avg(total_ms) AS mean_total_ms
+                FROM finished
+                GROUP BY type
+            )
+            SELECT type, coalesce(queued, 0) AS queued, coalesce(running, 0) AS running, coalesce(dead, 0) AS dead,
+                coalesce(done, 0) AS done, coalesce(retries, 0) AS retries, mean_wait_ms, p95_wait_ms, mean_run_ms,
+                p95_run_ms, mean_total_ms, oldest_ready_seconds
+            FROM pending FULL JOIN done USING (type)
+            ORDER BY type
+            """
+        ),
+        {"since": since},
+    )
+    minutes = max((datetime.datetime.now(datetime.timezone.utc) - since).total_seconds() / 60, 1 / 60)
+    return [
+        JobTypeStats(
+            type=row.type,
+            queued=row.queued,
+            running=row.running,
+            dead=row.dead,
+            done=row.done,
+            done_per_minute=row.done / minutes,
+            retries=row.retries,
+            mean_wait_ms=row.mean_wait_ms,
+            p95_wait_ms=row.p95_wait_ms,
+            mean_run_ms=row.mean_run_ms,
+            p95_run_ms=row.p95_run_ms,
+            mean_total_ms=row.mean_total_ms,
+            oldest_ready_seconds=row.oldest_ready_seconds,
+        )
+        for row in result
+    ]
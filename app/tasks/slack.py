@@ -1,8 +1,11 @@
 import httpx
 
 from app.core import config
-from app.features.places.entities import SavedPlace
+from app.core.database.engine import get_background_db_context
+from app.core.types import PlaceId, PostId, UserId
+from app.features.places.place_store import PlaceStore
 from app.features.posts.entities import InternalPost
+from app.features.posts.post_store import PostStore
 from app.utils import get_logger
 
 log = get_logger(__name__)
@@ -15,8 +18,11 @@ async def slack_onboarding(username: str, city: str | None, post_count: int, sav
     await _send_message(message)
 
 
-async def slack_post_created(username: str, post: InternalPost):
+async def slack_post_created(username: str, post_id: PostId):
     """Send a message that a user created a post."""
+    post = await _get_post(post_id)
+    if post is None:
+        return
     deep_link = f"https://go.jimoapp.com/view-post?id={str(post.id)}"
     if post.stars is not None:
         message = (
@@ -27,8 +33,11 @@ async def slack_post_created(username: str, post: InternalPost):
     await _send_message(message)
 
 
-async def slack_post_stars_changed(username: str, post: InternalPost, old_stars: int | None):
+async def slack_post_stars_changed(username: str, post_id: PostId, old_stars: int | None):
     """Send a message that a user changed the stars for a post."""
+    post = await _get_post(post_id)
+    if post is None:
+        return
     deep_link = f"https://go.jimoapp.com/view-post?id={str(post.id)}"
     message = (
         f"{username} changed their stars for {post.place.name} from {old_stars} to {post.stars}. View more: {deep_link}"
@@ -36,12 +45,22 @@ async def slack_post_stars_changed(username: str, post: InternalPost, old_stars:
     await _send_message(message)
 
 
-async def slack_place_saved(username: str, save: SavedPlace):
+async def slack_place_saved(username: str, user_id: UserId, place_id: PlaceId):
     """Send a message that a user saved a place."""
+    async with get_background_db_context() as db:
+        save = await PlaceStore(db=db).get_place_save(user_id=user_id, place_id=place_id)
+    if save is None:
+        # Unsaved since
+        return
     message = f"{username} just saved {save.place.name} (note length: {len(save.note)})"
     await _send_message(message)
 
 
+async def _get_post(post_id: PostId) -> InternalPost | None:
+    async with get_background_db_context() as db:
+        return await PostStore(db=db).get_post(post_id)
+
+
 async def _send_message(message: str):
     if not config.SLACK_HOOK:
         return
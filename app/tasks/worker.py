@@ -0,0 +1,178 @@
+"""
+Job worker: claims jobs from the job table (see app/tasks/queue.py) and runs them, outside the request workers.
+
+Run `python -m app.tasks.worker`, as many processes as needed (the Docker image runs one next to the server, see
+start.sh). For development, JOB_WORKER_IN_APP runs one in each server worker instead. Each runs up to
+JOB_WORKER_CONCURRENCY jobs at a time, and also requeues the jobs of workers that died mid-job and deletes old finished
+jobs. On SIGTERM or SIGINT (or server shutdown) it stops claiming jobs and waits for the running ones to finish.
+"""
+
+import argparse
+import asyncio
+import datetime
+import random
+import signal
+import time
+from typing import Optional
+
+from sqlalchemy.exc import DBAPIError
+
+from app.core import config
+from app.core.database.engine import get_background_db_context
+from app.core.database.query_tags import query_tag
+from app.core.database.models import JobStatus
+from app.tasks.queue import (
+    Job,
+    claim_jobs,
+    complete_job,
+    delete_finished_jobs,
+    fail_job,
+    load_job,
+    requeue_stalled_jobs,
+)
+from app.utils import get_logger
+
+log = get_logger(__name__)
+
+# Requeue stalled jobs and delete old finished jobs this often
+_MAINTENANCE_SECONDS = 60
+
+
+class JobWorker:
+    def __init__(
+        self,
+        concurrency: int = config.JOB_WORKER_CONCURRENCY,
+        poll_seconds: float = config.JOB_POLL_SECONDS,
+        backoff_seconds: float = config.JOB_BACKOFF_SECONDS,
+        max_backoff_seconds: float = config.JOB_MAX_BACKOFF_SECONDS,
+        timeout_seconds: float = config.JOB_TIMEOUT_SECONDS,
+        retention_hours: float = config.JOB_RETENTION_HOURS,
+    ):
+        self.concurrency = concurrency
+        self.poll_seconds = poll_seconds
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.timeout_seconds = timeout_seconds
+        self.retention_hours = retention_hours
+        self._running: set[asyncio.Task] = set()
+        self._last_maintenance: Optional[float] = None
+        self._stop = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Run jobs in the background, alongside the server."""
+        if self._task is None:
+            self._stop.clear()
+            self._task = asyncio.create_task(self.run(self._stop))
+
+    async def stop(self) -> None:
+        """Stop claiming jobs and wait for the running ones to finish."""
+        if self._task is not None:
+            self._stop.set()
+            await self._task
+            self._task = None
+
+    def retry_delay(self, attempts: int) -> float:
+        """Return how long to wait before retrying a job that failed its given attempt."""
+        delay = min(self.backoff_seconds * 2 ** (attempts - 1), self.max_backoff_seconds)
+        # Jitter so jobs that failed together (e.g. while a service was down) don't all retry together
+        return delay * random.uniform(0.5, 1)
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """Claim and run jobs until `stop` is set, then wait for the running jobs."""
+        while not stop.is_set():
+            if len(self._running) >= self.concurrency:
+                await asyncio.wait(self._running, return_when=asyncio.FIRST_COMPLETED)
+                continue
+            limit = self.concurrency - len(self._running)
+            try:
+                await self.maintain()
+                async with get_background_db_context() as db:
+                    jobs = await claim_jobs(db, limit)
+            except (OSError, DBAPIError) as e:
+                log.warning("Could not claim jobs: %s", e)
+                jobs = []
+            for job in jobs:
+                task = asyncio.create_task(self.run_job(job))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+            if len(jobs) < limit:
+                # The queue is empty (for now)
+                try:
+                    await asyncio.wait_for(stop.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+        if self._running:
+            log.info("Waiting for %d running jobs", len(self._running))
+            await asyncio.wait(self._running)
+
+    async def maintain(self) -> None:
+        now = time.monotonic()
+        if self._last_maintenance is not None and now - self._last_maintenance < _MAINTENANCE_SECONDS:
+            return
+        self._last_maintenance = now
+        utc_now = datetime.datetime.now(datetime.timezone.utc)
+        async with get_background_db_context() as db:
+            # Running jobs time out, so a job still running after twice the timeout lost its worker
+            stalled = await requeue_stalled_jobs(db, utc_now - datetime.timedelta(seconds=2 * self.timeout_seconds))
+            deleted = await delete_finished_jobs(db, utc_now - datetime.timedelta(hours=self.retention_hours))
+        if stalled:
+            log.warning("Requeued %d stalled jobs", stalled)
+        if deleted:
+            log.info("Deleted %d finished jobs", deleted)
+
+    async def run_job(self, job: Job) -> None:
+        start = time.perf_counter()
+        try:
+            call = load_job(job)
+        except ValueError as e:
+            log.error("Dead-lettering job %s (%s), it can't run: %s", job.id, job.type, e)
+            await self._fail(job, repr(e), retry_delay_seconds=None)
+            return
+        try:
+            with query_tag(f"job {job.type}"):
+                await asyncio.wait_for(call, self.timeout_seconds)
+        except Exception as e:
+            error = "Timed out" if isinstance(e, asyncio.TimeoutError) else repr(e)
+            log.exception("Job %s (%s) failed on attempt %d", job.id, job.type, job.attempts)
+            await self._fail(job, error, retry_delay_seconds=self.retry_delay(job.attempts))
+            return
+        log.debug("Ran job %s (%s) in %.0f ms", job.id, job.type, (time.perf_counter() - start) * 1000)
+        try:
+            async with get_background_db_context() as db:
+                await complete_job(db, job.id)
+        except (OSError, DBAPIError):
+            # It's requeued once it's stalled, so it may run again
+            log.exception("Could not mark job %s (%s) done", job.id, job.type)
+
+    async def _fail(self, job: Job, error: str, retry_delay_seconds: Optional[float]) -> None:
+        try:
+            async with get_background_db_context() as db:
+                status = await fail_job(db, job, error, retry_delay_seconds)
+        except (OSError, DBAPIError):
+            log.exception("Could not mark job %s (%s) failed", job.id, job.type)
+            return
+        if status is JobStatus.dead:
+            log.error("Job %s (%s) is dead after %d attempts: %s", job.id, job.type, job.attempts, error)
+
+
+async def main(concurrency: int) -> None:
+    from app.core.database.engine import background_engine
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+    log.info("Job worker started, running up to %d jobs at a time", concurrency)
+    await JobWorker(concurrency=concurrency).run(stop)
+    log.info("Job worker stopped")
+    await background_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run background jobs.")
+    parser.add_argument(
+        "--concurrency", type=int, default=config.JOB_WORKER_CONCURRENCY, help="Max number of jobs to run at a time"
+    )
+    args = parser.parse_args()
+    asyncio.run(main(concurrency=args.concurrency))
@@ -0,0 +1,23 @@
+#!/bin/bash
+# Start the server and a job worker process next to it (see app/tasks/worker.py), so jobs don't run in the request
+# workers. Set JOB_WORKER_PROCESS=0 where the job worker is deployed as its own service instead.
+pids=()
+gunicorn \
+    --bind :$PORT \
+    --workers 3 \
+    -k uvicorn.workers.UvicornWorker \
+    --access-logfile - \
+    app.main:app &
+pids+=($!)
+if [ "${JOB_WORKER_PROCESS:-1}" = "1" ]; then
+    python -m app.tasks.worker &
+    pids+=($!)
+fi
+
+trap 'kill -TERM "${pids[@]}" 2>/dev/null' TERM INT
+# Stop the container (so it's restarted) if either process exits
+wait -n
+status=$?
+kill -TERM "${pids[@]}" 2>/dev/null
+wait
+exit $status
@@ -10,6 +10,8 @@ from sqlalchemy.orm import sessionmaker
 from app.core import config
 from app.core.database.models import Base
 from app.features.posts import categories
+from app.features.admin.pagination import count_cache
+from app.features.users.user_cache import user_cache
 
 TEST_DATABASE_NAME = "jimo_test_db"
 
@@ -17,10 +19,11 @@ TEST_DATABASE_NAME = "jimo_test_db"
 @pytest_asyncio.fixture
 async def engine():
     check_db_name()
-    from app.core.database.engine import engine
+    from app.core.database.engine import engine, background_engine
 
     yield engine
     await engine.dispose()
+    await background_engine.dispose()
 
 
 @pytest.fixture(scope="session")
@@ -36,6 +39,9 @@ async def create(engine):
         await conn.run_sync(reset_db)
         await conn.run_sync(Base.metadata.create_all)
         await conn.run_sync(populate_categories)
+    # Tests recreate the same users, so don't let cached users (or counts) leak between tests
+    user_cache.clear()
+    count_cache.clear()
     yield
     async with engine.begin() as conn:
         await conn.run_sync(reset_db)
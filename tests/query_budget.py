@@ -0,0 +1,12 @@
+from contextlib import contextmanager
+from typing import Iterator
+
+from app.core.database.query_stats import QueryStats, track_queries
+
+
+@contextmanager
+def assert_max_queries(max_queries: int) -> Iterator[QueryStats]:
+    """Fail if the block runs more than `max_queries` SQL statements. Use to catch N+1 queries."""
+    with track_queries() as stats:
+        yield stats
+    assert stats.count <= max_queries, f"Expected at most {max_queries} queries, ran {stats.count}"
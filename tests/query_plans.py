@@ -0,0 +1,52 @@
+import json
+import os
+import re
+from pathlib import Path
+from typing import Iterator
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+BASELINES_PATH = Path(__file__).parent / "query_plan_baselines.json"
+# Fail when a plan's estimated cost grows by more than this factor over its baseline
+COST_TOLERANCE = 1.5
+# Set to record the current estimated costs as the new baselines
+UPDATE_BASELINES = os.environ.get("UPDATE_QUERY_PLAN_BASELINES") == "1"
+# Suffix of the hash partitions, see app/core/database/partitioning.py
+PARTITION_NAME = re.compile(r"_p\d+$")
+
+
+async def explain(connection: AsyncConnection, query: sa.sql.Select) -> dict:
+    """Return the root plan node of the query (with its parameters inlined, like a custom plan)."""
+    sql = query.compile(dialect=postgresql.asyncpg.dialect(), compile_kwargs={"literal_binds": True})  # type: ignore
+    result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}")
+    plan = result.scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+def plan_nodes(plan: dict) -> Iterator[dict]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def seq_scanned_tables(plan: dict) -> set[str]:
+    """Return the tables the plan scans sequentially, with the partitions of a partitioned table named after it."""
+    return {
+        PARTITION_NAME.sub("", node["Relation Name"]) for node in plan_nodes(plan) if node["Node Type"] == "Seq Scan"
+    }
+
+
+def load_baselines() -> dict[str, float]:
+    if not BASELINES_PATH.exists():
+        return {}
+    return json.loads(BASELINES_PATH.read_text())
+
+
+def save_baseline(name: str, cost: float) -> None:
+    baselines = load_baselines()
+    baselines[name] = cost
+    BASELINES_PATH.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
@@ -1,3 +1,4 @@
+import datetime
 import uuid
 from contextlib import asynccontextmanager
 from unittest import mock
@@ -10,7 +11,11 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database.models import UserRow, PlaceRow, PostRow
 from app.core.firebase import FirebaseUser, get_firebase_user
+from app.core.invalidation import invalidation_bus
 from app.features.admin.routes import get_admin_or_raise
+from app.features.admin.slow_queries import get_generic_plan
+from app.features.posts.archive import archive_deleted_posts
+from app.features.users.user_cache import user_cache
 from app.features.users.user_store import UserStore
 from app.main import app as main_app
 from tests.mock_firebase import MockFirebaseAdmin
@@ -118,6 +123,36 @@ async def test_auth_for_all_get_endpoints(session, client):
             assert response.status_code == 200
 
 
+async def test_paginate_users(session, client):
+    async with request_as_admin(session):
+        response = await client.get("/admin/users", params={"limit": 2})
+        assert response.status_code == 200
+        first_page = response.json()
+        assert first_page["total"] is None
+        assert len(first_page["data"]) == 2
+        assert first_page["cursor"] == first_page["data"][-1]["userId"]
+
+    async with request_as_admin(session):
+        response = await client.get("/admin/users", params={"limit": 2, "cursor": first_page["cursor"]})
+        assert response.status_code == 200
+        second_page = response.json()
+        assert len(second_page["data"]) == 1
+        assert second_page["cursor"] is None
+
+    user_ids = [user["userId"] for user in first_page["data"] + second_page["data"]]
+    assert user_ids == sorted(user_ids, reverse=True)
+
+
+async def test_listing_totals(session, client):
+    async with request_as_admin(session):
+        response = await client.get("/admin/users", params={"total": True})
+        assert response.json()["total"] == 3
+
+    async with request_as_admin(session):
+        response = await client.get("/admin/admins", params={"total": True})
+        assert response.json()["total"] == 2
+
+
 async def test_create_update_users(session, client):
     path = "/admin/users"
     create_user_request = {
@@ -194,3 +229,60 @@ async def test_create_update_post(session, client):
         all_posts_json = all_posts.json()["data"]
         assert len(all_posts_json) == 1
         assert all_posts_json[0]["deleted"]
+
+
+async def test_delete_post_invalidates_caches(session, client):
+    post = await session.get(PostRow, INITIAL_POST_ID)
+    assert post is not None
+    user_id = post.user_id
+    path = f"/admin/posts/{INITIAL_POST_ID}"
+    with mock.patch.object(user_cache, "invalidate") as invalidate, mock.patch.object(
+        invalidation_bus, "publish"
+    ) as publish:
+        async with request_as_admin(session):
+            response = await client.post(path, json={"content": "edited"})
+            assert response.status_code == 200
+        invalidate.assert_not_called()
+        publish.assert_not_called()
+
+        async with request_as_admin(session):
+            response = await client.post(path, json={"deleted": True})
+            assert response.status_code == 200
+        invalidate.assert_called_once_with(user_id)
+        publish.assert_called_once_with("post", str(INITIAL_POST_ID))
+
+
+async def test_restore_archived_post(session, client):
+    path = f"/admin/posts/{INITIAL_POST_ID}"
+    async with request_as_admin(session):
+        response = await client.post(path, json={"deleted": True})
+        assert response.status_code == 200
+    assert await archive_deleted_posts(session, datetime.datetime.now(datetime.timezone.utc), batch_size=10) == 1
+
+    async with request_as_admin(session):
+        response = await client.post(path, json={"deleted": False})
+        assert response.status_code == 200
+        assert not response.json()["deleted"]
+    post = await session.get(PostRow, INITIAL_POST_ID, populate_existing=True)
+    assert post is not None and not post.deleted
+
+
+async def test_slow_queries(session, client):
+    async with request_as_admin(session):
+        response = await client.get("/admin/slow-queries", params={"limit": 5})
+    assert response.status_code == 200
+    report = response.json()
+    if report["enabled"]:
+        assert len(report["queries"]) <= 5
+    else:
+        assert report["queries"] == []
+
+
+async def test_generic_plan(session):
+    plan = await get_generic_plan(session, "/* test */ SELECT * FROM post WHERE user_id = $1 AND NOT deleted")
+    assert plan is not None
+    assert "Plan" in plan[0]
+    # Explaining doesn't leave the statement prepared, so it can be explained again
+    assert await get_generic_plan(session, "SELECT * FROM post WHERE user_id = $1") is not None
+    assert await get_generic_plan(session, "SELECT * FROM missing_table WHERE id = $1") is None
+    assert (await session.execute(select(PostRow.id).limit(1))).all() is not None
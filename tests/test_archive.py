@@ -0,0 +1,100 @@
+import datetime
+import uuid
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+
+from app.core.database.models import (
+    CommentLikeRow,
+    CommentRow,
+    PlaceRow,
+    PostLikeRow,
+    PostRow,
+    PostSaveRow,
+    UserRow,
+    comment_archive,
+    comment_like_archive,
+    post_archive,
+    post_like_archive,
+    post_save_archive,
+)
+from app.features.posts.archive import HOT_TABLES, archive, archive_deleted_posts, get_table_stats, restore_post
+
+pytestmark = pytest.mark.asyncio
+
+USER_ID = uuid.uuid4()
+DELETED_POST_ID = uuid.uuid4()
+POST_ID = uuid.uuid4()
+COMMENT_ID = uuid.uuid4()
+
+
+def later() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1)
+
+
+@pytest_asyncio.fixture(autouse=True, scope="function")
+async def setup_fixture(session):
+    session.add(UserRow(id=USER_ID, uid="uid", username="user", first_name="first", last_name="last"))
+    places = [PlaceRow(name=f"place{i}", latitude=i, longitude=i) for i in range(2)]
+    session.add_all(places)
+    await session.flush()
+    session.add(PostRow(id=DELETED_POST_ID, user_id=USER_ID, place_id=places[0].id, category="food", content=""))
+    session.add(PostRow(id=POST_ID, user_id=USER_ID, place_id=places[1].id, category="food", content=""))
+    await session.flush()
+    session.add(PostLikeRow(user_id=USER_ID, post_id=DELETED_POST_ID))
+    session.add(PostSaveRow(user_id=USER_ID, post_id=DELETED_POST_ID))
+    session.add(PostLikeRow(user_id=USER_ID, post_id=POST_ID))
+    session.add(CommentRow(id=COMMENT_ID, user_id=USER_ID, post_id=DELETED_POST_ID, content="comment"))
+    await session.flush()
+    session.add(CommentLikeRow(user_id=USER_ID, comment_id=COMMENT_ID))
+    await session.commit()
+    post = await session.get(PostRow, DELETED_POST_ID)
+    post.deleted = True
+    await session.commit()
+
+
+async def count(session, table) -> int:
+    return (await session.execute(select(func.count()).select_from(table))).scalar_one()
+
+
+async def test_archive_deleted_posts(session):
+    assert await archive_deleted_posts(session, later(), batch_size=10) == 1
+    assert await session.get(PostRow, DELETED_POST_ID, populate_existing=True) is None
+    assert await count(session, PostLikeRow) == 1
+    assert await count(session, PostSaveRow) == 0
+    assert await count(session, CommentRow) == 0
+    assert await count(session, CommentLikeRow) == 0
+    for table in (post_archive, post_like_archive, post_save_archive, comment_archive, comment_like_archive):
+        assert await count(session, table) == 1
+    assert await archive_deleted_posts(session, later(), batch_size=10) == 0
+
+
+async def test_recently_deleted_posts_are_kept(session):
+    deleted_before = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=1)
+    assert await archive(session, deleted_before, batch_size=10) == 0
+    assert await count(session, post_archive) == 0
+
+
+async def test_restore_post(session):
+    await archive_deleted_posts(session, later(), batch_size=10)
+    assert await restore_post(session, DELETED_POST_ID)
+    await session.commit()
+    assert not await restore_post(session, DELETED_POST_ID)
+
+    post = await session.get(PostRow, DELETED_POST_ID, populate_existing=True)
+    assert post is not None and post.deleted
+    # The counts are rebuilt by the triggers as the likes and comments are restored
+    assert post.like_count == 1
+    assert post.comment_count == 1
+    comment = await session.get(CommentRow, COMMENT_ID, populate_existing=True)
+    assert comment is not None and comment.like_count == 1
+    assert await count(session, PostSaveRow) == 1
+    for table in (post_archive, post_like_archive, post_save_archive, comment_archive, comment_like_archive):
+        assert await count(session, table) == 0
+
+
+async def test_table_stats(session):
+    stats = await get_table_stats(session, HOT_TABLES)
+    assert [table.name for table in stats] == sorted(HOT_TABLES)
+    assert all(table.index_bytes > 0 for table in stats)
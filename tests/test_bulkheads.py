@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from app.core.bulkheads import BulkheadMiddleware, Bulkheads, get_route_group
+
+pytestmark = pytest.mark.asyncio
+
+
+def make_scope(method: str, path: str) -> dict:
+    return {"type": "http", "method": method, "path": path, "headers": []}
+
+
+async def call(middleware: BulkheadMiddleware, method: str, path: str) -> list[dict]:
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message)
+
+    await middleware(make_scope(method, path), receive, send)
+    return sent
+
+
+async def ok_app(_scope, _receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def test_route_groups():
+    assert get_route_group("GET", "/admin/metrics") == "admin"
+    assert get_route_group("POST", "/map/load") == "map"
+    assert get_route_group("POST", "/posts") == "writes"
+    assert get_route_group("GET", "/me/feed") == "feed"
+    assert get_route_group("GET", "/users/someone/posts") == "feed"
+    assert get_route_group("GET", "/places/123/details") == "feed"
+    assert get_route_group("GET", "/me") == "auth"
+    assert get_route_group("GET", "/users/someone") == "auth"
+
+
+async def test_rejects_requests_over_the_limit():
+    bulkheads = Bulkheads({"map": 1, "feed": 1})
+    started, release = asyncio.Event(), asyncio.Event()
+
+    async def slow_app(scope, receive, send):
+        started.set()
+        await release.wait()
+        await ok_app(scope, receive, send)
+
+    middleware = BulkheadMiddleware(
+        slow_app, bulkheads, get_pool_wait_seconds=lambda: 0, max_pool_wait_seconds=1, retry_after_seconds=5
+    )
+    first = asyncio.ensure_future(call(middleware, "POST", "/map/load"))
+    await started.wait()
+    assert bulkheads.get("map").in_flight == 1
+
+    rejected = await call(middleware, "POST", "/map/load")
+    assert rejected[0]["status"] == 503
+    assert (b"retry-after", b"5") in rejected[0]["headers"]
+    # Other groups are unaffected
+    release.set()
+    assert (await call(middleware, "GET", "/me/feed"))[0]["status"] == 200
+    assert (await first)[0]["status"] == 200
+    stats = {s.name: s for s in bulkheads.stats()}
+    assert stats["map"].in_flight == 0
+    assert stats["map"].rejected == 1
+
+
+async def test_sheds_load_while_the_pool_is_saturated():
+    pool_wait_seconds = 3.0
+    bulkheads = Bulkheads({"feed": 10, "admin": 1})
+    middleware = BulkheadMiddleware(
+        ok_app,
+        bulkheads,
+        get_pool_wait_seconds=lambda: pool_wait_seconds,
+        max_pool_wait_seconds=1,
+        retry_after_seconds=5,
+    )
+    assert (await call(middleware, "GET", "/me/feed"))[0]["status"] == 503
+    assert (await call(middleware, "GET", "/admin/metrics"))[0]["status"] == 200
+    pool_wait_seconds = 0
+    assert (await call(middleware, "GET", "/me/feed"))[0]["status"] == 200
+    assert bulkheads.get("feed").stats().shed == 1
+
+
+async def test_ungrouped_requests_pass_through():
+    middleware = BulkheadMiddleware(
+        ok_app, Bulkheads({}), get_pool_wait_seconds=lambda: 10, max_pool_wait_seconds=1, retry_after_seconds=5
+    )
+    assert (await call(middleware, "GET", "/me"))[0]["status"] == 200
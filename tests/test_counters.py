@@ -0,0 +1,107 @@
+import uuid
+
+import pytest
+import pytest_asyncio
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.core.database.counters import reconcile_counters
+from app.core.database.models import (
+    CommentLikeRow,
+    CommentRow,
+    PlaceRow,
+    PostLikeRow,
+    PostRow,
+    UserRelationRow,
+    UserRelationType,
+    UserRow,
+)
+
+pytestmark = pytest.mark.asyncio
+USER_A_ID = uuid.uuid4()
+USER_B_ID = uuid.uuid4()
+PLACE_ID = uuid.uuid4()
+POST_ID = uuid.uuid4()
+COMMENT_ID = uuid.uuid4()
+
+
+@pytest_asyncio.fixture(autouse=True, scope="function")
+async def setup_fixture(session):
+    session.add(UserRow(id=USER_A_ID, uid="a", username="a", first_name="a", last_name="a"))
+    session.add(UserRow(id=USER_B_ID, uid="b", username="b", first_name="b", last_name="b"))
+    session.add(PlaceRow(id=PLACE_ID, name="place", latitude=0, longitude=0))
+    await session.commit()
+    session.add(PostRow(id=POST_ID, user_id=USER_A_ID, place_id=PLACE_ID, category="food", content=""))
+    await session.commit()
+    session.add(CommentRow(id=COMMENT_ID, user_id=USER_B_ID, post_id=POST_ID, content="comment"))
+    session.add(PostLikeRow(user_id=USER_B_ID, post_id=POST_ID))
+    session.add(UserRelationRow(from_user_id=USER_B_ID, to_user_id=USER_A_ID, relation=UserRelationType.following))
+    await session.commit()
+    session.add(CommentLikeRow(user_id=USER_A_ID, comment_id=COMMENT_ID))
+    await session.commit()
+
+
+async def get_counts(session: AsyncSession):
+    user_a = await session.get(UserRow, USER_A_ID, populate_existing=True)
+    user_b = await session.get(UserRow, USER_B_ID, populate_existing=True)
+    post = await session.get(PostRow, POST_ID, populate_existing=True)
+    comment = await session.get(CommentRow, COMMENT_ID, populate_existing=True)
+    return user_a, user_b, post, comment
+
+
+async def test_counts_updated_on_insert(session: AsyncSession):
+    user_a, user_b, post, comment = await get_counts(session)
+    assert (user_a.post_count, user_a.follower_count, user_a.following_count) == (1, 1, 0)
+    assert (user_b.post_count, user_b.follower_count, user_b.following_count) == (0, 0, 1)
+    assert (post.like_count, post.comment_count) == (1, 1)
+    assert comment.like_count == 1
+
+
+async def test_counts_updated_on_soft_delete(session: AsyncSession):
+    await session.execute(sa.update(CommentRow).where(CommentRow.id == COMMENT_ID).values(deleted=True))
+    await session.execute(sa.update(PostRow).where(PostRow.id == POST_ID).values(deleted=True))
+    await session.commit()
+    user_a, _, post, _ = await get_counts(session)
+    assert user_a.post_count == 0
+    assert post.comment_count == 0
+
+
+async def test_counts_updated_on_block(session: AsyncSession):
+    # Blocking replaces the follow relation
+    await session.execute(
+        sa.update(UserRelationRow)
+        .where(UserRelationRow.from_user_id == USER_B_ID)
+        .values(relation=UserRelationType.blocked)
+    )
+    await session.commit()
+    user_a, user_b, _, _ = await get_counts(session)
+    assert user_a.follower_count == 0
+    assert user_b.following_count == 0
+
+
+async def test_counts_updated_on_cascading_delete(session: AsyncSession):
+    await session.execute(sa.delete(UserRow).where(UserRow.id == USER_B_ID))
+    await session.commit()
+    user_a, _, post, _ = await get_counts(session)
+    assert user_a.follower_count == 0
+    assert (post.like_count, post.comment_count) == (0, 0)
+
+
+async def test_reconcile_counters(session: AsyncSession, engine: AsyncEngine):
+    def reconcile(connection, repair: bool):
+        return reconcile_counters(connection, repair=repair, batch_size=1)
+
+    connection = await session.connection()
+    assert not any((await connection.run_sync(reconcile, False)).values())
+
+    await session.execute(sa.update(PostRow).where(PostRow.id == POST_ID).values(like_count=10))
+    drift = await connection.run_sync(reconcile, False)
+    assert drift["post.like_count"] == 1
+    await session.commit()
+
+    # Repairing commits each batch, so it runs on a connection of its own
+    async with engine.connect() as repair_connection:
+        drift = await repair_connection.run_sync(reconcile, True)
+    assert drift["post.like_count"] == 1
+    _, _, post, _ = await get_counts(session)
+    assert post.like_count == 1
@@ -0,0 +1,49 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.core.executors import InstrumentedExecutor
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_executor_runs_in_named_thread():
+    executor = InstrumentedExecutor("test", max_workers=1)
+    name = await executor.run(lambda: threading.current_thread().name)
+    assert name.startswith("test")
+    stats = executor.stats()
+    assert stats.completed == 1
+    assert stats.queued == 0
+    assert stats.running == 0
+    executor.shutdown()
+
+
+async def test_executor_tracks_queue_depth_and_wait_time():
+    executor = InstrumentedExecutor("test", max_workers=1)
+    release = threading.Event()
+    first = asyncio.ensure_future(executor.run(release.wait))
+    second = asyncio.ensure_future(executor.run(lambda: None))
+    await asyncio.sleep(0.05)
+    stats = executor.stats()
+    assert stats.running == 1
+    assert stats.queued == 1
+    release.set()
+    await asyncio.gather(first, second)
+    stats = executor.stats()
+    assert stats.completed == 2
+    assert stats.queued == 0
+    assert stats.max_wait_ms >= 40
+    executor.shutdown()
+
+
+async def test_executor_propagates_exceptions():
+    executor = InstrumentedExecutor("test", max_workers=1)
+
+    def fail():
+        raise ValueError()
+
+    with pytest.raises(ValueError):
+        await executor.run(fail)
+    assert executor.stats().running == 0
+    executor.shutdown()
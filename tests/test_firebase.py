@@ -0,0 +1,69 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.core.firebase import VerifiedTokenCache
+
+pytestmark = pytest.mark.asyncio
+
+
+def decoded_token(uid: str, expires_in: float = 3600) -> dict:
+    return {"uid": uid, "exp": time.time() + expires_in}
+
+
+async def test_token_cache_hit():
+    cache = VerifiedTokenCache(max_size=10)
+    verify = AsyncMock(return_value=decoded_token("uid"))
+    assert await cache.get_uid("token", verify) == "uid"
+    assert await cache.get_uid("token", verify) == "uid"
+    verify.assert_awaited_once_with("token")
+
+
+async def test_token_cache_invalid_token_not_cached():
+    cache = VerifiedTokenCache(max_size=10)
+    verify = AsyncMock(return_value=None)
+    assert await cache.get_uid("token", verify) is None
+    assert await cache.get_uid("token", verify) is None
+    assert verify.await_count == 2
+    assert len(cache) == 0
+
+
+async def test_token_cache_expired_token():
+    cache = VerifiedTokenCache(max_size=10)
+    verify = AsyncMock(return_value=decoded_token("uid", expires_in=-1))
+    assert await cache.get_uid("token", verify) == "uid"
+    assert await cache.get_uid("token", verify) == "uid"
+    assert verify.await_count == 2
+    assert len(cache) == 0
+
+
+async def test_token_cache_evicts_least_recently_used():
+    cache = VerifiedTokenCache(max_size=2)
+    verify = AsyncMock(side_effect=lambda token: decoded_token(token))
+    await cache.get_uid("a", verify)
+    await cache.get_uid("b", verify)
+    await cache.get_uid("a", verify)
+    await cache.get_uid("c", verify)
+    assert len(cache) == 2
+    verify.reset_mock()
+    await cache.get_uid("a", verify)
+    verify.assert_not_awaited()
+    await cache.get_uid("b", verify)
+    verify.assert_awaited_once_with("b")
+
+
+async def test_token_cache_concurrent_verifications_collapse():
+    cache = VerifiedTokenCache(max_size=10)
+    calls = 0
+
+    async def verify(_token: str):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return decoded_token("uid")
+
+    uids = await asyncio.gather(*[cache.get_uid("token", verify) for _ in range(10)])
+    assert uids == ["uid"] * 10
+    assert calls == 1
@@ -0,0 +1,124 @@
+import asyncio
+import datetime
+import time
+
+import httpx
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from google.auth import crypt, jwt
+
+from app.core.id_tokens import GooglePublicKeys, IdTokenVerifier, StaticPublicKeys
+
+pytestmark = pytest.mark.asyncio
+PROJECT_ID = "test-project"
+KEY_ID = "test-key"
+
+
+def generate_key_and_cert() -> tuple[str, str]:
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "test")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    private_pem = key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+    return private_pem, cert.public_bytes(serialization.Encoding.PEM).decode()
+
+
+PRIVATE_KEY, CERT = generate_key_and_cert()
+OTHER_PRIVATE_KEY, _ = generate_key_and_cert()
+
+
+def make_token(private_key: str = PRIVATE_KEY, key_id: str = KEY_ID, **overrides) -> str:
+    now = int(time.time())
+    payload = {
+        "iss": f"https://securetoken.google.com/{PROJECT_ID}",
+        "aud": PROJECT_ID,
+        "sub": "uid",
+        "iat": now,
+        "exp": now + 3600,
+        "auth_time": now,
+    }
+    payload.update(overrides)
+    signer = crypt.RSASigner.from_string(private_key, key_id=key_id)
+    return jwt.encode(signer, payload).decode()
+
+
+@pytest.fixture
+def verifier() -> IdTokenVerifier:
+    return IdTokenVerifier(project_id=PROJECT_ID, keys=StaticPublicKeys({KEY_ID: CERT}))
+
+
+async def test_verify_valid_token(verifier: IdTokenVerifier):
+    decoded = await verifier.verify(make_token())
+    assert decoded is not None
+    assert decoded["uid"] == "uid"
+
+
+async def test_verify_invalid_tokens(verifier: IdTokenVerifier):
+    now = int(time.time())
+    assert await verifier.verify("") is None
+    assert await verifier.verify("not-a-token") is None
+    assert await verifier.verify(make_token(iat=now - 7200, exp=now - 3600)) is None
+    assert await verifier.verify(make_token(aud="other-project")) is None
+    assert await verifier.verify(make_token(iss="https://securetoken.google.com/other-project")) is None
+    assert await verifier.verify(make_token(sub="")) is None
+    assert await verifier.verify(make_token(key_id="unknown-key")) is None
+    assert await verifier.verify(make_token(private_key=OTHER_PRIVATE_KEY)) is None
+
+
+async def test_google_public_keys_cached_until_expiry():
+    requests = 0
+
+    def handler(_request: httpx.Request) -> httpx.Response:
+        nonlocal requests
+        requests += 1
+        return httpx.Response(200, json={KEY_ID: CERT}, headers={"cache-control": "public, max-age=1000"})
+
+    keys = GooglePublicKeys(refresh_margin_seconds=10, transport=httpx.MockTransport(handler))
+    verifier = IdTokenVerifier(project_id=PROJECT_ID, keys=keys)
+    assert await verifier.verify(make_token()) is not None
+    assert await verifier.verify(make_token()) is not None
+    assert requests == 1
+
+
+async def test_google_public_keys_keeps_old_keys_on_failure():
+    responses = [
+        httpx.Response(200, json={KEY_ID: CERT}, headers={"cache-control": "max-age=0"}),
+        httpx.Response(500),
+    ]
+
+    keys = GooglePublicKeys(transport=httpx.MockTransport(lambda _request: responses.pop(0)))
+    assert await keys.get_certs() == {KEY_ID: CERT}
+    assert await keys.get_certs() == {KEY_ID: CERT}
+    assert len(responses) == 0
+
+
+async def test_google_public_keys_waits_before_retrying():
+    responses = [
+        httpx.Response(200, json={KEY_ID: CERT}, headers={"cache-control": "max-age=0"}),
+        httpx.Response(500),
+        httpx.Response(200, json={KEY_ID: CERT}, headers={"cache-control": "max-age=1000"}),
+    ]
+
+    keys = GooglePublicKeys(retry_seconds=0.5, transport=httpx.MockTransport(lambda _request: responses.pop(0)))
+    assert await keys.get_certs() == {KEY_ID: CERT}
+    # Only one of the concurrent requests fetches the certs, the others keep using the old ones
+    assert await asyncio.gather(*(keys.get_certs() for _ in range(5))) == [{KEY_ID: CERT}] * 5
+    assert await keys.get_certs() == {KEY_ID: CERT}
+    assert len(responses) == 1
+    await asyncio.sleep(0.5)
+    assert await keys.get_certs() == {KEY_ID: CERT}
+    assert len(responses) == 0
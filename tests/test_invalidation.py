@@ -0,0 +1,76 @@
+import asyncio
+import uuid
+from typing import Callable
+
+import asyncpg  # type: ignore
+import pytest
+import pytest_asyncio
+
+from app.core.database.engine import get_asyncpg_dsn
+from app.core.invalidation import InvalidationBus
+from app.features.users.user_cache import UserCache
+from tests.test_user_cache import make_user
+
+pytestmark = pytest.mark.asyncio
+
+
+async def wait_until(condition: Callable[[], bool], timeout: float = 5) -> None:
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+@pytest_asyncio.fixture
+async def buses(engine):
+    # Two workers, listening on a channel of their own so tests running in parallel don't interfere
+    channel = f"test_invalidation_{uuid.uuid4().hex}"
+    buses = [InvalidationBus(get_asyncpg_dsn(), channel=channel, health_check_seconds=1) for _ in range(2)]
+    caches = [UserCache(max_size=10, ttl_seconds=60, bus=bus) for bus in buses]
+    for bus in buses:
+        await bus.start()
+    await wait_until(lambda: all(bus.stats().connected for bus in buses))
+    yield buses, caches
+    for bus in buses:
+        await bus.stop()
+
+
+async def test_publish_before_start_is_ignored():
+    bus = InvalidationBus("postgresql://localhost/unused")
+    cache = UserCache(max_size=10, ttl_seconds=60, bus=bus)
+    user = make_user("alice")
+    cache.put(user)
+    cache.invalidate(user.id)
+    assert len(cache) == 0
+    assert bus.stats().published == 0
+
+
+async def test_invalidation_evicts_other_workers(buses):
+    (bus_a, bus_b), (cache_a, cache_b) = buses
+    user, other_user = make_user("alice"), make_user("bob")
+    for cache in (cache_a, cache_b):
+        cache.put(user)
+        cache.put(other_user)
+
+    cache_a.invalidate(user.id)
+    assert cache_a.get(user_id=user.id) is None
+    await wait_until(lambda: bus_b.stats().received == 1)
+    assert cache_b.get(user_id=user.id) is None
+    assert cache_b.get(user_id=other_user.id) is other_user
+    # Workers ignore their own events
+    assert bus_a.stats().received == 0
+    assert bus_a.stats().published == 1
+
+
+async def test_flush_after_reconnect(buses):
+    (_bus_a, bus_b), (_cache_a, cache_b) = buses
+    user = make_user("alice")
+    cache_b.put(user)
+
+    connection = await asyncpg.connect(get_asyncpg_dsn())
+    try:
+        await connection.execute("SELECT pg_terminate_backend($1)", bus_b._server_pid)
+    finally:
+        await connection.close()
+    await wait_until(lambda: bus_b.stats().flushes == 1 and bus_b.stats().connected)
+    assert bus_b.stats().reconnects == 1
+    assert len(cache_b) == 0
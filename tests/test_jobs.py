@@ -0,0 +1,221 @@
+import asyncio
+import datetime
+import uuid
+
+import pytest
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import tasks
+from app.core.database.models import JobRow, JobStatus
+from app.tasks.queue import (
+    JOB_TYPES,
+    JobQueue,
+    claim_jobs,
+    complete_job,
+    fail_job,
+    get_dead_jobs,
+    get_job_stats,
+    load_job,
+    requeue_stalled_jobs,
+    retry_dead_jobs,
+)
+from app.tasks.worker import JobWorker
+
+pytestmark = pytest.mark.asyncio
+
+ran: list[uuid.UUID] = []
+
+
+async def record(place_id: uuid.UUID):
+    ran.append(place_id)
+
+
+async def fail(place_id: uuid.UUID):
+    raise RuntimeError("Service unavailable")
+
+
+@pytest.fixture
+def test_job_types(monkeypatch):
+    ran.clear()
+    monkeypatch.setitem(JOB_TYPES, "record", record)
+    monkeypatch.setitem(JOB_TYPES, "fail", fail)
+
+
+async def get_job(session, job_id) -> JobRow:
+    query = select(JobRow).where(JobRow.id == job_id).execution_options(populate_existing=True)
+    return (await session.execute(query)).scalar_one()
+
+
+async def test_enqueue_and_claim(session):
+    place_id = uuid.uuid4()
+    job_id = await JobQueue(session).enqueue(tasks.update_place_metadata, place_id)
+    jobs = await claim_jobs(session, limit=10)
+    assert [job.id for job in jobs] == [job_id]
+    assert jobs[0].type == "update_place_metadata"
+    assert jobs[0].payload == {"place_id": str(place_id)}
+    assert jobs[0].attempts == 1
+    assert (await get_job(session, job_id)).status == JobStatus.running
+    # Already claimed
+    assert await claim_jobs(session, limit=10) == []
+
+
+async def test_enqueue_commits_with_the_write(session):
+    queue = JobQueue(session)
+    # Rolled back with its write
+    await queue.enqueue(tasks.update_place_metadata, uuid.uuid4())
+    await session.rollback()
+    job_id = await queue.enqueue(tasks.update_place_metadata, uuid.uuid4())
+    await session.commit()
+    result = await session.execute(select(JobRow.id))
+    assert result.scalars().all() == [job_id]
+
+
+async def test_enqueue_requires_job_type(session):
+    with pytest.raises(ValueError):
+        await JobQueue(session).enqueue(record, uuid.uuid4())
+
+
+async def test_claim_skips_locked_jobs(engine, session):
+    queue = JobQueue(session)
+    locked_id = await queue.enqueue(tasks.update_place_metadata, uuid.uuid4())
+    other_id = await queue.enqueue(tasks.update_place_metadata, uuid.uuid4())
+    await session.commit()
+    async with AsyncSession(engine) as other_session:
+        # Another worker in the middle of claiming the first job
+        await other_session.execute(select(JobRow).where(JobRow.id == locked_id).with_for_update())
+        jobs = await claim_jobs(session, limit=10)
+        assert [job.id for job in jobs] == [other_id]
+        await other_session.rollback()
+
+
+async def test_failed_job_retries_then_dies(session):
+    job_id = await JobQueue(session).enqueue(tasks.update_place_metadata, uuid.uuid4())
+    await session.execute(update(JobRow).where(JobRow.id == job_id).values(max_attempts=2))
+    await session.commit()
+
+    [job] = await claim_jobs(session, limit=1)
+    assert await fail_job(session, job, "error", retry_delay_seconds=3600) == JobStatus.queued
+    # Backing off
+    assert await claim_jobs(session, limit=1) == []
+    past = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+    await session.execute(update(JobRow).where(JobRow.id == job_id).values(run_at=past))
+    await session.commit()
+
+    [job] = await claim_jobs(session, limit=1)
+    assert job.attempts == 2
+    assert await fail_job(session, job, "error again", retry_delay_seconds=0) == JobStatus.dead
+    assert await claim_jobs(session, limit=1) == []
+    dead_jobs = await get_dead_jobs(session, limit=10)
+    assert [(dead.id, dead.attempts, dead.last_error) for dead in dead_jobs] == [(job_id, 2, "error again")]
+
+    assert await retry_dead_jobs(session, job_type="update_place_metadata") == 1
+    [job] = await claim_jobs(session, limit=1)
+    assert job.attempts == 1
+
+
+async def test_invalid_payload(session):
+    job_id = await JobQueue(session).enqueue(tasks.update_place_metadata, uuid.uuid4())
+    await session.execute(update(JobRow).where(JobRow.id == job_id).values(payload={"place_id": "not a uuid"}))
+    await session.commit()
+    [job] = await claim_jobs(session, limit=1)
+    with pytest.raises(ValueError):
+        load_job(job)
+    with pytest.raises(ValueError):
+        load_job(job.model_copy(update={"payload": {}}))
+    with pytest.raises(ValueError):
+        load_job(job.model_copy(update={"type": "removed_task"}))
+
+
+async def test_worker_runs_jobs(session, test_job_types):
+    place_id = uuid.uuid4()
+    queue = JobQueue(session)
+    done_id = await queue.enqueue(record, place_id)
+    failed_id = await queue.enqueue(fail, place_id)
+    invalid_id = await queue.enqueue(record, place_id)
+    await session.execute(update(JobRow).where(JobRow.id == invalid_id).values(payload={"place_id": "not a uuid"}))
+    await session.commit()
+
+    worker = JobWorker(backoff_seconds=60)
+    for job in await claim_jobs(session, limit=10):
+        await worker.run_job(job)
+
+    assert ran == [place_id]
+    assert (await get_job(session, done_id)).status == JobStatus.done
+    failed = await get_job(session, failed_id)
+    assert failed.status == JobStatus.queued
+    assert failed.last_error == "RuntimeError('Service unavailable')"
+    assert failed.run_at > datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=25)
+    # Retrying can't fix the payload
+    assert (await get_job(session, invalid_id)).status == JobStatus.dead
+
+
+async def test_worker_stops(session, test_job_types):
+    await JobQueue(session).enqueue(record, uuid.uuid4())
+    await session.commit()
+    stop = asyncio.Event()
+    worker = JobWorker(poll_seconds=0.01)
+    run = asyncio.create_task(worker.run(stop))
+    async with asyncio.timeout(5):
+        while not ran:
+            await asyncio.sleep(0.01)
+    stop.set()
+    await asyncio.wait_for(run, 5)
+    assert len(ran) == 1
+
+
+async def test_worker_runs_in_background(session, test_job_types):
+    worker = JobWorker(poll_seconds=0.01)
+    await worker.start()
+    try:
+        await JobQueue(session).enqueue(record, uuid.uuid4())
+        await session.commit()
+        async with asyncio.timeout(5):
+            while not ran:
+                await asyncio.sleep(0.01)
+    finally:
+        await worker.stop()
+    assert len(ran) == 1
+
+
+async def test_requeue_stalled_jobs(session):
+    queue = JobQueue(session)
+    stalled_id = await queue.enqueue(tasks.update_place_metadata, uuid.uuid4())
+    dead_id = await queue.enqueue(tasks.update_place_metadata, uuid.uuid4())
+    await session.execute(update(JobRow).where(JobRow.id == dead_id).values(max_attempts=1))
+    await session.commit()
+    await claim_jobs(session, limit=10)
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    assert await requeue_stalled_jobs(session, started_before=now - datetime.timedelta(minutes=1)) == 0
+    assert await requeue_stalled_jobs(session, started_before=now + datetime.timedelta(minutes=1)) == 2
+    assert (await get_job(session, stalled_id)).status == JobStatus.queued
+    assert (await get_job(session, dead_id)).status == JobStatus.dead
+
+
+async def test_job_stats(session):
+    queue = JobQueue(session)
+    since = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(minutes=1)
+    for _ in range(3):
+        await queue.enqueue(tasks.update_place_metadata, uuid.uuid4())
+    await queue.enqueue(tasks.slack_onboarding, "user", None, 1, 2)
+    jobs = await claim_jobs(session, limit=2)
+    for job in jobs:
+        await complete_job(session, job.id)
+
+    stats = {stats.type: stats for stats in await get_job_stats(session, since)}
+    assert stats.keys() == {"slack_onboarding", "update_place_metadata"}
+    metadata = stats["update_place_metadata"]
+    assert (metadata.queued, metadata.running, metadata.done, metadata.dead) == (1, 0, 2, 0)
+    assert metadata.done_per_minute > 0
+    assert metadata.mean_run_ms is not None and metadata.p95_wait_ms is not None
+    assert metadata.oldest_ready_seconds is not None
+    onboarding = stats["slack_onboarding"]
+    assert (onboarding.queued, onboarding.done, onboarding.mean_run_ms) == (1, 0, None)
+
+
+async def test_retry_delay():
+    worker = JobWorker(backoff_seconds=10, max_backoff_seconds=60)
+    assert 5 <= worker.retry_delay(1) <= 10
+    assert 20 <= worker.retry_delay(3) <= 40
+    assert 30 <= worker.retry_delay(10) <= 60
@@ -0,0 +1,163 @@
+import asyncio
+import datetime
+import uuid
+from typing import Optional
+
+import pytest
+from sqlalchemy import select, update
+
+from app.core.database.counters import COUNTERS
+from app.core.database.engine import get_asyncpg_dsn
+from app.core.database.models import ImageUploadRow, MaintenanceRunRow, PlaceDataRow, PlaceRow, PostRow, UserRow
+from app.core.scheduler import Budget, JobProgress, PeriodicJob, Scheduler, get_maintenance_runs
+from app.features.images.image_utils import delete_unused_images
+from app.features.maintenance import counters_job
+from app.tasks.place_metadata import update_places_metadata_batch
+
+pytestmark = pytest.mark.asyncio
+USER_ID = uuid.uuid4()
+PLACE_ID = uuid.uuid4()
+
+
+async def count_rows(budget: Budget, cursor: Optional[str]) -> JobProgress:
+    return JobProgress(rows=3, cursor=str(int(cursor or 0) + 3))
+
+
+async def fail(budget: Budget, cursor: Optional[str]) -> JobProgress:
+    raise RuntimeError("Service unavailable")
+
+
+def job(name: str, run=count_rows, interval_seconds: float = 3600) -> PeriodicJob:
+    return PeriodicJob(name=name, run=run, interval_seconds=interval_seconds, budget_seconds=10)
+
+
+async def test_run_job_records_run(session):
+    scheduler = Scheduler([], get_asyncpg_dsn())
+    run = await scheduler.run_job(job("count"))
+    assert (run.runs, run.last_rows, run.last_error, run.cursor) == (1, 3, None, "3")
+    assert run.last_finished_at >= run.last_started_at
+    # Picks up from the cursor
+    run = await scheduler.run_job(job("count"))
+    assert (run.runs, run.cursor) == (2, "6")
+
+    run = await scheduler.run_job(job("fail", run=fail))
+    assert (run.runs, run.last_rows, run.last_error) == (1, 0, "RuntimeError('Service unavailable')")
+    assert scheduler.stats().model_dump() == dict(leader=False, runs=3, failures=1)
+    assert [run.name for run in await get_maintenance_runs(session)] == ["count", "fail"]
+
+
+async def test_get_due_jobs(session):
+    hourly, disabled, never_ran = job("hourly"), job("disabled", interval_seconds=0), job("never_ran")
+    scheduler = Scheduler([hourly, disabled, never_ran], get_asyncpg_dsn())
+    await scheduler.run_job(hourly)
+    await scheduler.run_job(disabled)
+    assert await scheduler.get_due_jobs() == [never_ran]
+    # Another worker ran it a while ago
+    two_hours_ago = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(hours=2)
+    await session.execute(update(MaintenanceRunRow).values(last_started_at=two_hours_ago))
+    await session.commit()
+    assert await scheduler.get_due_jobs() == [hourly, never_ran]
+
+
+async def test_one_leader(session):
+    lock_key = f"test_scheduler_{uuid.uuid4()}"
+    schedulers = [Scheduler([], get_asyncpg_dsn(), check_seconds=0.01, lock_key=lock_key) for _ in range(2)]
+    for scheduler in schedulers:
+        await scheduler.start()
+    try:
+        async with asyncio.timeout(5):
+            while not any(scheduler.leader for scheduler in schedulers):
+                await asyncio.sleep(0.01)
+        await asyncio.sleep(0.1)
+        assert sum(scheduler.leader for scheduler in schedulers) == 1
+        leader, follower = sorted(schedulers, key=lambda scheduler: not scheduler.leader)
+        # The other worker takes over when the leader stops
+        await leader.stop()
+        async with asyncio.timeout(5):
+            while not follower.leader:
+                await asyncio.sleep(0.01)
+    finally:
+        for scheduler in schedulers:
+            await scheduler.stop()
+
+
+async def test_budget():
+    assert not Budget(60).exhausted
+    assert Budget(0).exhausted
+
+
+async def test_counters_job_resumes(session):
+    session.add(UserRow(id=USER_ID, uid="a", username="a", first_name="a", last_name="a"))
+    session.add(PlaceRow(id=PLACE_ID, name="place", latitude=0, longitude=0))
+    await session.commit()
+    session.add(PostRow(user_id=USER_ID, place_id=PLACE_ID, category="food", content=""))
+    await session.commit()
+    await session.execute(update(UserRow).values(post_count=5))
+    await session.commit()
+
+    # Out of time before the first counter
+    assert await counters_job(Budget(0), None) == JobProgress(rows=0, cursor="0")
+    assert await counters_job(Budget(60), "0") == JobProgress(rows=1)
+    # Only checked, not repaired
+    user = await session.get(UserRow, USER_ID, populate_existing=True)
+    assert user.post_count == 5
+    assert await counters_job(Budget(60), str(len(COUNTERS))) == JobProgress(rows=0)
+
+
+async def test_update_places_metadata_batch(session):
+    session.add(UserRow(id=USER_ID, uid="a", username="a", first_name="a", last_name="a"))
+    place_ids = sorted(uuid.uuid4() for _ in range(3))
+    for i, place_id in enumerate(place_ids):
+        session.add(PlaceRow(id=place_id, name=f"place{i}", latitude=0, longitude=0))
+    await session.commit()
+    session.add(PlaceDataRow(user_id=USER_ID, place_id=place_ids[0], additional_data=dict(locality="New York")))
+    await session.commit()
+
+    assert await update_places_metadata_batch(session, None, batch_size=2) == (1, place_ids[1])
+    assert await update_places_metadata_batch(session, place_ids[1], batch_size=2) == (0, place_ids[2])
+    assert await update_places_metadata_batch(session, place_ids[2], batch_size=2) == (0, None)
+    place = await session.get(PlaceRow, place_ids[0], populate_existing=True)
+    assert place.city == "New York"
+    # Nothing changed
+    assert await update_places_metadata_batch(session, None, batch_size=2) == (0, place_ids[1])
+
+
+async def test_delete_unused_images(session):
+    session.add(UserRow(id=USER_ID, uid="a", username="a", first_name="a", last_name="a"))
+    await session.commit()
+    session.add(ImageUploadRow(user_id=USER_ID, blob_name="unused"))
+    session.add(ImageUploadRow(user_id=USER_ID, blob_name="used", used=True))
+    await session.commit()
+
+    an_hour_ago = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(hours=1)
+    assert await delete_unused_images(session, created_before=an_hour_ago, limit=10) == []
+    in_an_hour = an_hour_ago + datetime.timedelta(hours=2)
+    assert await delete_unused_images(session, created_before=in_an_hour, limit=10) == ["unused"]
+    result = await session.execute(select(ImageUploadRow.blob_name))
+    assert result.scalars().all() == ["used"]
+
+
+async def test_delete_unused_images_keeps_referenced(session):
+    session.add(UserRow(id=USER_ID, uid="a", username="a", first_name="a", last_name="a"))
+    session.add(PlaceRow(id=PLACE_ID, name="place", latitude=0, longitude=0))
+    await session.commit()
+    # Used by a post and a profile without being flagged as used
+    images = [ImageUploadRow(user_id=USER_ID, blob_name=name) for name in ("post", "media", "profile", "unused")]
+    session.add_all(images)
+    await session.commit()
+    post_image, media_image, profile_image, _unused = images
+    session.add(
+        PostRow(
+            user_id=USER_ID,
+            place_id=PLACE_ID,
+            category="food",
+            content="",
+            image_id=post_image.id,
+            media=[dict(id=str(image.id), blob_name=image.blob_name, url="url") for image in (post_image, media_image)],
+        )
+    )
+    await session.execute(update(UserRow).values(profile_picture_id=profile_image.id))
+    await session.commit()
+
+    in_an_hour = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1)
+    assert await delete_unused_images(session, created_before=in_an_hour, limit=10) == ["unused"]
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core import config
+from app.core.database.parallel_reads import gather_reads, on_session
+from app.core.database.pool_stats import WaitTrackingQueuePool
+from app.features.places.place_store import PlaceStore
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_gather_reads_uses_a_session_per_branch():
+    engine = create_async_engine(config.SQLALCHEMY_DATABASE_URL, pool_size=16, max_overflow=0)
+    db = AsyncSession(engine)
+    sessions = []
+    running = 0
+    max_running = 0
+
+    async def read(branch_db: AsyncSession) -> AsyncSession:
+        nonlocal running, max_running
+        sessions.append(branch_db)
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return branch_db
+
+    results = await gather_reads(db, *[read] * 5)
+    assert len(set(map(id, results))) == 5
+    assert db not in sessions
+    assert max_running == config.DB_MAX_PARALLEL_READS_PER_REQUEST
+    await engine.dispose()
+
+
+async def test_gather_reads_returns_results_in_order():
+    engine = create_async_engine(config.SQLALCHEMY_DATABASE_URL)
+    db = AsyncSession(engine)
+
+    def read(value: int, delay: float):
+        async def run(_db: AsyncSession) -> int:
+            await asyncio.sleep(delay)
+            return value
+
+        return run
+
+    assert await gather_reads(db, read(1, 0.02), read(2, 0), read(3, 0.01)) == [1, 2, 3]
+    await engine.dispose()
+
+
+async def test_on_session():
+    engine = create_async_engine(config.SQLALCHEMY_DATABASE_URL)
+    db, other_db = AsyncSession(engine), AsyncSession(engine)
+    store = PlaceStore(db=db)
+    assert on_session(store, other_db).db is other_db
+    assert store.db is db
+    await engine.dispose()
+
+
+async def test_gather_reads_without_spare_connections(engine):
+    small_engine = create_async_engine(
+        config.SQLALCHEMY_DATABASE_URL, poolclass=WaitTrackingQueuePool, pool_size=1, max_overflow=0
+    )
+    async with AsyncSession(small_engine) as db:
+        # Hold the only connection
+        await db.execute(sa.text("SELECT 1"))
+        sessions = []
+
+        async def read(branch_db: AsyncSession) -> int:
+            sessions.append(branch_db)
+            return (await branch_db.execute(sa.text("SELECT 1"))).scalar_one()
+
+        assert await gather_reads(db, read, read) == [1, 1]
+        assert sessions == [db, db]
+    await small_engine.dispose()
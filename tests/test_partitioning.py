@@ -0,0 +1,113 @@
+import uuid
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from app.core.database.models import PlaceRow, PostLikeRow, PostRow, UserRow
+from app.core.database.partitioning import (
+    PARTITIONED_TABLES,
+    PARTITIONS,
+    PartitionedTable,
+    check_partitioned_copy,
+    copy_batch,
+    create_partitioned_copy,
+    swap_partitioned_copy,
+)
+
+pytestmark = pytest.mark.asyncio
+
+LIKES = PartitionedTable(
+    name="test_like",
+    partition_key="post_id",
+    columns=("id", "user_id", "post_id", "created_at"),
+    unique_constraints=(("_test_like_user_post_uc", "user_id, post_id"),),
+    indexes=(("test_like_post_id_idx", "post_id"),),
+    foreign_keys=(),
+)
+
+
+async def test_tables_are_partitioned(session):
+    result = await session.execute(
+        text(
+            """
+            SELECT parent.relname, count(*) FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            GROUP BY parent.relname
+            """
+        )
+    )
+    partitions = dict(result.all())
+    for table in PARTITIONED_TABLES:
+        assert partitions[table.name] == PARTITIONS
+
+
+async def test_unique_constraint_across_partitions(session):
+    user = UserRow(uid="uid", username="user", first_name="first", last_name="last")
+    place = PlaceRow(name="place", latitude=0, longitude=0)
+    session.add_all([user, place])
+    await session.flush()
+    post = PostRow(user_id=user.id, place_id=place.id, category="food", content="")
+    session.add(post)
+    await session.flush()
+    session.add(PostLikeRow(user_id=user.id, post_id=post.id))
+    await session.commit()
+    session.add(PostLikeRow(user_id=user.id, post_id=post.id))
+    with pytest.raises(IntegrityError):
+        await session.commit()
+
+
+async def test_incomplete_copy_not_swapped(session):
+    await session.execute(text("CREATE TABLE test_like (id uuid PRIMARY KEY, user_id uuid, post_id uuid)"))
+    await session.run_sync(lambda s: create_partitioned_copy(s.connection(), LIKES))
+    await session.execute(text("ALTER TABLE test_like DISABLE TRIGGER USER"))
+    await session.execute(
+        text("INSERT INTO test_like (id, user_id, post_id) VALUES (:id, :id, :id)"), {"id": uuid.uuid4()}
+    )
+    with pytest.raises(RuntimeError):
+        await session.run_sync(lambda s: check_partitioned_copy(s.connection(), LIKES))
+
+
+async def test_online_conversion(session):
+    ids = sorted(uuid.uuid4() for _ in range(5))
+    await session.execute(
+        text(
+            """
+            CREATE TABLE test_like (
+                id uuid PRIMARY KEY, user_id uuid NOT NULL, post_id uuid NOT NULL,
+                created_at timestamptz NOT NULL DEFAULT now(),
+                CONSTRAINT _test_like_user_post_uc UNIQUE (user_id, post_id)
+            )
+            """
+        )
+    )
+    await session.execute(text("CREATE INDEX test_like_post_id_idx ON test_like (post_id)"))
+    for like_id in ids[:4]:
+        await session.execute(
+            text("INSERT INTO test_like (id, user_id, post_id) VALUES (:id, :id, :id)"), {"id": like_id}
+        )
+    await session.run_sync(lambda s: create_partitioned_copy(s.connection(), LIKES))
+    await session.commit()
+
+    # Writes made while copying are mirrored into the copy
+    last_id = await session.run_sync(lambda s: copy_batch(s.connection(), LIKES, batch_size=2))
+    await session.commit()
+    await session.execute(text("INSERT INTO test_like (id, user_id, post_id) VALUES (:id, :id, :id)"), {"id": ids[4]})
+    await session.execute(text("DELETE FROM test_like WHERE id = :id"), {"id": ids[0]})
+    await session.execute(text("DELETE FROM test_like WHERE id = :id"), {"id": ids[3]})
+    await session.commit()
+    while last_id is not None:
+        last_id = await session.run_sync(lambda s: copy_batch(s.connection(), LIKES, last_id, batch_size=2))
+        await session.commit()
+    assert await session.run_sync(lambda s: check_partitioned_copy(s.connection(), LIKES)) == 3
+    await session.run_sync(lambda s: swap_partitioned_copy(s.connection(), LIKES))
+    await session.commit()
+
+    result = await session.execute(text("SELECT id FROM test_like ORDER BY id"))
+    assert result.scalars().all() == [ids[1], ids[2], ids[4]]
+    result = await session.execute(
+        text("SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = 'test_like'::regclass")
+    )
+    assert set(result.scalars().all()) == {f"test_like_p{i}" for i in range(PARTITIONS)}
+    result = await session.execute(text("SELECT conname FROM pg_constraint WHERE conrelid = 'test_like'::regclass"))
+    assert set(result.scalars().all()) == {"test_like_pkey", "_test_like_user_post_uc"}
@@ -0,0 +1,121 @@
+"""
+Compares an unpartitioned likes table with one hash partitioned by post_id (like post_like): the size of the indexes
+a lookup has to use, and the latency of the like count, liked posts and is liked lookups.
+
+Skipped unless RUN_BENCHMARKS=1. Builds BENCHMARK_ROWS rows (10M by default, which takes a few minutes) and prints
+the index sizes and the mean latency of each lookup.
+"""
+
+import os
+import random
+import time
+
+import pytest
+from sqlalchemy import text
+
+from app.core.database.partitioning import PARTITIONS, create_partitions_statements
+
+pytestmark = [
+    pytest.mark.asyncio,
+    pytest.mark.skipif(os.environ.get("RUN_BENCHMARKS") != "1", reason="Set RUN_BENCHMARKS=1 to run benchmarks"),
+]
+
+ROWS = int(os.environ.get("BENCHMARK_ROWS", "10000000"))
+NUM_POSTS = 100000
+ITERATIONS = 200
+TABLES = ["bench_like", "bench_like_partitioned"]
+LOOKUPS = {
+    "like count": "SELECT count(*) FROM {table} WHERE post_id = :post_id",
+    "liked posts": "SELECT post_id FROM {table} WHERE user_id = :user_id AND post_id = ANY(:post_ids)",
+    "is liked": "SELECT EXISTS (SELECT 1 FROM {table} WHERE post_id = :post_id AND user_id = :user_id)",
+}
+
+
+def post_id(number: str) -> str:
+    """Return the SQL expression for the id of the given post number."""
+    return f"md5('p' || {number})::uuid"
+
+
+async def create_tables(session):
+    # Each user likes 10 consecutive posts, so (user_id, post_id) is unique
+    liked_post_id = post_id(f"(i % {NUM_POSTS})")
+    rows = (
+        f"SELECT gen_random_uuid(), md5('u' || (i / 10))::uuid, {liked_post_id}, now() "
+        f"FROM generate_series(1, {ROWS}) i"
+    )
+    columns = "(id uuid NOT NULL, user_id uuid NOT NULL, post_id uuid NOT NULL, created_at timestamptz NOT NULL"
+    statements = [
+        f"CREATE TABLE bench_like {columns}, PRIMARY KEY (id), UNIQUE (user_id, post_id))",
+        f"CREATE TABLE bench_like_partitioned {columns}, PRIMARY KEY (id, post_id), UNIQUE (user_id, post_id)) "
+        "PARTITION BY HASH (post_id)",
+        *create_partitions_statements("bench_like_partitioned"),
+        "CREATE INDEX ON bench_like (post_id)",
+        "CREATE INDEX ON bench_like_partitioned (post_id)",
+        f"INSERT INTO bench_like {rows}",
+        "INSERT INTO bench_like_partitioned SELECT * FROM bench_like",
+        "ANALYZE bench_like",
+        "ANALYZE bench_like_partitioned",
+    ]
+    for statement in statements:
+        await session.execute(text(statement))
+    await session.commit()
+
+
+async def index_sizes(session, table: str) -> dict[str, int]:
+    """Return the total size of each index of the table, summed over its partitions."""
+    result = await session.execute(
+        text(
+            """
+            SELECT i.indisprimary AS is_primary, i.indisunique AS is_unique, sum(pg_relation_size(i.indexrelid))
+            FROM pg_index i
+            JOIN pg_class t ON t.oid = i.indrelid
+            WHERE t.relname = :table OR t.relname LIKE :table || '_p%'
+            GROUP BY 1, 2
+            """
+        ),
+        {"table": table},
+    )
+    sizes = {}
+    for is_primary, is_unique, size in result:
+        name = "primary key" if is_primary else "unique" if is_unique else "post_id"
+        sizes[name] = int(size)
+    return sizes
+
+
+async def mean_latency_ms(session, query: str) -> float:
+    random.seed(0)
+    total = 0.0
+    for _ in range(ITERATIONS):
+        # A liked post and its liker, and a page of posts around it
+        i = random.randrange(ROWS)
+        post_number = i % NUM_POSTS
+        post_ids = await session.execute(
+            text(f"SELECT array_agg({post_id('x')}) FROM generate_series(:start, :start + 9) x"),
+            {"start": post_number},
+        )
+        params = dict(
+            post_id=(
+                await session.execute(text(f"SELECT {post_id(':number')}"), {"number": str(post_number)})
+            ).scalar(),
+            user_id=(
+                await session.execute(text("SELECT md5('u' || :number)::uuid"), {"number": str(i // 10)})
+            ).scalar(),
+            post_ids=post_ids.scalar(),
+        )
+        start = time.perf_counter()
+        await session.execute(text(query), {k: v for k, v in params.items() if f":{k}" in query})
+        total += time.perf_counter() - start
+    return total / ITERATIONS * 1000
+
+
+async def test_partitioning_benchmark(session):
+    await create_tables(session)
+    print(f"\n{ROWS} rows, {NUM_POSTS} posts, {PARTITIONS} partitions")
+    for table in TABLES:
+        sizes = await index_sizes(session, table)
+        print(f"{table} index sizes: " + ", ".join(f"{name} {size / 2**20:.1f} MiB" for name, size in sizes.items()))
+        if table.endswith("_partitioned"):
+            print(f"  per partition: {sizes['post_id'] / PARTITIONS / 2**20:.1f} MiB post_id index")
+        for name, query in LOOKUPS.items():
+            latency = await mean_latency_ms(session, query.format(table=table))
+            print(f"  {name}: {latency:.3f} ms")
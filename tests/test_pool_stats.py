@@ -0,0 +1,17 @@
+from app.core import config
+from app.core.database.engine import background_engine, engine, get_all_pool_stats, get_request_pool_wait_seconds
+
+
+def test_background_pool_is_separate():
+    assert background_engine.pool is not engine.pool
+    stats = {pool.name: pool for pool in get_all_pool_stats()}
+    assert stats["primary"].size == 16
+    assert stats["background"].size == config.BACKGROUND_DB_POOL_SIZE
+    assert stats["background"].checked_out == 0
+
+
+def test_pool_waits():
+    stats = {pool.name: pool for pool in get_all_pool_stats()}
+    assert stats["primary"].waiting == 0
+    assert stats["primary"].longest_wait_ms == 0
+    assert get_request_pool_wait_seconds() == 0
@@ -0,0 +1,95 @@
+"""
+Compares the CPU time to hydrate a page of posts with the Core query (get_public_posts) against loading ORM rows
+(get_posts, get_liked_posts, get_saved_place_ids and get_users) and converting them through the internal models.
+
+Skipped unless RUN_BENCHMARKS=1. Prints the CPU time per page for each page size.
+"""
+
+import os
+import time
+import uuid
+
+import pytest
+import pytest_asyncio
+
+from app.core.database.models import PlaceRow, PlaceSaveRow, PostLikeRow, PostRow, UserRow
+from app.features.places.place_store import PlaceStore
+from app.features.posts.entities import Post
+from app.features.posts.post_store import PostStore
+from app.features.users.user_store import UserStore
+
+pytestmark = [
+    pytest.mark.asyncio,
+    pytest.mark.skipif(os.environ.get("RUN_BENCHMARKS") != "1", reason="Set RUN_BENCHMARKS=1 to run benchmarks"),
+]
+
+PAGE_SIZES = [10, 50, 100]
+ITERATIONS = 50
+NUM_USERS = 20
+CALLER_ID = uuid.uuid4()
+USER_IDS = [uuid.uuid4() for _ in range(NUM_USERS)]
+POST_IDS = sorted((uuid.uuid4() for _ in range(max(PAGE_SIZES))), reverse=True)
+
+
+@pytest_asyncio.fixture(autouse=True, scope="function")
+async def setup_fixture(session):
+    session.add(UserRow(id=CALLER_ID, uid="caller", username="caller", first_name="first", last_name="last"))
+    for i, user_id in enumerate(USER_IDS):
+        session.add(UserRow(id=user_id, uid=str(i), username=f"user{i}", first_name="first", last_name="last"))
+    place_ids = [uuid.uuid4() for _ in POST_IDS]
+    for i, place_id in enumerate(place_ids):
+        session.add(PlaceRow(id=place_id, name=f"place{i}", latitude=i % 90, longitude=i % 180))
+    await session.commit()
+    for i, post_id in enumerate(POST_IDS):
+        user_id = USER_IDS[i % NUM_USERS]
+        session.add(PostRow(id=post_id, user_id=user_id, place_id=place_ids[i], category="food", content=f"post {i}"))
+    await session.commit()
+    # The caller likes every other post and saves every third place
+    for post_id in POST_IDS[::2]:
+        session.add(PostLikeRow(user_id=CALLER_ID, post_id=post_id))
+    for place_id in place_ids[::3]:
+        session.add(PlaceSaveRow(user_id=CALLER_ID, place_id=place_id, note=""))
+    await session.commit()
+
+
+async def orm_hydration(session, post_ids: list[uuid.UUID]) -> list[Post]:
+    """How get_posts_from_post_ids used to hydrate posts."""
+    post_store, place_store, user_store = PostStore(db=session), PlaceStore(db=session), UserStore(db=session)
+    internal_posts = await post_store.get_posts(post_ids)
+    liked_post_ids = await post_store.get_liked_posts(CALLER_ID, post_ids)
+    place_ids = list({post.place.id for post in internal_posts.values()})
+    saved_place_ids = await place_store.get_saved_place_ids(user_id=CALLER_ID, place_ids=place_ids)
+    users = await user_store.get_users(list({post.user_id for post in internal_posts.values()}))
+    posts = []
+    for post_id in post_ids:
+        post = internal_posts[post_id]
+        fields = post.model_dump(include=set(Post.model_fields))
+        user = users[post.user_id].to_public()
+        posts.append(Post(**fields, user=user, liked=post.id in liked_post_ids, saved=post.place.id in saved_place_ids))
+    return posts
+
+
+async def core_hydration(session, post_ids: list[uuid.UUID]) -> list[Post]:
+    posts = await PostStore(db=session).get_public_posts(CALLER_ID, post_ids)
+    return [posts[post_id] for post_id in post_ids]
+
+
+async def cpu_seconds_per_page(session, hydrate, post_ids: list[uuid.UUID]) -> float:
+    await hydrate(session, post_ids)  # Warm up the statement caches
+    start = time.process_time()
+    for _ in range(ITERATIONS):
+        await hydrate(session, post_ids)
+        # Don't let the identity map carry rows over between pages
+        session.expunge_all()
+    return (time.process_time() - start) / ITERATIONS
+
+
+async def test_post_hydration_benchmark(session):
+    results = []
+    for page_size in PAGE_SIZES:
+        post_ids = POST_IDS[:page_size]
+        assert await core_hydration(session, post_ids) == await orm_hydration(session, post_ids)
+        orm_ms = await cpu_seconds_per_page(session, orm_hydration, post_ids) * 1000
+        core_ms = await cpu_seconds_per_page(session, core_hydration, post_ids) * 1000
+        results.append(f"{page_size:>5} posts: ORM {orm_ms:8.2f} ms, Core {core_ms:8.2f} ms ({orm_ms / core_ms:.1f}x)")
+    print("\nCPU time per page\n" + "\n".join(results))
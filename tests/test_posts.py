@@ -144,3 +144,16 @@ async def test_update_post(client):
     assert post.category == "shopping"
     assert post.content == "new content"
     assert post.image_url is None
+
+
+async def test_update_post_flags_new_media(session, client):
+    image_id = uuid.uuid4()
+    session.add(ImageUploadRow(id=image_id, user_id=USER_A_ID, blob_name="new-blob-name", url="new-public-url"))
+    await session.commit()
+
+    request = CreatePostRequest(place_id=PLACE_ONE_ID, category="food", content="", media=[IMAGE_A_ID, image_id])
+    with request_as("a"):
+        response = await client.put(f"/posts/{USER_A_POST_ID}", json=jsonable_encoder(request))
+    assert response.status_code == 200
+    image = await session.get(ImageUploadRow, image_id, populate_existing=True)
+    assert image is not None and image.used
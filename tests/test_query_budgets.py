@@ -0,0 +1,79 @@
+import uuid
+from contextlib import contextmanager
+
+import pytest
+import pytest_asyncio
+
+from app.core.database.models import (
+    CommentRow,
+    PlaceRow,
+    PostLikeRow,
+    PostRow,
+    UserRelationRow,
+    UserRelationType,
+    UserRow,
+)
+from app.core.firebase import get_firebase_user, FirebaseUser
+from app.features.posts import post_utils
+from app.features.posts.post_store import PostStore
+from app.features.users.user_store import UserStore
+from app.main import app as main_app
+from tests.mock_firebase import MockFirebaseAdmin
+from tests.query_budget import assert_max_queries
+
+pytestmark = pytest.mark.asyncio
+NUM_USERS = 10
+POSTS_PER_USER = 2
+USER_IDS = [uuid.uuid4() for _ in range(NUM_USERS)]
+POST_IDS = [uuid.uuid4() for _ in range(NUM_USERS * POSTS_PER_USER)]
+
+
+@pytest_asyncio.fixture(autouse=True, scope="function")
+async def setup_fixture(session):
+    for i, user_id in enumerate(USER_IDS):
+        session.add(UserRow(id=user_id, uid=str(i), username=f"user{i}", first_name="first", last_name="last"))
+    place_ids = [uuid.uuid4() for _ in POST_IDS]
+    for i, place_id in enumerate(place_ids):
+        session.add(PlaceRow(id=place_id, name=f"place{i}", latitude=i, longitude=i))
+    await session.commit()
+    for i, post_id in enumerate(POST_IDS):
+        user_id = USER_IDS[i // POSTS_PER_USER]
+        session.add(PostRow(id=post_id, user_id=user_id, place_id=place_ids[i], category="food", content=""))
+    await session.commit()
+    # Everyone follows, likes and comments on the first user's posts
+    for user_id in USER_IDS[1:]:
+        session.add(UserRelationRow(from_user_id=user_id, to_user_id=USER_IDS[0], relation=UserRelationType.following))
+        for post_id in POST_IDS[:POSTS_PER_USER]:
+            session.add(PostLikeRow(user_id=user_id, post_id=post_id))
+            session.add(CommentRow(user_id=user_id, post_id=post_id, content="comment"))
+    await session.commit()
+
+
+@contextmanager
+def request_as(uid: str):
+    main_app.dependency_overrides[get_firebase_user] = lambda: FirebaseUser(MockFirebaseAdmin(), uid=uid)
+    yield
+    main_app.dependency_overrides = {}
+
+
+async def test_get_posts_from_post_ids(session):
+    user_store = UserStore(db=session)
+    caller = await user_store.get_caller(uid="0")
+    assert caller is not None
+    # A single query, regardless of the number of posts
+    with assert_max_queries(1):
+        posts = await post_utils.get_posts_from_post_ids(caller, POST_IDS, PostStore(db=session))
+    assert len(posts) == len(POST_IDS)
+
+
+async def test_get_post(client):
+    with request_as("0"), assert_max_queries(7):
+        response = await client.get(f"/posts/{POST_IDS[-1]}")
+    assert response.status_code == 200
+
+
+async def test_get_notification_feed(client):
+    with request_as("0"), assert_max_queries(9):
+        response = await client.get("/notifications/feed")
+    assert response.status_code == 200
+    assert len(response.json()["notifications"]) == (NUM_USERS - 1) * (1 + 2 * POSTS_PER_USER)
@@ -0,0 +1,167 @@
+"""
+Checks the plans of the main store queries against a synthetic dataset.
+
+Skipped unless RUN_BENCHMARKS=1, like the benchmarks, since seeding the dataset takes a while. The dataset is scaled by
+QUERY_PLAN_SCALE (1 = 100k users, 1M posts, 5M likes). Run with UPDATE_QUERY_PLAN_BASELINES=1 to record the estimated
+costs in tests/query_plan_baselines.json after an intended change.
+"""
+
+import hashlib
+import os
+import uuid
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+
+from app.core.database.engine import engine
+from app.core.database.models import Base
+from app.features.map.map_store import base_map_query
+from app.features.notifications.activity_feed_store import ActivityFeedStore
+from app.features.places.entities import RectangularRegion
+from app.features.places.place_store import PlaceStore
+from app.features.posts.feed_store import FeedStore
+from app.features.search.search_store import SearchStore
+from app.features.users.user_store import UserStore
+from tests.fixtures import check_db_name, populate_categories, reset_db
+from tests.query_plans import (
+    COST_TOLERANCE,
+    UPDATE_BASELINES,
+    explain,
+    load_baselines,
+    save_baseline,
+    seq_scanned_tables,
+)
+
+pytestmark = [
+    pytest.mark.asyncio(loop_scope="module"),
+    pytest.mark.skipif(os.environ.get("RUN_BENCHMARKS") != "1", reason="Set RUN_BENCHMARKS=1 to run benchmarks"),
+]
+
+SCALE = float(os.environ.get("QUERY_PLAN_SCALE", "1"))
+NUM_USERS = max(int(100_000 * SCALE), 1000)
+POSTS_PER_USER = 10
+LIKES_PER_USER = 50
+FOLLOWS_PER_USER = 20
+COMMENTS_PER_USER = 5
+COMMENT_LIKES_PER_USER = 5
+LARGE_TABLES = {"user", "follow", "place", "post", "post_like", "comment", "comment_like"}
+COUNTED_TABLES = ["follow", "post", "post_like", "comment", "comment_like"]
+
+
+def seed_id(kind: str, n: int) -> uuid.UUID:
+    """Id of the n-th seeded row of the given kind, matches md5(kind || n)::uuid in the seed SQL."""
+    return uuid.UUID(hashlib.md5(f"{kind}{n}".encode()).hexdigest())
+
+
+# Users follow, like and comment on a deterministic spread of other users and posts. The multipliers are primes so
+# the generated (user, post), (user, place) and (from, to) pairs are unique.
+SEED_STATEMENTS = [
+    """
+    INSERT INTO "user" (id, uid, username, first_name, last_name, is_featured)
+    SELECT md5('user' || n)::uuid, 'uid' || n, 'user' || n, 'first' || n, 'last' || n, n % 1000 = 0
+    FROM generate_series(0, {users} - 1) AS n
+    """,
+    """
+    INSERT INTO place (id, name, latitude, longitude)
+    SELECT md5('place' || n)::uuid, 'place' || n, (n * 37 % 13000) / 100.0 - 60, (n * 91 % 36000) / 100.0 - 180
+    FROM generate_series(0, {users} - 1) AS n
+    """,
+    """
+    INSERT INTO follow (id, from_user_id, to_user_id, relation)
+    SELECT md5('follow' || n)::uuid, md5('user' || (n % {users}))::uuid,
+        md5('user' || ((n % {users} + (n / {users} + 1) * 4999 + 1) % {users}))::uuid, 'following'
+    FROM generate_series(0, {users} * {follows} - 1) AS n
+    """,
+    """
+    INSERT INTO post (id, user_id, place_id, category, content, deleted)
+    SELECT md5('post' || n)::uuid, md5('user' || (n % {users}))::uuid,
+        md5('place' || ((n % {users} + n / {users} * 7919) % {users}))::uuid, 'food',
+        CASE WHEN n % 2 = 0 THEN 'content' ELSE '' END, n % 50 = 0
+    FROM generate_series(0, {users} * {posts} - 1) AS n
+    """,
+    """
+    INSERT INTO post_like (id, user_id, post_id)
+    SELECT md5('post_like' || n)::uuid, md5('user' || (n % {users}))::uuid,
+        md5('post' || ((n % {users} * 13 + n / {users} * 104729) % ({users} * {posts})))::uuid
+    FROM generate_series(0, {users} * {likes} - 1) AS n
+    """,
+    """
+    INSERT INTO comment (id, user_id, post_id, content)
+    SELECT md5('comment' || n)::uuid, md5('user' || (n % {users}))::uuid,
+        md5('post' || ((n % {users} * 31 + n / {users} * 65537) % ({users} * {posts})))::uuid, 'comment'
+    FROM generate_series(0, {users} * {comments} - 1) AS n
+    """,
+    """
+    INSERT INTO comment_like (id, user_id, comment_id)
+    SELECT md5('comment_like' || n)::uuid, md5('user' || (n % {users}))::uuid,
+        md5('comment' || ((n % {users} * 17 + n / {users} * 7907) % ({users} * {comments})))::uuid
+    FROM generate_series(0, {users} * {comment_likes} - 1) AS n
+    """,
+]
+
+
+@pytest_asyncio.fixture(autouse=True, scope="module", loop_scope="module")
+async def dataset():
+    check_db_name()
+    async with engine.begin() as conn:
+        await conn.run_sync(reset_db)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(populate_categories)
+        # The counters don't matter here, skip the triggers to seed faster
+        for table in COUNTED_TABLES:
+            await conn.execute(text(f"ALTER TABLE {table} DISABLE TRIGGER USER"))
+        sizes = dict(
+            users=NUM_USERS,
+            posts=POSTS_PER_USER,
+            likes=LIKES_PER_USER,
+            follows=FOLLOWS_PER_USER,
+            comments=COMMENTS_PER_USER,
+            comment_likes=COMMENT_LIKES_PER_USER,
+        )
+        for statement in SEED_STATEMENTS:
+            await conn.execute(text(statement.format(**sizes)))
+        for table in COUNTED_TABLES:
+            await conn.execute(text(f"ALTER TABLE {table} ENABLE TRIGGER USER"))
+        await conn.execute(text("ANALYZE"))
+    yield
+    async with engine.begin() as conn:
+        await conn.run_sync(reset_db)
+    await engine.dispose()
+
+
+USER_ID = seed_id("user", 1)
+CURSOR = seed_id("post", 500)
+NEW_YORK = RectangularRegion(x_min=-74.02, y_min=40.70, x_max=-73.93, y_max=40.80)
+
+# name -> (query, large tables the plan may scan sequentially)
+QUERIES = {
+    "feed": (FeedStore(None)._feed_page_query(USER_ID, None, 10), set()),  # type: ignore
+    "feed_cursor": (FeedStore(None)._feed_page_query(USER_ID, CURSOR, 10), set()),  # type: ignore
+    "discover_feed": (FeedStore(None)._discover_feed_ids_query(USER_ID, 100), set()),  # type: ignore
+    "base_map": (base_map_query(NEW_YORK).limit(500), set()),
+    "find_place": (PlaceStore(None)._find_place_query("place1", 40.7, -74.0, 100), set()),  # type: ignore
+    # Matching on the concatenated name can't use a btree index
+    "search_users": (SearchStore(None)._search_users_query("user1"), {"user"}),  # type: ignore
+    "suggested_users": (UserStore(None)._get_suggested_users_query(USER_ID, 25), set()),  # type: ignore
+    "follow_feed": (ActivityFeedStore(None)._follow_feed_query(USER_ID, None, 50), set()),  # type: ignore
+    "post_like_feed": (ActivityFeedStore(None)._post_like_feed_query(USER_ID, None, 50), set()),  # type: ignore
+    "comment_feed": (ActivityFeedStore(None)._comment_feed_query(USER_ID, None, 50), set()),  # type: ignore
+}
+
+
+@pytest.mark.parametrize("name", QUERIES.keys())
+async def test_query_plan(name):
+    query, allowed_seq_scans = QUERIES[name]
+    async with engine.connect() as conn:
+        plan = await explain(conn, query)
+    seq_scans = (seq_scanned_tables(plan) & LARGE_TABLES) - allowed_seq_scans
+    assert not seq_scans, f"{name} scans {', '.join(sorted(seq_scans))} sequentially"
+
+    cost = plan["Total Cost"]
+    if UPDATE_BASELINES:
+        save_baseline(name, cost)
+        return
+    baseline = load_baselines().get(name)
+    assert baseline is not None, f"No cost baseline for {name}, record one with UPDATE_QUERY_PLAN_BASELINES=1"
+    assert cost <= baseline * COST_TOLERANCE, f"{name} estimated cost {cost} is over its baseline {baseline}"
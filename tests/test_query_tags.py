@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+from sqlalchemy.util import greenlet_spawn
+
+from app.core.database import query_tags
+from app.features.admin.slow_queries import _EXPLAINABLE
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_query_tag():
+    assert query_tags.get_current_tag() is None
+    with query_tags.query_tag("job notify_post_liked"):
+        # Statements run in a greenlet, and jobs in their own task
+        assert await asyncio.ensure_future(greenlet_spawn(query_tags.get_current_tag)) == "job notify_post_liked"
+    assert query_tags.get_current_tag() is None
+
+
+async def test_route_tag():
+    tags = []
+    app = FastAPI()
+    app.add_middleware(query_tags.QueryTagMiddleware)
+
+    @app.get("/posts/{post_id}")
+    async def get_post(post_id: str):
+        tags.append(await greenlet_spawn(query_tags.get_current_tag))
+
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        await client.get("/posts/1")
+        await client.get("/posts/2")
+    assert tags == ["GET /posts/{post_id}", "GET /posts/{post_id}"]
+
+
+async def test_get_source():
+    assert query_tags.get_source("/* GET /posts/{post_id} */ SELECT $1") == "GET /posts/{post_id}"
+    assert query_tags.get_source("SELECT 1") is None
+
+
+async def test_explainable():
+    assert _EXPLAINABLE.match("/* GET /posts/{post_id} */ SELECT $1")
+    assert _EXPLAINABLE.match("WITH x AS (SELECT 1) SELECT * FROM x")
+    assert _EXPLAINABLE.match("update post set deleted = $1")
+    assert not _EXPLAINABLE.match("SET LOCAL statement_timeout = 5000")
+    assert not _EXPLAINABLE.match("BEGIN")
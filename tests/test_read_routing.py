@@ -0,0 +1,89 @@
+import time
+from typing import Optional
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.database import engine as engine_module
+from app.core.database.engine import ReadSession, StickToPrimaryMiddleware
+from app.features.stores import get_read_user_store
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def read_engine(monkeypatch):
+    read_engine = create_async_engine("postgresql+asyncpg://user@replica/jimo_test_db")
+    monkeypatch.setattr(engine_module, "read_engine", read_engine)
+    return read_engine
+
+
+def make_scope(method: str, cookie: Optional[str] = None) -> dict:
+    headers = [(b"cookie", cookie.encode())] if cookie is not None else []
+    return {"type": "http", "method": method, "headers": headers}
+
+
+async def request(middleware: StickToPrimaryMiddleware, method: str, cookie: Optional[str] = None) -> Optional[str]:
+    """Send a request through the middleware, returning the cookie it sets, if any."""
+    cookies = []
+
+    async def send(message):
+        cookies.extend(value.decode() for name, value in message["headers"] if name == b"set-cookie")
+
+    async def receive():
+        return {"type": "http.request"}
+
+    await middleware(make_scope(method, cookie), receive, send)
+    return cookies[0].split(";")[0] if cookies else None
+
+
+def make_app(binds: list):
+    async def app(scope, _receive, send):
+        binds.append(ReadSession().get_bind())
+        if scope["method"] == "POST":
+            engine_module._mark_write()
+            binds.append(ReadSession().get_bind())
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    return app
+
+
+async def test_reads_go_to_replica(read_engine):
+    assert ReadSession().get_bind() is read_engine.sync_engine
+
+
+async def test_reads_stick_to_primary_after_write(read_engine):
+    binds: list = []
+    middleware = StickToPrimaryMiddleware(make_app(binds), window_seconds=60)
+    assert await request(middleware, "GET") is None
+    cookie = await request(middleware, "POST")
+    assert cookie is not None
+    # Any worker reads the client's writes from the primary, since the client sends back the cookie
+    other_worker = StickToPrimaryMiddleware(make_app(binds), window_seconds=60)
+    await request(other_worker, "GET", cookie)
+    # Another client
+    await request(other_worker, "GET")
+    primary, replica = engine_module.engine.sync_engine, read_engine.sync_engine
+    assert binds == [replica, replica, primary, primary, replica]
+
+
+async def test_stick_to_primary_window_expires(read_engine):
+    binds: list = []
+    middleware = StickToPrimaryMiddleware(make_app(binds), window_seconds=60)
+    cookie = await request(middleware, "POST")
+    assert cookie is not None
+    expired = f"{StickToPrimaryMiddleware.COOKIE_NAME}={time.time() - 61}"
+    future = f"{StickToPrimaryMiddleware.COOKIE_NAME}={time.time() + 3600}"
+    invalid = f"{StickToPrimaryMiddleware.COOKIE_NAME}=invalid"
+    for stale_cookie in (expired, future, invalid):
+        await request(middleware, "GET", stale_cookie)
+    replica = read_engine.sync_engine
+    assert binds[2:] == [replica, replica, replica]
+
+
+async def test_replica_user_store_does_not_fill_cache(read_engine, monkeypatch):
+    async for db in engine_module.get_read_db():
+        assert not get_read_user_store(db).populate_cache
+    monkeypatch.setattr(engine_module, "read_engine", None)
+    async for db in engine_module.get_read_db():
+        assert get_read_user_store(db).populate_cache
@@ -0,0 +1,102 @@
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+from pydantic import BaseModel
+
+from app.core.responses import ModelResponse
+from app.features.images.entities import MediaEntity
+from app.features.map.entities import MapPin, MapPinIcon
+from app.features.map.types import GetMapResponse
+from app.features.places.entities import Location, Place, SavedPlace
+from app.features.places.types import GetPlaceDetailsResponse
+from app.features.posts.entities import Post
+from app.features.posts.types import PaginatedPosts
+from app.features.users.entities import PublicUser
+
+pytestmark = pytest.mark.asyncio
+
+NOW = datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+PLACE = Place(id=uuid.uuid4(), name="Café ☕", city="Zürich", category=None, latitude=47.37, longitude=8.5)
+USER = PublicUser(
+    id=uuid.uuid4(),
+    username="user",
+    first_name="Émile",
+    last_name="名字",
+    profile_picture_url=None,
+    post_count=1,
+    follower_count=2,
+    following_count=3,
+)
+
+
+def make_post(**kwargs) -> Post:
+    fields = dict(
+        id=uuid.uuid4(),
+        user=USER,
+        place=PLACE,
+        category="food",
+        content='Great "coffee"\n🙂',
+        media=[MediaEntity(id=str(uuid.uuid4()), blob_name="blob", url="https://example.com/image.jpg")],
+        created_at=NOW,
+        like_count=10,
+        comment_count=0,
+        liked=True,
+        saved=False,
+    )
+    return Post(**(fields | kwargs))
+
+
+RESPONSES = [
+    PaginatedPosts(posts=[make_post(), make_post(stars=3, media=[])], cursor=uuid.uuid4()),
+    PaginatedPosts(posts=[]),
+    GetPlaceDetailsResponse(
+        place=PLACE,
+        my_post=make_post(),
+        my_save=SavedPlace(id=uuid.uuid4(), place=PLACE, note="note", created_at=NOW),
+        following_posts=[make_post()],
+        featured_posts=[],
+        community_posts=[make_post(), make_post()],
+    ),
+    GetMapResponse(
+        pins=[
+            MapPin(
+                place_id=uuid.uuid4(),
+                location=Location(latitude=-33.8688, longitude=151.2093),
+                icon=MapPinIcon(category="cafe", icon_url=None, num_posts=2),
+            )
+        ]
+    ),
+]
+
+
+@pytest.mark.parametrize("response", RESPONSES, ids=lambda response: type(response).__name__)
+async def test_model_response_matches_response_model(response: BaseModel):
+    app = FastAPI()
+
+    @app.get("/response-model", response_model=type(response))
+    async def with_response_model():
+        return response
+
+    @app.get("/model-response", response_model=type(response))
+    async def with_model_response():
+        return ModelResponse(response)
+
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        expected = await client.get("/response-model")
+        actual = await client.get("/model-response")
+    assert actual.content == expected.content
+    assert actual.headers["content-type"] == expected.headers["content-type"]
+
+
+async def test_model_response_uses_aliases():
+    body = ModelResponse(PaginatedPosts(posts=[make_post()])).body
+    assert b'"postId"' in body and b'"placeId"' in body and b'"likeCount"' in body
+    assert b'"like_count"' not in body
+
+
+async def test_model_response_requires_a_model():
+    with pytest.raises(TypeError):
+        ModelResponse({"posts": []})
@@ -0,0 +1,39 @@
+import uuid
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app.core.database.helpers import in_array
+from app.core.database.models import PostRow
+from app.core.database.statement_cache import StatementCacheMonitor
+from app.features.posts.post_store import GET_POSTS_QUERY
+
+
+def test_in_array_binds_a_single_array():
+    compiled = GET_POSTS_QUERY.compile(dialect=postgresql.asyncpg.dialect())  # type: ignore
+    # No expanding parameter, so the SQL is the same for any number of ids
+    assert "POSTCOMPILE" not in compiled.string
+    assert "post.id = ANY ($1::UUID[])" in compiled.string
+    post_ids = [uuid.uuid4() for _ in range(10)]
+    assert compiled.construct_params({"post_ids": post_ids})["post_ids"] == post_ids
+
+
+def test_in_array_type():
+    clause = in_array(PostRow.user_id, "user_ids")
+    assert isinstance(clause.right.element.type, postgresql.ARRAY)
+
+
+def test_statement_cache_monitor():
+    engine = sa.create_engine("sqlite://")
+    monitor = StatementCacheMonitor("test", engine)
+    query = sa.select(sa.literal(1))
+    with engine.connect() as connection:
+        for _ in range(4):
+            connection.execute(query)
+        stats = monitor.stats()
+    assert stats.compiled_cache_misses == 1
+    assert stats.compiled_cache_hits == 3
+    assert stats.compiled_cache_hit_rate == 0.75
+    assert stats.connections == 1
+    engine.dispose()
+    assert monitor.stats().connections == 0
@@ -3,8 +3,10 @@ import uuid
 import pytest
 import pytest_asyncio
 
-from app.core.database.models import PlaceRow, PostRow, UserRow
+from app.core.database.models import PlaceRow, PlaceSaveRow, PostRow, UserRow
+from app.features.posts.entities import Post
 from app.features.posts.post_store import PostStore
+from app.features.users.entities import InternalUser
 
 pytestmark = pytest.mark.asyncio
 USER_A_ID = uuid.uuid4()
@@ -70,3 +72,31 @@ async def test_update_post(post_store: PostStore):
     assert updated_post.category == "activity"
     assert updated_post.stars == 3
     assert updated_post.image_url is None
+
+
+async def test_get_public_posts(session, post_store: PostStore):
+    await post_store.like_post(USER_B_ID, USER_A_POST_ID)
+    session.add(PlaceSaveRow(user_id=USER_B_ID, place_id=PLACE_ONE_ID, note=""))
+    await session.commit()
+
+    posts = await post_store.get_public_posts(USER_B_ID, [USER_A_POST_ID, USER_B_POST_ID, uuid.uuid4()])
+    assert posts.keys() == {USER_A_POST_ID, USER_B_POST_ID}
+    post = posts[USER_A_POST_ID]
+    assert post.user.id == USER_A_ID
+    assert post.place.id == PLACE_ONE_ID
+    assert post.liked and post.saved
+    assert not posts[USER_B_POST_ID].liked and not posts[USER_B_POST_ID].saved
+
+    # Matches the posts hydrated from the ORM rows
+    internal_post = (await post_store.get_posts([USER_A_POST_ID]))[USER_A_POST_ID]
+    user = InternalUser.model_validate(await session.get(UserRow, USER_A_ID))
+    fields = internal_post.model_dump(include=set(Post.model_fields))
+    assert post == Post(**fields, user=user.to_public(), liked=True, saved=True)
+
+
+async def test_get_public_posts_skips_deleted_users(session, post_store: PostStore):
+    user = await session.get(UserRow, USER_A_ID)
+    user.deleted = True
+    await session.commit()
+    posts = await post_store.get_public_posts(USER_B_ID, [USER_A_POST_ID, USER_B_POST_ID])
+    assert posts.keys() == {USER_B_POST_ID}
@@ -6,6 +6,7 @@ import sqlalchemy as sa
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database.models import UserRow
+from app.features.users.user_cache import UserCache
 from app.features.users.user_store import UserStore
 
 pytestmark = pytest.mark.asyncio
@@ -65,3 +66,39 @@ async def test_hard_delete_user(session: AsyncSession, user_store: UserStore):
     result = await session.execute(sa.select(UserRow).where(UserRow.id == USER_A_ID))
     rows = result.scalars().all()
     assert len(rows) == 0
+
+
+async def test_get_caller(user_store: UserStore):
+    caller = await user_store.get_caller(uid="a")
+    assert caller is not None
+    assert caller.id == USER_A_ID
+    assert caller.username_lower == "a"
+    assert not caller.is_admin
+    assert await user_store.get_caller(uid="c") is None
+
+    # Deleted users are returned so the caller can decide how to handle them
+    await user_store.soft_delete_user(USER_A_ID)
+    caller = await user_store.get_caller(uid="a")
+    assert caller is not None
+    assert caller.deleted
+
+
+async def test_cached_user_invalidated_on_update(session: AsyncSession):
+    cache = UserCache(max_size=10, ttl_seconds=60)
+    user_store = UserStore(db=session, cache=cache)
+    user = await user_store.get_user(uid="a")
+    assert user is not None
+    assert await user_store.get_user(username="A") == user
+    users = await user_store.get_users([USER_A_ID, USER_B_ID])
+    assert users.keys() == {USER_A_ID, USER_B_ID}
+    assert users[USER_A_ID] is user
+    assert cache.hits == 2
+    assert len(cache) == 2
+
+    updated, _ = await user_store.update_user(USER_A_ID, first_name="new")
+    assert updated is not None and updated.first_name == "new"
+    assert (await user_store.get_user(uid="a")).first_name == "new"  # type: ignore
+
+    await user_store.soft_delete_user(USER_A_ID)
+    assert await user_store.get_user(uid="a") is None
+    assert cache.get(uid="a") is None
@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.exc import DBAPIError
+
+from app.core.database import timeouts
+from app.core.database.query_stats import track_queries
+from app.core.database.timeouts import QueryCancellationMiddleware, is_statement_timeout, statement_timeout
+
+pytestmark = pytest.mark.asyncio
+
+
+def make_receive(*messages):
+    queue: asyncio.Queue = asyncio.Queue()
+    for message in messages:
+        queue.put_nowait(message)
+    return queue
+
+
+async def noop_send(_message):
+    pass
+
+
+async def test_cancel_on_disconnect():
+    cancelled = asyncio.Event()
+
+    async def app(_scope, receive, _send):
+        await statement_timeout(2.5)()
+        await receive()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    requests_before = timeouts.get_cancellation_stats().cancelled_requests
+    receive = make_receive({"type": "http.request", "body": b""}, {"type": "http.disconnect"})
+    middleware = QueryCancellationMiddleware(app)
+    with track_queries() as stats:
+        stats.started()  # Pretend a query is running
+        await asyncio.wait_for(middleware({"type": "http", "method": "GET"}, receive.get, noop_send), timeout=1)
+    assert cancelled.is_set()
+    stats_after = timeouts.get_cancellation_stats()
+    assert stats_after.cancelled_requests == requests_before + 1
+    assert stats_after.cancelled_queries >= 1
+
+
+@pytest.mark.parametrize("method, opted_in", [("GET", False), ("POST", True)])
+async def test_only_cancel_opted_in_reads(method, opted_in):
+    finished = asyncio.Event()
+
+    async def app(_scope, receive, _send):
+        if opted_in:
+            await statement_timeout(2.5)()
+        await receive()
+        await asyncio.sleep(0.01)
+        finished.set()
+
+    receive = make_receive({"type": "http.request", "body": b""}, {"type": "http.disconnect"})
+    await QueryCancellationMiddleware(app)({"type": "http", "method": method}, receive.get, noop_send)
+    assert finished.is_set()
+
+
+async def test_keep_running_after_response():
+    finished = asyncio.Event()
+
+    async def app(_scope, _receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"done"})
+        # e.g. background tasks
+        await asyncio.sleep(0.01)
+        finished.set()
+
+    receive = make_receive({"type": "http.disconnect"})
+    await QueryCancellationMiddleware(app)({"type": "http"}, receive.get, noop_send)
+    assert finished.is_set()
+
+
+async def test_statement_timeout_dependency():
+    timeouts_ms = []
+
+    async def app(_scope, _receive, _send):
+        await statement_timeout(2.5)()
+        timeouts_ms.append(timeouts._request_deadline.get().statement_timeout_ms)
+
+    receive = make_receive({"type": "http.request", "body": b""})
+    await QueryCancellationMiddleware(app)({"type": "http"}, receive.get, noop_send)
+    assert timeouts_ms == [2500]
+    assert timeouts._request_deadline.get() is None
+
+
+async def test_statement_timeout(session):
+    deadline = timeouts._RequestDeadline(statement_timeout_ms=50)
+    token = timeouts._request_deadline.set(deadline)
+    try:
+        with pytest.raises(DBAPIError) as e:
+            await session.execute(sa.text("SELECT pg_sleep(1)"))
+        assert is_statement_timeout(e.value)
+    finally:
+        timeouts._request_deadline.reset(token)
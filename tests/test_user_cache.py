@@ -0,0 +1,81 @@
+import time
+import uuid
+from datetime import datetime
+
+from app.features.users.entities import InternalUser
+from app.features.users.user_cache import UserCache
+
+
+def make_user(username: str) -> InternalUser:
+    return InternalUser(
+        id=uuid.uuid4(),
+        uid=f"uid-{username}",
+        username=username,
+        username_lower=username.lower(),
+        first_name="first",
+        last_name="last",
+        phone_number=None,
+        profile_picture_id=None,
+        profile_picture_url=None,
+        profile_picture_blob_name=None,
+        is_featured=False,
+        is_admin=False,
+        deleted=False,
+        created_at=datetime.now(),
+        updated_at=datetime.now(),
+        post_count=0,
+        follower_count=0,
+        following_count=0,
+    )
+
+
+def test_get_by_id_uid_and_username():
+    cache = UserCache(max_size=10, ttl_seconds=60)
+    user = make_user("Alice")
+    assert cache.get(user_id=user.id) is None
+    cache.put(user)
+    assert cache.get(user_id=user.id) is user
+    assert cache.get(uid=user.uid) is user
+    assert cache.get(username="ALICE") is user
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_invalidate_removes_all_keys():
+    cache = UserCache(max_size=10, ttl_seconds=60)
+    user = make_user("alice")
+    cache.put(user)
+    cache.invalidate(user.id)
+    assert cache.get(uid=user.uid) is None
+    assert cache.get(username=user.username) is None
+    assert len(cache) == 0
+
+
+def test_renamed_user_not_found_by_old_username():
+    cache = UserCache(max_size=10, ttl_seconds=60)
+    user = make_user("alice")
+    cache.put(user)
+    cache.put(user.model_copy(update={"username": "bob", "username_lower": "bob"}))
+    assert cache.get(username="alice") is None
+    assert cache.get(username="bob") is not None
+
+
+def test_evicts_least_recently_used():
+    cache = UserCache(max_size=2, ttl_seconds=60)
+    a, b, c = make_user("a"), make_user("b"), make_user("c")
+    cache.put(a)
+    cache.put(b)
+    cache.get(user_id=a.id)
+    cache.put(c)
+    assert len(cache) == 2
+    assert cache.get(user_id=b.id) is None
+    assert cache.get(uid=b.uid) is None
+    assert cache.get(user_id=a.id) is a
+
+
+def test_expired_entries_not_returned():
+    cache = UserCache(max_size=10, ttl_seconds=0)
+    user = make_user("alice")
+    cache.put(user)
+    time.sleep(0.001)
+    assert cache.get(user_id=user.id) is None
+    assert len(cache) == 0
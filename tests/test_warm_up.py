@@ -0,0 +1,22 @@
+import pytest
+
+from app.core.database.query_stats import track_queries
+from app.features.warm_up import run_hot_statements, warm_up, warm_up_engine
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_run_hot_statements(session):
+    with track_queries() as stats:
+        await run_hot_statements(session)
+    assert stats.count == 11
+
+
+async def test_warm_up_engine_fills_pool(engine, create):
+    await warm_up_engine(engine, connections=3)
+    assert engine.pool.checkedin() >= 3
+    assert engine.pool.checkedout() == 0
+
+
+async def test_warm_up_disabled():
+    assert await warm_up(connections=0) is None